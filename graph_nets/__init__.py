@@ -12,14 +12,44 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ============================================================================
-"""Graph networks library."""
+"""Graph networks library.
+
+Only `graphs` and `utils_np`, which do not depend on Tensorflow, are imported
+with the package. The submodules depending on Tensorflow and Sonnet (`blocks`,
+`modules` and `utils_tf`) are imported when first accessed, e.g. as
+`graph_nets.modules`, so that numpy-only consumers (such as data preparation
+workers) do not pay for loading them.
+"""
 
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from graph_nets import blocks
+import importlib
+import sys
+
 from graph_nets import graphs
-from graph_nets import modules
 from graph_nets import utils_np
-from graph_nets import utils_tf
+
+# Submodules imported on first access.
+_LAZY_SUBMODULES = ("blocks", "modules", "utils_tf")
+
+
+def __getattr__(name):
+  if name in _LAZY_SUBMODULES:
+    # Also sets the submodule as an attribute of the package, so that this is
+    # only called once per submodule.
+    return importlib.import_module("{}.{}".format(__name__, name))
+  raise AttributeError("module {!r} has no attribute {!r}".format(
+      __name__, name))
+
+
+def __dir__():
+  return sorted(set(globals()) | set(_LAZY_SUBMODULES))
+
+
+if sys.version_info < (3, 7):
+  # Module-level `__getattr__` is not supported (PEP 562).
+  from graph_nets import blocks  # pylint: disable=g-import-not-at-top
+  from graph_nets import modules  # pylint: disable=g-import-not-at-top
+  from graph_nets import utils_tf  # pylint: disable=g-import-not-at-top
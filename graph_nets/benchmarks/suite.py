@@ -0,0 +1,329 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Benchmark suite of the blocks, modules and utilities.
+
+Each benchmark of `BENCHMARKS` is run on the synthetic graphs of each regime of
+`synthetic.REGIMES`, and reports its wall time as a JSON-serializable record,
+so that results of different versions of the library can be compared.
+
+Usage:
+
+  python -m graph_nets.benchmarks.suite --output=/tmp/benchmarks.json \
+    --benchmarks=EdgeBlock,GraphNetwork --regimes=small_sparse,large_skewed
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import json
+import os
+import platform
+import subprocess
+import time
+
+from absl import app
+from absl import flags
+from graph_nets import blocks
+from graph_nets import graphs
+from graph_nets import modules
+from graph_nets import utils_np
+from graph_nets import utils_tf
+from graph_nets.benchmarks import synthetic
+from graph_nets.demos import models
+import numpy as np
+import sonnet as snt
+import tensorflow as tf
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string("output", None, "Path of the JSON file of the results.")
+flags.DEFINE_list("benchmarks", None,
+                  "Names of the benchmarks to run (all by default).")
+flags.DEFINE_list("regimes", None,
+                  "Names of the graph regimes to run (all by default).")
+flags.DEFINE_integer("num_iters", 20, "Number of timed iterations.")
+flags.DEFINE_integer("num_warmup_iters", 3, "Number of untimed iterations.")
+
+# Fully connecting graphs grows quadratically with their number of nodes, so
+# these benchmarks are skipped for larger graphs.
+_MAX_NODES_TO_FULLY_CONNECT = 512
+
+_NUM_HEADS = 2
+
+_NUM_PROCESSING_STEPS = 3
+
+
+def _linear():
+  return snt.Linear(synthetic.FEATURE_SIZE)
+
+
+def _without_edges(graph):
+  return graph.replace(edges=None, senders=None, receivers=None)
+
+
+def _with_static_num_nodes(graph, regime):
+  nodes = tf.reshape(
+      graph.nodes,
+      [regime.num_graphs * regime.num_nodes, synthetic.FEATURE_SIZE])
+  return graph.replace(nodes=nodes)
+
+
+def _self_attention(graph):
+  heads = tf.reshape(
+      graph.nodes, [-1, _NUM_HEADS, synthetic.FEATURE_SIZE // _NUM_HEADS])
+  return modules.SelfAttention()(heads, heads, heads, graph).nodes
+
+
+def _edge_gat(graph):
+  key_size = value_size = synthetic.FEATURE_SIZE // _NUM_HEADS
+  module = modules.EdgeGAT(
+      attention_node_projection_model=snt.Linear(key_size * _NUM_HEADS),
+      attention_edge_projection_model=snt.Linear(
+          (key_size + value_size) * _NUM_HEADS),
+      query_key_product_model=snt.Linear(1),
+      node_model_fn=_linear,
+      edge_model_fn=_linear,
+      global_model_fn=_linear,
+      num_heads=_NUM_HEADS,
+      key_size=key_size,
+      value_size=value_size)
+  return module(graph)
+
+
+def _encode_process_decode(graph):
+  module = models.EncodeProcessDecode(
+      edge_output_size=synthetic.FEATURE_SIZE,
+      node_output_size=synthetic.FEATURE_SIZE,
+      global_output_size=synthetic.FEATURE_SIZE)
+  return module(graph, _NUM_PROCESSING_STEPS)
+
+
+# Benchmarks run in a session. Each takes the placeholders of the input graphs
+# and their `Regime`, and returns the tensors to fetch.
+_SESSION_BENCHMARKS = collections.OrderedDict([
+    ("get_graph", lambda graph, _: utils_tf.get_graph(graph, 0)),
+    ("get_graph_slice",
+     lambda graph, regime: utils_tf.get_graph(
+         graph, slice(0, max(1, regime.num_graphs // 2)))),
+    ("concat", lambda graph, _: utils_tf.concat([graph, graph], axis=0)),
+    ("fully_connect_graph_static",
+     lambda graph, regime: utils_tf.fully_connect_graph_static(
+         _with_static_num_nodes(_without_edges(graph), regime))),
+    ("fully_connect_graph_dynamic",
+     lambda graph, _: utils_tf.fully_connect_graph_dynamic(
+         _without_edges(graph))),
+    ("EdgeBlock", lambda graph, _: blocks.EdgeBlock(_linear)(graph)),
+    ("NodeBlock", lambda graph, _: blocks.NodeBlock(_linear)(graph)),
+    ("GlobalBlock", lambda graph, _: blocks.GlobalBlock(_linear)(graph)),
+    ("GraphNetwork",
+     lambda graph, _: modules.GraphNetwork(_linear, _linear, _linear)(graph)),
+    ("SelfAttention", lambda graph, _: _self_attention(graph)),
+    ("EdgeGAT", lambda graph, _: _edge_gat(graph)),
+    ("EncodeProcessDecode", lambda graph, _: _encode_process_decode(graph)),
+])
+
+_FULLY_CONNECT_BENCHMARKS = ("fully_connect_graph_static",
+                             "fully_connect_graph_dynamic")
+
+
+def _host_step(data_dicts):
+  return lambda: utils_np.data_dicts_to_graphs_tuple(data_dicts)
+
+
+def _graph_construction_step(data_dicts):
+  def step():
+    with tf.Graph().as_default():
+      utils_tf.data_dicts_to_graphs_tuple(data_dicts)
+  return step
+
+
+# Benchmarks run outside of a session. Each takes the data dicts of the input
+# graphs, and returns the function to time.
+_HOST_BENCHMARKS = collections.OrderedDict([
+    ("utils_np.data_dicts_to_graphs_tuple", _host_step),
+    ("utils_tf.data_dicts_to_graphs_tuple", _graph_construction_step),
+])
+
+BENCHMARKS = tuple(_HOST_BENCHMARKS) + tuple(_SESSION_BENCHMARKS)
+
+
+def _runnable_in_session(outputs):
+  if isinstance(outputs, graphs.GraphsTuple):
+    return utils_tf.make_runnable_in_session(outputs)
+  if isinstance(outputs, list):
+    return [_runnable_in_session(output) for output in outputs]
+  return outputs
+
+
+def _library_version():
+  """Returns the installed version of graph_nets, or `None`."""
+  try:
+    from importlib import metadata  # pylint: disable=g-import-not-at-top
+  except ImportError:  # Python < 3.8.
+    import pkg_resources  # pylint: disable=g-import-not-at-top
+    try:
+      return pkg_resources.get_distribution("graph_nets").version
+    except pkg_resources.DistributionNotFound:
+      return None
+  try:
+    return metadata.version("graph_nets")
+  except metadata.PackageNotFoundError:
+    return None
+
+
+def _library_revision():
+  """Returns the git revision of the graph_nets sources, or `None`."""
+  try:
+    output = subprocess.check_output(
+        ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(__file__),
+        stderr=subprocess.STDOUT)
+  except (OSError, subprocess.CalledProcessError):
+    return None
+  return output.decode("utf-8").strip()
+
+
+def _time_step(step, num_iters, num_warmup_iters):
+  for _ in range(num_warmup_iters):
+    step()
+  wall_times = []
+  for _ in range(num_iters):
+    start = time.time()
+    step()
+    wall_times.append(time.time() - start)
+  return np.array(wall_times)
+
+
+def run_benchmark(name, regime_name, num_iters=20, num_warmup_iters=3, seed=0):
+  """Runs a benchmark on the graphs of a regime.
+
+  Args:
+    name: The name of the benchmark, one of `BENCHMARKS`.
+    regime_name: The name of the regime, one of `synthetic.REGIMES`.
+    num_iters: The number of timed iterations.
+    num_warmup_iters: The number of iterations run before timing.
+    seed: The seed of the synthetic graphs and of the model parameters.
+
+  Returns:
+    A JSON-serializable dictionary with the benchmark and regime names, the
+    sizes of the input graphs and the wall time statistics in seconds, or
+    `None` if the benchmark does not apply to the regime.
+
+  Raises:
+    ValueError: If `name` or `regime_name` are unknown.
+  """
+  if name not in BENCHMARKS:
+    raise ValueError("Unknown benchmark {!r}, expected one of {}".format(
+        name, BENCHMARKS))
+  if regime_name not in synthetic.REGIMES:
+    raise ValueError("Unknown regime {!r}, expected one of {}".format(
+        regime_name, list(synthetic.REGIMES)))
+  regime = synthetic.REGIMES[regime_name]
+  if (name in _FULLY_CONNECT_BENCHMARKS and
+      regime.num_nodes > _MAX_NODES_TO_FULLY_CONNECT):
+    return None
+
+  graph = synthetic.regime_graphs(regime, seed=seed)
+  data_dicts = utils_np.graphs_tuple_to_data_dicts(graph)
+  if name in _HOST_BENCHMARKS:
+    wall_times = _time_step(_HOST_BENCHMARKS[name](data_dicts), num_iters,
+                            num_warmup_iters)
+  else:
+    with tf.Graph().as_default():
+      tf.set_random_seed(seed)
+      placeholders = utils_tf.placeholders_from_data_dicts(
+          data_dicts, force_dynamic_num_graphs=False)
+      outputs = _SESSION_BENCHMARKS[name](placeholders, regime)
+      outputs = _runnable_in_session(outputs)
+      feed_dict = utils_tf.get_feed_dict(placeholders, graph)
+      with tf.Session() as session:
+        session.run(tf.global_variables_initializer())
+        wall_times = _time_step(
+            lambda: session.run(outputs, feed_dict=feed_dict), num_iters,
+            num_warmup_iters)
+
+  num_edges = int(graph.n_edge.sum())
+  median = float(np.median(wall_times))
+  return collections.OrderedDict([
+      ("benchmark", name),
+      ("regime", regime_name),
+      ("num_graphs", regime.num_graphs),
+      ("num_nodes", regime.num_graphs * regime.num_nodes),
+      ("num_edges", num_edges),
+      ("num_iters", num_iters),
+      ("median_s", median),
+      ("mean_s", float(np.mean(wall_times))),
+      ("min_s", float(np.min(wall_times))),
+      ("std_s", float(np.std(wall_times))),
+      ("edges_per_s", num_edges / median if median > 0 else None),
+  ])
+
+
+def run_suite(benchmarks=None, regimes=None, num_iters=20, num_warmup_iters=3,
+              seed=0):
+  """Runs benchmarks over regimes.
+
+  Args:
+    benchmarks: (optional) The names of the benchmarks to run. Defaults to all
+      the `BENCHMARKS`.
+    regimes: (optional) The names of the regimes to run. Defaults to all the
+      `synthetic.REGIMES`.
+    num_iters: The number of timed iterations of each benchmark.
+    num_warmup_iters: The number of iterations run before timing.
+    seed: The seed of the synthetic graphs and of the model parameters.
+
+  Returns:
+    A JSON-serializable dictionary with an "environment" dictionary describing
+    the versions of the libraries (including the installed version of
+    graph_nets and, when run from a git checkout, the revision of its
+    sources), and a "results" list of the records returned by
+    `run_benchmark`.
+  """
+  benchmarks = BENCHMARKS if benchmarks is None else benchmarks
+  regimes = list(synthetic.REGIMES) if regimes is None else regimes
+  results = []
+  for regime_name in regimes:
+    for name in benchmarks:
+      record = run_benchmark(name, regime_name, num_iters=num_iters,
+                             num_warmup_iters=num_warmup_iters, seed=seed)
+      if record is not None:
+        results.append(record)
+  environment = collections.OrderedDict([
+      ("python", platform.python_version()),
+      ("platform", platform.platform()),
+      ("numpy", np.__version__),
+      ("tensorflow", tf.__version__),
+      ("sonnet", snt.__version__),
+      ("graph_nets", _library_version()),
+      ("graph_nets_revision", _library_revision()),
+      ("timestamp", time.time()),
+  ])
+  return {"environment": environment, "results": results}
+
+
+def main(argv):
+  del argv  # Unused.
+  summary = run_suite(FLAGS.benchmarks, FLAGS.regimes, FLAGS.num_iters,
+                      FLAGS.num_warmup_iters)
+  for record in summary["results"]:
+    print("{benchmark:>40} {regime:>15} {median_s:12.6f}s".format(**record))
+  if FLAGS.output:
+    with open(FLAGS.output, "w") as f:
+      json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -0,0 +1,79 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Synthetic graphs for the benchmarks.
+
+The benchmarks run over a few graph size regimes, defined in `REGIMES`: small
+and large graphs, sparse and dense connectivity, and uniform or skewed
+(power-law) degrees. The graphs of a regime are generated by the vectorized
+generators of `graph_nets.generators`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+from graph_nets import generators
+
+Regime = collections.namedtuple(
+    "Regime", ["num_graphs", "num_nodes", "avg_degree", "skewed"])
+
+REGIMES = collections.OrderedDict([
+    ("small_sparse", Regime(
+        num_graphs=32, num_nodes=16, avg_degree=2, skewed=False)),
+    ("small_dense", Regime(
+        num_graphs=32, num_nodes=16, avg_degree=12, skewed=False)),
+    ("large_sparse", Regime(
+        num_graphs=4, num_nodes=2048, avg_degree=4, skewed=False)),
+    ("large_skewed", Regime(
+        num_graphs=4, num_nodes=2048, avg_degree=4, skewed=True)),
+    ("large_dense", Regime(
+        num_graphs=4, num_nodes=512, avg_degree=128, skewed=False)),
+])
+
+FEATURE_SIZE = 16
+
+# Exponent of the power law of the degrees of skewed graphs, for which the
+# weight of the `i`-th node is proportional to `(i + 1) ** -1.5`.
+_POWER_LAW_EXPONENT = 1. + 1. / 1.5
+
+
+def regime_graphs(regime, feature_size=FEATURE_SIZE, seed=0):
+  """Generates the random graphs of a `Regime`.
+
+  Uniform regimes are Erdős–Rényi graphs (`generators.erdos_renyi`) whose
+  expected degree is `avg_degree`, and skewed regimes are power-law graphs
+  (`generators.power_law`) with `avg_degree` edges per node.
+
+  Args:
+    regime: A `Regime`.
+    feature_size: The size of the node, edge and global features.
+    seed: The random seed.
+
+  Returns:
+    A `graphs.GraphsTuple` of numpy arrays, with float32 features.
+  """
+  if regime.skewed:
+    return generators.power_law(
+        regime.num_graphs, regime.num_nodes, regime.avg_degree,
+        exponent=_POWER_LAW_EXPONENT, node_size=feature_size,
+        edge_size=feature_size, global_size=feature_size, seed=seed)
+  return generators.erdos_renyi(
+      regime.num_graphs, regime.num_nodes,
+      min(1., regime.avg_degree / (regime.num_nodes - 1)),
+      node_size=feature_size, edge_size=feature_size,
+      global_size=feature_size, seed=seed)
+
@@ -24,7 +24,18 @@ This module contains elementary building blocks of graph networks:
 
   - the `EdgeBlock`, `NodeBlock` and `GlobalBlock` are elementary graph networks
     that only update the edges (resp. the nodes, the globals) of their input
-    graph (as described in https://arxiv.org/abs/1806.01261).
+    graph (as described in https://arxiv.org/abs/1806.01261). Their broadcast,
+    aggregation, collection and model steps are delimited as `profiling`
+    regions;
+
+  - the `BipartiteEdgeBlock` and `BipartiteNodeBlock` are their counterparts
+    operating on a `graphs.BipartiteGraphsTuple`;
+
+  - the `TypedEdgeBlock` and `TypedNodeBlock` are their counterparts operating
+    on a `graphs.TypedGraphsTuple`, with one model per edge (resp. node) type;
+
+  - the `DenseEdgeBlock`, `DenseNodeBlock` and `DenseGlobalBlock` are their
+    counterparts operating on a padded `graphs.DenseGraphsTuple`.
 """
 
 from __future__ import absolute_import
@@ -32,6 +43,7 @@ from __future__ import division
 from __future__ import print_function
 
 from graph_nets import graphs
+from graph_nets import profiling
 from graph_nets import utils_tf
 import sonnet as snt
 import tensorflow as tf
@@ -44,6 +56,12 @@ SENDERS = graphs.SENDERS
 GLOBALS = graphs.GLOBALS
 N_NODE = graphs.N_NODE
 N_EDGE = graphs.N_EDGE
+LEFT_NODES = graphs.LEFT_NODES
+RIGHT_NODES = graphs.RIGHT_NODES
+N_LEFT_NODES = graphs.N_LEFT_NODES
+N_RIGHT_NODES = graphs.N_RIGHT_NODES
+ADJACENCY = graphs.ADJACENCY
+NODE_MASK = graphs.NODE_MASK
 
 
 def _validate_graph(graph, mandatory_fields, additional_message=None):
@@ -83,7 +101,7 @@ def broadcast_globals_to_edges(graph, name="broadcast_globals_to_edges"):
   """
   _validate_broadcasted_graph(graph, GLOBALS, N_EDGE)
   with tf.name_scope(name):
-    return utils_tf.repeat(graph.globals, graph.n_edge, axis=0)
+    return tf.gather(graph.globals, utils_tf.repeat_graph_index(graph.n_edge))
 
 
 def broadcast_globals_to_nodes(graph, name="broadcast_globals_to_nodes"):
@@ -107,7 +125,7 @@ def broadcast_globals_to_nodes(graph, name="broadcast_globals_to_nodes"):
   """
   _validate_broadcasted_graph(graph, GLOBALS, N_NODE)
   with tf.name_scope(name):
-    return utils_tf.repeat(graph.globals, graph.n_node, axis=0)
+    return tf.gather(graph.globals, utils_tf.repeat_graph_index(graph.n_node))
 
 
 def broadcast_sender_nodes_to_edges(graph,
@@ -155,6 +173,19 @@ def broadcast_receiver_nodes_to_edges(
     return tf.gather(graph.nodes, graph.receivers)
 
 
+def _get_graph_index(graph, count_field):
+  """Returns the index of the graph of each node (or edge) of `graph`.
+
+  Args:
+    graph: A `graphs.GraphsTuple` containing `Tensor`s.
+    count_field: `N_NODE` or `N_EDGE`.
+
+  Returns:
+    A `Tensor` of shape `[sum(getattr(graph, count_field))]`.
+  """
+  return utils_tf.repeat_graph_index(getattr(graph, count_field))
+
+
 class EdgesToGlobalsAggregator(snt.AbstractModule):
   """Aggregates all edges into globals."""
 
@@ -182,13 +213,23 @@ class EdgesToGlobalsAggregator(snt.AbstractModule):
     super(EdgesToGlobalsAggregator, self).__init__(name=name)
     self._reducer = reducer
 
-  def _build(self, graph):
+  def _build(self, graph, edge_graph_index=None):
+    """Aggregates the edges of each graph.
+
+    Args:
+      graph: A `graphs.GraphsTuple` containing `Tensor`s.
+      edge_graph_index: (optional) A `Tensor` containing the index of the graph
+        of each edge, to avoid recomputing it from `graph.n_edge`.
+
+    Returns:
+      A `Tensor` of aggregated edges, with one row per graph.
+    """
     _validate_graph(graph, (EDGES, ),
                     additional_message="when aggregating from edges.")
     num_graphs = utils_tf.get_num_graphs(graph)
-    graph_index = tf.range(num_graphs)
-    indices = utils_tf.repeat(graph_index, graph.n_edge, axis=0)
-    return self._reducer(graph.edges, indices, num_graphs)
+    if edge_graph_index is None:
+      edge_graph_index = _get_graph_index(graph, N_EDGE)
+    return self._reducer(graph.edges, edge_graph_index, num_graphs)
 
 
 class NodesToGlobalsAggregator(snt.AbstractModule):
@@ -218,13 +259,23 @@ class NodesToGlobalsAggregator(snt.AbstractModule):
     super(NodesToGlobalsAggregator, self).__init__(name=name)
     self._reducer = reducer
 
-  def _build(self, graph):
+  def _build(self, graph, node_graph_index=None):
+    """Aggregates the nodes of each graph.
+
+    Args:
+      graph: A `graphs.GraphsTuple` containing `Tensor`s.
+      node_graph_index: (optional) A `Tensor` containing the index of the graph
+        of each node, to avoid recomputing it from `graph.n_node`.
+
+    Returns:
+      A `Tensor` of aggregated nodes, with one row per graph.
+    """
     _validate_graph(graph, (NODES, ),
                     additional_message="when aggregating from nodes.")
     num_graphs = utils_tf.get_num_graphs(graph)
-    graph_index = tf.range(num_graphs)
-    indices = utils_tf.repeat(graph_index, graph.n_node, axis=0)
-    return self._reducer(graph.nodes, indices, num_graphs)
+    if node_graph_index is None:
+      node_graph_index = _get_graph_index(graph, N_NODE)
+    return self._reducer(graph.nodes, node_graph_index, num_graphs)
 
 
 class _EdgesToNodesAggregator(snt.AbstractModule):
@@ -238,14 +289,15 @@ class _EdgesToNodesAggregator(snt.AbstractModule):
     self._reducer = reducer
     self._use_sent_edges = use_sent_edges
 
-  def _build(self, graph):
+  def _build(self, graph, num_nodes=None):
     _validate_graph(graph, (
         EDGES,
         SENDERS,
         RECEIVERS,
     ),
                     additional_message="when aggregating from edges.")
-    num_nodes = tf.reduce_sum(graph.n_node)
+    if num_nodes is None:
+      num_nodes = tf.reduce_sum(graph.n_node)
     indices = graph.senders if self._use_sent_edges else graph.receivers
     return self._reducer(graph.edges, indices, num_nodes)
 
@@ -423,7 +475,7 @@ class EdgeBlock(snt.AbstractModule):
     with self._enter_variable_scope():
       self._edge_model = edge_model_fn()
 
-  def _build(self, graph):
+  def _build(self, graph, edge_graph_index=None):
     """Connects the edge block.
 
     Args:
@@ -432,6 +484,9 @@ class EdgeBlock(snt.AbstractModule):
         `use_receiver_nodes` or `use_sender_nodes` is `True`) and per graph
         globals (if `use_globals` is `True`) should be concatenable on the last
         axis.
+      edge_graph_index: (optional) A `Tensor` containing the index of the graph
+        of each edge. If provided, the globals are broadcast to the edges by
+        gathering them with these indices.
 
     Returns:
       An output `graphs.GraphsTuple` with updated edges.
@@ -450,17 +505,29 @@ class EdgeBlock(snt.AbstractModule):
       _validate_graph(graph, (EDGES, ), "when use_edges == True")
       edges_to_collect.append(graph.edges)
 
-    if self._use_receiver_nodes:
-      edges_to_collect.append(broadcast_receiver_nodes_to_edges(graph))
-
-    if self._use_sender_nodes:
-      edges_to_collect.append(broadcast_sender_nodes_to_edges(graph))
-
-    if self._use_globals:
-      edges_to_collect.append(broadcast_globals_to_edges(graph))
-
-    collected_edges = tf.concat(edges_to_collect, axis=-1)
-    updated_edges = self._edge_model(collected_edges)
+    with profiling.region(profiling.BROADCAST) as region:
+      broadcasted = []
+      if self._use_receiver_nodes:
+        broadcasted.append(broadcast_receiver_nodes_to_edges(graph))
+
+      if self._use_sender_nodes:
+        broadcasted.append(broadcast_sender_nodes_to_edges(graph))
+
+      if self._use_globals:
+        if edge_graph_index is None:
+          broadcasted.append(broadcast_globals_to_edges(graph))
+        else:
+          _validate_broadcasted_graph(graph, GLOBALS, N_EDGE)
+          broadcasted.append(tf.gather(graph.globals, edge_graph_index))
+      region.record(outputs=broadcasted)
+    edges_to_collect.extend(broadcasted)
+
+    with profiling.region(profiling.COLLECT) as region:
+      collected_edges = tf.concat(edges_to_collect, axis=-1)
+      region.record(inputs=edges_to_collect, outputs=[collected_edges])
+    with profiling.region(profiling.MODEL) as region:
+      updated_edges = self._edge_model(collected_edges)
+      region.record(inputs=[collected_edges], outputs=[updated_edges])
     return graph.replace(edges=updated_edges)
 
 
@@ -540,7 +607,7 @@ class NodeBlock(snt.AbstractModule):
         self._sent_edges_aggregator = SentEdgesToNodesAggregator(
             sent_edges_reducer)
 
-  def _build(self, graph):
+  def _build(self, graph, node_graph_index=None, num_nodes=None):
     """Connects the node block.
 
     Args:
@@ -548,6 +615,11 @@ class NodeBlock(snt.AbstractModule):
         features (if `use_received_edges` or `use_sent_edges` is `True`),
         individual nodes features (if `use_nodes` is True) and per graph globals
         (if `use_globals` is `True`) should be concatenable on the last axis.
+      node_graph_index: (optional) A `Tensor` containing the index of the graph
+        of each node. If provided, the globals are broadcast to the nodes by
+        gathering them with these indices.
+      num_nodes: (optional) A scalar `Tensor` containing the total number of
+        nodes in `graph`, to avoid recomputing it from `graph.n_node`.
 
     Returns:
       An output `graphs.GraphsTuple` with updated nodes.
@@ -555,21 +627,40 @@ class NodeBlock(snt.AbstractModule):
 
     nodes_to_collect = []
 
-    if self._use_received_edges:
-      nodes_to_collect.append(self._received_edges_aggregator(graph))
+    with profiling.region(profiling.AGGREGATE) as region:
+      aggregated = []
+      if self._use_received_edges:
+        aggregated.append(
+            self._received_edges_aggregator(graph, num_nodes=num_nodes))
 
-    if self._use_sent_edges:
-      nodes_to_collect.append(self._sent_edges_aggregator(graph))
+      if self._use_sent_edges:
+        aggregated.append(
+            self._sent_edges_aggregator(graph, num_nodes=num_nodes))
+      if aggregated:
+        region.record(inputs=[graph.edges] * len(aggregated),
+                      outputs=aggregated)
+    nodes_to_collect.extend(aggregated)
 
     if self._use_nodes:
       _validate_graph(graph, (NODES, ), "when use_nodes == True")
       nodes_to_collect.append(graph.nodes)
 
     if self._use_globals:
-      nodes_to_collect.append(broadcast_globals_to_nodes(graph))
-
-    collected_nodes = tf.concat(nodes_to_collect, axis=-1)
-    updated_nodes = self._node_model(collected_nodes)
+      with profiling.region(profiling.BROADCAST) as region:
+        if node_graph_index is None:
+          broadcasted = broadcast_globals_to_nodes(graph)
+        else:
+          _validate_broadcasted_graph(graph, GLOBALS, N_NODE)
+          broadcasted = tf.gather(graph.globals, node_graph_index)
+        region.record(outputs=[broadcasted])
+      nodes_to_collect.append(broadcasted)
+
+    with profiling.region(profiling.COLLECT) as region:
+      collected_nodes = tf.concat(nodes_to_collect, axis=-1)
+      region.record(inputs=nodes_to_collect, outputs=[collected_nodes])
+    with profiling.region(profiling.MODEL) as region:
+      updated_nodes = self._node_model(collected_nodes)
+      region.record(inputs=[collected_nodes], outputs=[updated_nodes])
     return graph.replace(nodes=updated_nodes)
 
 
@@ -639,7 +730,7 @@ class GlobalBlock(snt.AbstractModule):
               "If `use_nodes==True`, `nodes_reducer` should not be None.")
         self._nodes_aggregator = NodesToGlobalsAggregator(nodes_reducer)
 
-  def _build(self, graph):
+  def _build(self, graph, node_graph_index=None, edge_graph_index=None):
     """Connects the global block.
 
     Args:
@@ -647,22 +738,842 @@ class GlobalBlock(snt.AbstractModule):
         (if `use_edges` is `True`), individual nodes (if `use_nodes` is True)
         and per graph globals (if `use_globals` is `True`) should be
         concatenable on the last axis.
+      node_graph_index: (optional) A `Tensor` containing the index of the graph
+        of each node, used to aggregate the nodes.
+      edge_graph_index: (optional) A `Tensor` containing the index of the graph
+        of each edge, used to aggregate the edges.
 
     Returns:
       An output `graphs.GraphsTuple` with updated globals.
     """
     globals_to_collect = []
 
+    with profiling.region(profiling.AGGREGATE) as region:
+      if self._use_edges:
+        _validate_graph(graph, (EDGES, ), "when use_edges == True")
+        aggregated_edges = self._edges_aggregator(
+            graph, edge_graph_index=edge_graph_index)
+        region.record(inputs=[graph.edges], outputs=[aggregated_edges])
+        globals_to_collect.append(aggregated_edges)
+
+      if self._use_nodes:
+        _validate_graph(graph, (NODES, ), "when use_nodes == True")
+        aggregated_nodes = self._nodes_aggregator(
+            graph, node_graph_index=node_graph_index)
+        region.record(inputs=[graph.nodes], outputs=[aggregated_nodes])
+        globals_to_collect.append(aggregated_nodes)
+
+    if self._use_globals:
+      _validate_graph(graph, (GLOBALS, ), "when use_globals == True")
+      globals_to_collect.append(graph.globals)
+
+    with profiling.region(profiling.COLLECT) as region:
+      collected_globals = tf.concat(globals_to_collect, axis=-1)
+      region.record(inputs=globals_to_collect, outputs=[collected_globals])
+    with profiling.region(profiling.MODEL) as region:
+      updated_globals = self._global_model(collected_globals)
+      region.record(inputs=[collected_globals], outputs=[updated_globals])
+    return graph.replace(globals=updated_globals)
+
+
+class BipartiteEdgeBlock(snt.AbstractModule):
+  """Edge block for bipartite graphs.
+
+  A block that updates the features of each edge in a batch of bipartite graphs
+  based on (a subset of) the previous edge features, the features of its sender
+  (left) and receiver (right) nodes, and the global features of the
+  corresponding graph.
+  """
+
+  def __init__(self,
+               edge_model_fn,
+               use_edges=True,
+               use_left_nodes=True,
+               use_right_nodes=True,
+               use_globals=True,
+               name="bipartite_edge_block"):
+    """Initializes the BipartiteEdgeBlock module.
+
+    Args:
+      edge_model_fn: A callable that will be called in the variable scope of
+        this BipartiteEdgeBlock and should return a Sonnet module (or
+        equivalent callable) to be used as the edge model. See `EdgeBlock`.
+      use_edges: (bool, default=True). Whether to condition on edge attributes.
+      use_left_nodes: (bool, default=True). Whether to condition on the
+        attributes of the sender (left) nodes.
+      use_right_nodes: (bool, default=True). Whether to condition on the
+        attributes of the receiver (right) nodes.
+      use_globals: (bool, default=True). Whether to condition on global
+        attributes.
+      name: The module name.
+
+    Raises:
+      ValueError: When fields that are required are missing.
+    """
+    super(BipartiteEdgeBlock, self).__init__(name=name)
+
+    if not (use_edges or use_left_nodes or use_right_nodes or use_globals):
+      raise ValueError("At least one of use_edges, use_left_nodes, "
+                       "use_right_nodes or use_globals must be True.")
+
+    self._use_edges = use_edges
+    self._use_left_nodes = use_left_nodes
+    self._use_right_nodes = use_right_nodes
+    self._use_globals = use_globals
+
+    with self._enter_variable_scope():
+      self._edge_model = edge_model_fn()
+
+  def _build(self, graph):
+    """Connects the bipartite edge block.
+
+    Args:
+      graph: A `graphs.BipartiteGraphsTuple` containing `Tensor`s, whose
+        individual edges features (if `use_edges` is `True`), individual left
+        and right nodes features (if `use_left_nodes` or `use_right_nodes` is
+        `True`) and per graph globals (if `use_globals` is `True`) should be
+        concatenable on the last axis.
+
+    Returns:
+      An output `graphs.BipartiteGraphsTuple` with updated edges.
+
+    Raises:
+      ValueError: If `graph` does not have non-`None` receivers and senders, or
+        if `graph` has `None` fields incompatible with the selected options.
+    """
+    _validate_graph(graph, (SENDERS, RECEIVERS, N_EDGE),
+                    " when using a BipartiteEdgeBlock")
+
+    edges_to_collect = []
+
     if self._use_edges:
-      _validate_graph(graph, (EDGES, ), "when use_edges == True")
-      globals_to_collect.append(self._edges_aggregator(graph))
+      _validate_graph(graph, (EDGES,), "when use_edges == True")
+      edges_to_collect.append(graph.edges)
+
+    if self._use_left_nodes:
+      _validate_graph(graph, (LEFT_NODES,), "when use_left_nodes == True")
+      edges_to_collect.append(tf.gather(graph.left_nodes, graph.senders))
+
+    if self._use_right_nodes:
+      _validate_graph(graph, (RIGHT_NODES,), "when use_right_nodes == True")
+      edges_to_collect.append(tf.gather(graph.right_nodes, graph.receivers))
+
+    if self._use_globals:
+      _validate_broadcasted_graph(graph, GLOBALS, N_EDGE)
+      edges_to_collect.append(
+          tf.gather(graph.globals, utils_tf.repeat_graph_index(graph.n_edge)))
+
+    collected_edges = tf.concat(edges_to_collect, axis=-1)
+    updated_edges = self._edge_model(collected_edges)
+    return graph.replace(edges=updated_edges)
+
+
+class BipartiteNodeBlock(snt.AbstractModule):
+  """Node block for bipartite graphs.
+
+  A block that updates the features of the nodes on one side of a batch of
+  bipartite graphs based on (a subset of) their previous features, the
+  aggregated features of their adjacent edges, and the global features of the
+  corresponding graph. Edges are aggregated onto their receivers when updating
+  the right nodes, and onto their senders when updating the left nodes; the
+  nodes on the other side are left unchanged.
+  """
+
+  def __init__(self,
+               node_model_fn,
+               side="right",
+               use_edges=True,
+               use_nodes=True,
+               use_globals=True,
+               edges_reducer=tf.unsorted_segment_sum,
+               name="bipartite_node_block"):
+    """Initializes the BipartiteNodeBlock module.
+
+    Args:
+      node_model_fn: A callable that will be called in the variable scope of
+        this BipartiteNodeBlock and should return a Sonnet module (or
+        equivalent callable) to be used as the node model. See `NodeBlock`.
+      side: (string, default="right") Which nodes to update, either "left" or
+        "right".
+      use_edges: (bool, default=True) Whether to condition on the aggregated
+        edges adjacent to each node.
+      use_nodes: (bool, default=True) Whether to condition on node attributes.
+      use_globals: (bool, default=True) Whether to condition on global
+        attributes.
+      edges_reducer: Reduction to be used when aggregating edges. This should be
+        a callable whose signature matches `tf.unsorted_segment_sum`.
+      name: The module name.
+
+    Raises:
+      ValueError: If `side` is invalid, or when fields that are required are
+        missing.
+    """
+    super(BipartiteNodeBlock, self).__init__(name=name)
+
+    if side not in ("left", "right"):
+      raise ValueError(
+          "`side` must be either 'left' or 'right', got {}".format(side))
+    if not (use_nodes or use_edges or use_globals):
+      raise ValueError("At least one of use_edges, use_nodes or use_globals "
+                       "must be True.")
+    if use_edges and edges_reducer is None:
+      raise ValueError(
+          "If `use_edges==True`, `edges_reducer` should not be None.")
+
+    if side == "left":
+      self._nodes_field, self._count_field, self._index_field = (
+          LEFT_NODES, N_LEFT_NODES, SENDERS)
+    else:
+      self._nodes_field, self._count_field, self._index_field = (
+          RIGHT_NODES, N_RIGHT_NODES, RECEIVERS)
+    self._use_edges = use_edges
+    self._use_nodes = use_nodes
+    self._use_globals = use_globals
+    self._edges_reducer = edges_reducer
+
+    with self._enter_variable_scope():
+      self._node_model = node_model_fn()
+
+  def _build(self, graph):
+    """Connects the bipartite node block.
+
+    Args:
+      graph: A `graphs.BipartiteGraphsTuple` containing `Tensor`s, whose
+        individual edges features (if `use_edges` is `True`), individual nodes
+        features of the updated side (if `use_nodes` is True) and per graph
+        globals (if `use_globals` is `True`) should be concatenable on the last
+        axis.
+
+    Returns:
+      An output `graphs.BipartiteGraphsTuple` with updated nodes on the selected
+      side.
+    """
+    counts = getattr(graph, self._count_field)
+    nodes_to_collect = []
+
+    if self._use_edges:
+      _validate_graph(graph, (EDGES, self._index_field, self._count_field),
+                      "when use_edges == True")
+      nodes_to_collect.append(
+          self._edges_reducer(graph.edges, getattr(graph, self._index_field),
+                              tf.reduce_sum(counts)))
 
     if self._use_nodes:
-      _validate_graph(graph, (NODES, ), "when use_nodes == True")
-      globals_to_collect.append(self._nodes_aggregator(graph))
+      _validate_graph(graph, (self._nodes_field,), "when use_nodes == True")
+      nodes_to_collect.append(getattr(graph, self._nodes_field))
 
     if self._use_globals:
-      _validate_graph(graph, (GLOBALS, ), "when use_globals == True")
+      _validate_broadcasted_graph(graph, GLOBALS, self._count_field)
+      nodes_to_collect.append(
+          tf.gather(graph.globals, utils_tf.repeat_graph_index(counts)))
+
+    collected_nodes = tf.concat(nodes_to_collect, axis=-1)
+    updated_nodes = self._node_model(collected_nodes)
+    return graph.replace(**{self._nodes_field: updated_nodes})
+
+
+def _build_typed_models(model_fns):
+  """Builds the per-type models, in a deterministic order."""
+  return {type_: model_fns[type_]() for type_ in sorted(model_fns)}
+
+
+def _get_typed_model(models, type_, element_name):
+  try:
+    return models[type_]
+  except KeyError:
+    raise ValueError("No {} model for type {!r}".format(element_name, type_))
+
+
+class TypedEdgeBlock(snt.AbstractModule):
+  """Edge block for typed graphs.
+
+  A block that updates the features of each edge in a batch of typed graphs
+  with the model of its edge type, based on (a subset of) the previous edge
+  features, the features of the adjacent nodes, and the global features of the
+  corresponding graph. Each edge type is processed with a single gather per
+  input field and a single call to its model, without padding the features of
+  the different types to a common size.
+  """
+
+  def __init__(self,
+               edge_model_fns,
+               use_edges=True,
+               use_receiver_nodes=True,
+               use_sender_nodes=True,
+               use_globals=True,
+               name="typed_edge_block"):
+    """Initializes the TypedEdgeBlock module.
+
+    Args:
+      edge_model_fns: A dictionary from edge types to callables that will be
+        called in the variable scope of this TypedEdgeBlock and should return
+        a Sonnet module (or equivalent callable) to be used as the edge model of
+        this type. See `EdgeBlock`.
+      use_edges: (bool, default=True). Whether to condition on edge attributes.
+      use_receiver_nodes: (bool, default=True). Whether to condition on receiver
+        node attributes.
+      use_sender_nodes: (bool, default=True). Whether to condition on sender
+        node attributes.
+      use_globals: (bool, default=True). Whether to condition on global
+        attributes.
+      name: The module name.
+
+    Raises:
+      ValueError: When fields that are required are missing.
+    """
+    super(TypedEdgeBlock, self).__init__(name=name)
+
+    if not (use_edges or use_sender_nodes or use_receiver_nodes
+            or use_globals):
+      raise ValueError("At least one of use_edges, use_sender_nodes, "
+                       "use_receiver_nodes or use_globals must be True.")
+
+    self._use_edges = use_edges
+    self._use_receiver_nodes = use_receiver_nodes
+    self._use_sender_nodes = use_sender_nodes
+    self._use_globals = use_globals
+
+    with self._enter_variable_scope():
+      self._edge_models = _build_typed_models(edge_model_fns)
+
+  def _build(self, graph):
+    """Connects the typed edge block.
+
+    Args:
+      graph: A `graphs.TypedGraphsTuple` containing `Tensor`s, whose individual
+        edges features (if `use_edges` is `True`), individual nodes features (if
+        `use_receiver_nodes` or `use_sender_nodes` is `True`) and per graph
+        globals (if `use_globals` is `True`) should be concatenable on the last
+        axis, for each edge type.
+
+    Returns:
+      An output `graphs.TypedGraphsTuple` with updated edges.
+
+    Raises:
+      ValueError: If `graph` does not have non-`None` receivers and senders, if
+        `graph` has `None` fields incompatible with the selected options, or if
+        there is no model for one of the edge types of `graph`.
+    """
+    _validate_graph(graph, (SENDERS, RECEIVERS, N_EDGE),
+                    " when using a TypedEdgeBlock")
+    if self._use_edges:
+      _validate_graph(graph, (EDGES,), "when use_edges == True")
+    if self._use_receiver_nodes or self._use_sender_nodes:
+      _validate_graph(graph, (NODES,), "when broadcasting nodes to edges")
+    if self._use_globals:
+      _validate_graph(graph, (GLOBALS,), "when use_globals == True")
+
+    updated_edges = {}
+    for edge_type in graph.edge_types:
+      edge_model = _get_typed_model(self._edge_models, edge_type, "edge")
+      sender_type, _, receiver_type = edge_type
+      edges_to_collect = []
+
+      if self._use_edges:
+        edges_to_collect.append(graph.edges[edge_type])
+
+      if self._use_receiver_nodes:
+        edges_to_collect.append(tf.gather(graph.nodes[receiver_type],
+                                          graph.receivers[edge_type]))
+
+      if self._use_sender_nodes:
+        edges_to_collect.append(tf.gather(graph.nodes[sender_type],
+                                          graph.senders[edge_type]))
+
+      if self._use_globals:
+        edges_to_collect.append(tf.gather(
+            graph.globals, utils_tf.repeat_graph_index(graph.n_edge[edge_type])))
+
+      collected_edges = tf.concat(edges_to_collect, axis=-1)
+      updated_edges[edge_type] = edge_model(collected_edges)
+    return graph.replace(edges=updated_edges)
+
+
+class TypedNodeBlock(snt.AbstractModule):
+  """Node block for typed graphs.
+
+  A block that updates the features of each node in a batch of typed graphs
+  with the model of its node type, based on (a subset of) the previous node
+  features, the aggregated features of the adjacent edges, and the global
+  features of the corresponding graph.
+
+  The edges of each edge type are aggregated separately with a single segment
+  reduction, and the aggregated features of the different edge types received
+  (resp. sent) by a node type are concatenated in the order of the edge types.
+  """
+
+  def __init__(self,
+               node_model_fns,
+               use_received_edges=True,
+               use_sent_edges=False,
+               use_nodes=True,
+               use_globals=True,
+               received_edges_reducer=tf.unsorted_segment_sum,
+               sent_edges_reducer=tf.unsorted_segment_sum,
+               name="typed_node_block"):
+    """Initializes the TypedNodeBlock module.
+
+    Args:
+      node_model_fns: A dictionary from node types to callables that will be
+        called in the variable scope of this TypedNodeBlock and should return
+        a Sonnet module (or equivalent callable) to be used as the node model of
+        this type. See `NodeBlock`.
+      use_received_edges: (bool, default=True) Whether to condition on
+        aggregated edges received by each node.
+      use_sent_edges: (bool, default=False) Whether to condition on aggregated
+        edges sent by each node.
+      use_nodes: (bool, default=True) Whether to condition on node attributes.
+      use_globals: (bool, default=True) Whether to condition on global
+        attributes.
+      received_edges_reducer: Reduction to be used when aggregating received
+        edges. This should be a callable whose signature matches
+        `tf.unsorted_segment_sum`.
+      sent_edges_reducer: Reduction to be used when aggregating sent edges.
+        This should be a callable whose signature matches
+        `tf.unsorted_segment_sum`.
+      name: The module name.
+
+    Raises:
+      ValueError: When fields that are required are missing.
+    """
+    super(TypedNodeBlock, self).__init__(name=name)
+
+    if not (use_nodes or use_sent_edges or use_received_edges or use_globals):
+      raise ValueError("At least one of use_received_edges, use_sent_edges, "
+                       "use_nodes or use_globals must be True.")
+    if use_received_edges and received_edges_reducer is None:
+      raise ValueError(
+          "If `use_received_edges==True`, `received_edges_reducer` "
+          "should not be None.")
+    if use_sent_edges and sent_edges_reducer is None:
+      raise ValueError("If `use_sent_edges==True`, `sent_edges_reducer` "
+                       "should not be None.")
+
+    self._use_received_edges = use_received_edges
+    self._use_sent_edges = use_sent_edges
+    self._use_nodes = use_nodes
+    self._use_globals = use_globals
+    self._received_edges_reducer = received_edges_reducer
+    self._sent_edges_reducer = sent_edges_reducer
+
+    with self._enter_variable_scope():
+      self._node_models = _build_typed_models(node_model_fns)
+
+  def _build(self, graph):
+    """Connects the typed node block.
+
+    Args:
+      graph: A `graphs.TypedGraphsTuple` containing `Tensor`s, whose individual
+        edges features (if `use_received_edges` or `use_sent_edges` is `True`),
+        individual nodes features (if `use_nodes` is True) and per graph globals
+        (if `use_globals` is `True`) should be concatenable on the last axis,
+        for each node type.
+
+    Returns:
+      An output `graphs.TypedGraphsTuple` with updated nodes.
+
+    Raises:
+      ValueError: If `graph` has `None` fields incompatible with the selected
+        options, if there is no model for one of the node types of `graph`, or
+        if a node type has no input to condition on.
+    """
+    if self._use_received_edges or self._use_sent_edges:
+      _validate_graph(graph, (EDGES, SENDERS, RECEIVERS),
+                      "when aggregating edges to nodes")
+    if self._use_nodes:
+      _validate_graph(graph, (NODES,), "when use_nodes == True")
+    if self._use_globals:
+      _validate_graph(graph, (GLOBALS,), "when use_globals == True")
+
+    updated_nodes = {}
+    for node_type in graph.node_types:
+      node_model = _get_typed_model(self._node_models, node_type, "node")
+      num_nodes = tf.reduce_sum(graph.n_node[node_type])
+      nodes_to_collect = []
+
+      if self._use_received_edges:
+        for edge_type in graph.edge_types:
+          if edge_type[2] == node_type:
+            nodes_to_collect.append(self._received_edges_reducer(
+                graph.edges[edge_type], graph.receivers[edge_type], num_nodes))
+
+      if self._use_sent_edges:
+        for edge_type in graph.edge_types:
+          if edge_type[0] == node_type:
+            nodes_to_collect.append(self._sent_edges_reducer(
+                graph.edges[edge_type], graph.senders[edge_type], num_nodes))
+
+      if self._use_nodes:
+        nodes_to_collect.append(graph.nodes[node_type])
+
+      if self._use_globals:
+        nodes_to_collect.append(tf.gather(
+            graph.globals, utils_tf.repeat_graph_index(graph.n_node[node_type])))
+
+      if not nodes_to_collect:
+        raise ValueError(
+            "Node type {!r} has no input to condition on".format(node_type))
+      collected_nodes = tf.concat(nodes_to_collect, axis=-1)
+      updated_nodes[node_type] = node_model(collected_nodes)
+    return graph.replace(nodes=updated_nodes)
+
+
+def _dense_mask(mask, values):
+  """Casts a boolean `mask` to the type of `values` and expands its dims.
+
+  Args:
+    mask: A boolean `Tensor` whose shape is a prefix of the shape of `values`.
+    values: A `Tensor`.
+
+  Returns:
+    A `Tensor` with the type of `values`, broadcastable against `values`.
+  """
+  mask = tf.cast(mask, values.dtype)
+  for _ in range(values.shape.ndims - mask.shape.ndims):
+    mask = tf.expand_dims(mask, -1)
+  return mask
+
+
+def _dense_reduction_or_zero(reduce_fn, values, mask, axis):
+  """Common code for the dense min and max reductions (below)."""
+  mask = tf.broadcast_to(tf.cast(_dense_mask(mask, values), tf.bool),
+                         tf.shape(values))
+  if reduce_fn is tf.reduce_max:
+    fill_value = values.dtype.min
+  else:
+    fill_value = values.dtype.max
+  reduced = reduce_fn(
+      tf.where(mask, values, tf.fill(tf.shape(values),
+                                     tf.constant(fill_value, values.dtype))),
+      axis=axis)
+  present = tf.reduce_any(mask, axis=axis)
+  return tf.where(present, reduced, tf.zeros_like(reduced))
+
+
+def _dense_sum(values, mask, axis):
+  return tf.reduce_sum(values * _dense_mask(mask, values), axis=axis)
+
+
+def _dense_mean(values, mask, axis):
+  mask = _dense_mask(mask, values)
+  count = tf.reduce_sum(mask, axis=axis)
+  return (tf.reduce_sum(values * mask, axis=axis) /
+          tf.maximum(count, tf.ones_like(count)))
+
+
+def _dense_max_or_zero(values, mask, axis):
+  return _dense_reduction_or_zero(tf.reduce_max, values, mask, axis)
+
+
+def _dense_min_or_zero(values, mask, axis):
+  return _dense_reduction_or_zero(tf.reduce_min, values, mask, axis)
+
+
+# Dense counterparts of the segment reducers that can be used in the blocks.
+_DENSE_REDUCERS = {
+    tf.unsorted_segment_sum: _dense_sum,
+    tf.math.unsorted_segment_mean: _dense_mean,
+    unsorted_segment_max_or_zero: _dense_max_or_zero,
+    unsorted_segment_min_or_zero: _dense_min_or_zero,
+}
+
+
+def _get_dense_reducer(reducer):
+  """Returns the dense counterpart of a segment reducer."""
+  try:
+    return _DENSE_REDUCERS[reducer]
+  except KeyError:
+    raise ValueError(
+        "Reducer {} has no dense counterpart. Supported reducers are "
+        "tf.unsorted_segment_sum, tf.math.unsorted_segment_mean, "
+        "unsorted_segment_max_or_zero and unsorted_segment_min_or_zero.".format(
+            reducer))
+
+
+def _dense_tile(values, axis, multiple):
+  """Inserts a new axis at position `axis` and tiles `multiple` times on it."""
+  values = tf.expand_dims(values, axis)
+  multiples = [1] * values.shape.ndims
+  multiples[axis] = multiple
+  return tf.tile(values, multiples)
+
+
+class DenseEdgeBlock(snt.AbstractModule):
+  """Edge block operating on a `graphs.DenseGraphsTuple`.
+
+  Dense counterpart of `EdgeBlock`: the edge model is applied on every pair of
+  (possibly padded) nodes of each graph, and the output features of the pairs
+  which are not connected by an edge are set to zero. For graphs without
+  multiple edges between the same pair of nodes, this block computes the same
+  edge features as an `EdgeBlock` sharing the same edge model.
+  """
+
+  def __init__(self,
+               edge_model_fn,
+               use_edges=True,
+               use_receiver_nodes=True,
+               use_sender_nodes=True,
+               use_globals=True,
+               name="dense_edge_block"):
+    """Initializes the DenseEdgeBlock module.
+
+    Args:
+      edge_model_fn: A callable that will be called in the variable scope of
+        this DenseEdgeBlock and should return a Sonnet module (or equivalent
+        callable) to be used as the edge model. See `EdgeBlock`.
+      use_edges: (bool, default=True). Whether to condition on edge attributes.
+      use_receiver_nodes: (bool, default=True). Whether to condition on receiver
+        node attributes.
+      use_sender_nodes: (bool, default=True). Whether to condition on sender
+        node attributes.
+      use_globals: (bool, default=True). Whether to condition on global
+        attributes.
+      name: The module name.
+
+    Raises:
+      ValueError: When fields that are required are missing.
+    """
+    super(DenseEdgeBlock, self).__init__(name=name)
+
+    if not (use_edges or use_sender_nodes or use_receiver_nodes
+            or use_globals):
+      raise ValueError("At least one of use_edges, use_sender_nodes, "
+                       "use_receiver_nodes or use_globals must be True.")
+
+    self._use_edges = use_edges
+    self._use_receiver_nodes = use_receiver_nodes
+    self._use_sender_nodes = use_sender_nodes
+    self._use_globals = use_globals
+
+    with self._enter_variable_scope():
+      self._edge_model = edge_model_fn()
+
+  def _build(self, graph):
+    """Connects the dense edge block.
+
+    Args:
+      graph: A `graphs.DenseGraphsTuple` containing `Tensor`s, whose edges
+        features (if `use_edges` is `True`), nodes features (if
+        `use_receiver_nodes` or `use_sender_nodes` is `True`) and per graph
+        globals (if `use_globals` is `True`) should be concatenable on the last
+        axis.
+
+    Returns:
+      An output `graphs.DenseGraphsTuple` with updated edges.
+
+    Raises:
+      ValueError: If `graph` has `None` fields incompatible with the selected
+        `use_edges`, `use_receiver_nodes`, `use_sender_nodes`, or `use_globals`
+        options.
+    """
+    max_n_node = tf.shape(graph.adjacency)[1]
+    edges_to_collect = []
+
+    if self._use_edges:
+      _validate_graph(graph, (EDGES,), "when use_edges == True")
+      edges_to_collect.append(graph.edges)
+
+    if self._use_receiver_nodes:
+      _validate_graph(graph, (NODES,), "when use_receiver_nodes == True")
+      edges_to_collect.append(_dense_tile(graph.nodes, 2, max_n_node))
+
+    if self._use_sender_nodes:
+      _validate_graph(graph, (NODES,), "when use_sender_nodes == True")
+      edges_to_collect.append(_dense_tile(graph.nodes, 1, max_n_node))
+
+    if self._use_globals:
+      _validate_graph(graph, (GLOBALS,), "when use_globals == True")
+      edges_to_collect.append(
+          _dense_tile(_dense_tile(graph.globals, 1, max_n_node), 1,
+                      max_n_node))
+
+    collected_edges = tf.concat(edges_to_collect, axis=-1)
+    updated_edges = snt.BatchApply(self._edge_model, n_dims=3)(collected_edges)
+    updated_edges *= _dense_mask(graph.adjacency, updated_edges)
+    return graph.replace(edges=updated_edges)
+
+
+class DenseNodeBlock(snt.AbstractModule):
+  """Node block operating on a `graphs.DenseGraphsTuple`.
+
+  Dense counterpart of `NodeBlock`: edges are aggregated with dense reductions
+  over the senders (resp. receivers) axis of the edges, and the output features
+  of padded nodes are set to zero. This block computes the same node features
+  as a `NodeBlock` sharing the same node model and reducers.
+  """
+
+  def __init__(self,
+               node_model_fn,
+               use_received_edges=True,
+               use_sent_edges=False,
+               use_nodes=True,
+               use_globals=True,
+               received_edges_reducer=tf.unsorted_segment_sum,
+               sent_edges_reducer=tf.unsorted_segment_sum,
+               name="dense_node_block"):
+    """Initializes the DenseNodeBlock module.
+
+    Args:
+      node_model_fn: A callable that will be called in the variable scope of
+        this DenseNodeBlock and should return a Sonnet module (or equivalent
+        callable) to be used as the node model. See `NodeBlock`.
+      use_received_edges: (bool, default=True) Whether to condition on
+        aggregated edges received by each node.
+      use_sent_edges: (bool, default=False) Whether to condition on aggregated
+        edges sent by each node.
+      use_nodes: (bool, default=True) Whether to condition on node attributes.
+      use_globals: (bool, default=True) Whether to condition on global
+        attributes.
+      received_edges_reducer: Reduction to be used when aggregating received
+        edges. One of `tf.unsorted_segment_sum`,
+        `tf.math.unsorted_segment_mean`, `unsorted_segment_max_or_zero` or
+        `unsorted_segment_min_or_zero`.
+      sent_edges_reducer: Reduction to be used when aggregating sent edges.
+        Same options as `received_edges_reducer`.
+      name: The module name.
+
+    Raises:
+      ValueError: When fields that are required are missing, or if a reducer
+        has no dense counterpart.
+    """
+    super(DenseNodeBlock, self).__init__(name=name)
+
+    if not (use_nodes or use_sent_edges or use_received_edges or use_globals):
+      raise ValueError("At least one of use_received_edges, use_sent_edges, "
+                       "use_nodes or use_globals must be True.")
+
+    self._use_received_edges = use_received_edges
+    self._use_sent_edges = use_sent_edges
+    self._use_nodes = use_nodes
+    self._use_globals = use_globals
+    if self._use_received_edges:
+      self._received_edges_reducer = _get_dense_reducer(received_edges_reducer)
+    if self._use_sent_edges:
+      self._sent_edges_reducer = _get_dense_reducer(sent_edges_reducer)
+
+    with self._enter_variable_scope():
+      self._node_model = node_model_fn()
+
+  def _build(self, graph):
+    """Connects the dense node block.
+
+    Args:
+      graph: A `graphs.DenseGraphsTuple` containing `Tensor`s, whose edges
+        features (if `use_received_edges` or `use_sent_edges` is `True`), nodes
+        features (if `use_nodes` is True) and per graph globals (if
+        `use_globals` is `True`) should be concatenable on the last axis.
+
+    Returns:
+      An output `graphs.DenseGraphsTuple` with updated nodes.
+    """
+    max_n_node = tf.shape(graph.node_mask)[1]
+    nodes_to_collect = []
+
+    if self._use_received_edges:
+      _validate_graph(graph, (EDGES,), "when aggregating from edges.")
+      nodes_to_collect.append(
+          self._received_edges_reducer(graph.edges, graph.adjacency, axis=2))
+
+    if self._use_sent_edges:
+      _validate_graph(graph, (EDGES,), "when aggregating from edges.")
+      nodes_to_collect.append(
+          self._sent_edges_reducer(graph.edges, graph.adjacency, axis=1))
+
+    if self._use_nodes:
+      _validate_graph(graph, (NODES,), "when use_nodes == True")
+      nodes_to_collect.append(graph.nodes)
+
+    if self._use_globals:
+      _validate_graph(graph, (GLOBALS,), "when use_globals == True")
+      nodes_to_collect.append(_dense_tile(graph.globals, 1, max_n_node))
+
+    collected_nodes = tf.concat(nodes_to_collect, axis=-1)
+    updated_nodes = snt.BatchApply(self._node_model, n_dims=2)(collected_nodes)
+    updated_nodes *= _dense_mask(graph.node_mask, updated_nodes)
+    return graph.replace(nodes=updated_nodes)
+
+
+class DenseGlobalBlock(snt.AbstractModule):
+  """Global block operating on a `graphs.DenseGraphsTuple`.
+
+  Dense counterpart of `GlobalBlock`: nodes and edges are aggregated with
+  dense reductions masked by the `NODE_MASK` and `ADJACENCY` fields. This block
+  computes the same global features as a `GlobalBlock` sharing the same global
+  model and reducers.
+  """
+
+  def __init__(self,
+               global_model_fn,
+               use_edges=True,
+               use_nodes=True,
+               use_globals=True,
+               nodes_reducer=tf.unsorted_segment_sum,
+               edges_reducer=tf.unsorted_segment_sum,
+               name="dense_global_block"):
+    """Initializes the DenseGlobalBlock module.
+
+    Args:
+      global_model_fn: A callable that will be called in the variable scope of
+        this DenseGlobalBlock and should return a Sonnet module (or equivalent
+        callable) to be used as the global model. See `GlobalBlock`.
+      use_edges: (bool, default=True) Whether to condition on aggregated edges.
+      use_nodes: (bool, default=True) Whether to condition on node attributes.
+      use_globals: (bool, default=True) Whether to condition on global
+        attributes.
+      nodes_reducer: Reduction to be used when aggregating nodes. One of
+        `tf.unsorted_segment_sum`, `tf.math.unsorted_segment_mean`,
+        `unsorted_segment_max_or_zero` or `unsorted_segment_min_or_zero`.
+      edges_reducer: Reduction to be used when aggregating edges. Same options
+        as `nodes_reducer`.
+      name: The module name.
+
+    Raises:
+      ValueError: When fields that are required are missing, or if a reducer
+        has no dense counterpart.
+    """
+    super(DenseGlobalBlock, self).__init__(name=name)
+
+    if not (use_nodes or use_edges or use_globals):
+      raise ValueError("At least one of use_edges, "
+                       "use_nodes or use_globals must be True.")
+
+    self._use_edges = use_edges
+    self._use_nodes = use_nodes
+    self._use_globals = use_globals
+    if self._use_edges:
+      self._edges_reducer = _get_dense_reducer(edges_reducer)
+    if self._use_nodes:
+      self._nodes_reducer = _get_dense_reducer(nodes_reducer)
+
+    with self._enter_variable_scope():
+      self._global_model = global_model_fn()
+
+  def _build(self, graph):
+    """Connects the dense global block.
+
+    Args:
+      graph: A `graphs.DenseGraphsTuple` containing `Tensor`s, whose edges (if
+        `use_edges` is `True`), nodes (if `use_nodes` is True) and per graph
+        globals (if `use_globals` is `True`) should be concatenable on the last
+        axis.
+
+    Returns:
+      An output `graphs.DenseGraphsTuple` with updated globals.
+    """
+    globals_to_collect = []
+
+    if self._use_edges:
+      _validate_graph(graph, (EDGES,), "when use_edges == True")
+      globals_to_collect.append(
+          self._edges_reducer(graph.edges, graph.adjacency, axis=[1, 2]))
+
+    if self._use_nodes:
+      _validate_graph(graph, (NODES,), "when use_nodes == True")
+      globals_to_collect.append(
+          self._nodes_reducer(graph.nodes, graph.node_mask, axis=1))
+
+    if self._use_globals:
+      _validate_graph(graph, (GLOBALS,), "when use_globals == True")
       globals_to_collect.append(graph.globals)
 
     collected_globals = tf.concat(globals_to_collect, axis=-1)
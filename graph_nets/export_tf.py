@@ -0,0 +1,209 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Export of trained graph networks to the numpy engine of `inference_np`.
+
+`export` converts a connected stack of graph modules, and the Sonnet models
+they contain, to the description executed by `inference_np.build`, with the
+current values of their variables. The supported graph modules are:
+
+  - `blocks.EdgeBlock`, `blocks.NodeBlock` and `blocks.GlobalBlock`, whose
+    reducers are `tf.unsorted_segment_sum`, `tf.unsorted_segment_mean`,
+    `blocks.unsorted_segment_max_or_zero` or
+    `blocks.unsorted_segment_min_or_zero`;
+
+  - `modules.GraphNetwork`, `modules.InteractionNetwork` and
+    `modules.GraphIndependent`;
+
+  - `snt.Sequential`s and lists of the above.
+
+The supported models are `snt.Linear`, `snt.nets.MLP` (without dropout),
+`snt.LayerNorm`, the activations of `inference_np.ACTIVATIONS`, and
+`snt.Sequential`s of them.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from graph_nets import blocks
+from graph_nets import inference_np
+from graph_nets import modules
+import numpy as np
+import sonnet as snt
+import tensorflow as tf
+
+_REDUCERS = (
+    (tf.unsorted_segment_sum, inference_np.SUM),
+    (tf.unsorted_segment_mean, inference_np.MEAN),
+    (blocks.unsorted_segment_max_or_zero, inference_np.MAX),
+    (blocks.unsorted_segment_min_or_zero, inference_np.MIN),
+)
+
+_ACTIVATIONS = (
+    (tf.identity, "identity"),
+    (tf.nn.relu, "relu"),
+    (tf.nn.relu6, "relu6"),
+    (tf.nn.elu, "elu"),
+    (tf.nn.tanh, "tanh"),
+    (tf.tanh, "tanh"),
+    (tf.nn.sigmoid, "sigmoid"),
+    (tf.sigmoid, "sigmoid"),
+    (tf.nn.softplus, "softplus"),
+)
+
+
+def _lookup(pairs, value, kind):
+  for candidate, name in pairs:
+    if value is candidate:
+      return name
+  raise ValueError("Cannot export the {} {!r}".format(kind, value))
+
+
+def _export_model(model):
+  """Describes a model, with `tf.Variable`s instead of arrays."""
+  if isinstance(model, snt.Sequential):
+    return {"type": "sequential",
+            "layers": [_export_model(layer) for layer in model.layers]}
+  if isinstance(model, snt.nets.MLP):
+    layers = []
+    for i, linear in enumerate(model.layers):
+      layers.append(_export_model(linear))
+      if i < len(model.layers) - 1 or model.activate_final:
+        layers.append(_export_model(model.activation))
+    return {"type": "sequential", "layers": layers}
+  if isinstance(model, snt.Linear):
+    return {"type": "linear", "w": model.w,
+            "b": model.b if model.has_bias else None}
+  if isinstance(model, snt.LayerNorm):
+    variables = {v.op.name.split("/")[-1]: v for v in model.get_variables()}
+    return {"type": "layer_norm", "gamma": variables.get("gamma"),
+            "beta": variables.get("beta"),
+            "eps": float(getattr(model, "_eps", 1e-5))}
+  if callable(model) and not isinstance(model, snt.AbstractModule):
+    return {"type": "activation",
+            "function": _lookup(_ACTIVATIONS, model, "activation")}
+  raise ValueError("Cannot export the model {!r}".format(model))
+
+
+def _export_graph_module(module):
+  """Describes a graph module, with `tf.Variable`s instead of arrays."""
+  # pylint: disable=protected-access
+  if isinstance(module, (list, tuple)):
+    return {"type": "sequential",
+            "layers": [_export_graph_module(layer) for layer in module]}
+  if isinstance(module, snt.Sequential):
+    return _export_graph_module(module.layers)
+  if isinstance(module, modules.GraphNetwork):
+    return _export_graph_module(
+        [module._edge_block, module._node_block, module._global_block])
+  if isinstance(module, modules.InteractionNetwork):
+    return _export_graph_module([module._edge_block, module._node_block])
+  if isinstance(module, blocks.EdgeBlock):
+    return {"type": "edge_block",
+            "use_edges": module._use_edges,
+            "use_receiver_nodes": module._use_receiver_nodes,
+            "use_sender_nodes": module._use_sender_nodes,
+            "use_globals": module._use_globals,
+            "model": _export_model(module._edge_model)}
+  if isinstance(module, blocks.NodeBlock):
+    description = {"type": "node_block",
+                   "use_received_edges": module._use_received_edges,
+                   "use_sent_edges": module._use_sent_edges,
+                   "use_nodes": module._use_nodes,
+                   "use_globals": module._use_globals,
+                   "received_edges_reducer": None,
+                   "sent_edges_reducer": None,
+                   "model": _export_model(module._node_model)}
+    if module._use_received_edges:
+      description["received_edges_reducer"] = _lookup(
+          _REDUCERS, module._received_edges_aggregator._reducer, "reducer")
+    if module._use_sent_edges:
+      description["sent_edges_reducer"] = _lookup(
+          _REDUCERS, module._sent_edges_aggregator._reducer, "reducer")
+    return description
+  if isinstance(module, blocks.GlobalBlock):
+    description = {"type": "global_block",
+                   "use_edges": module._use_edges,
+                   "use_nodes": module._use_nodes,
+                   "use_globals": module._use_globals,
+                   "edges_reducer": None,
+                   "nodes_reducer": None,
+                   "model": _export_model(module._global_model)}
+    if module._use_edges:
+      description["edges_reducer"] = _lookup(
+          _REDUCERS, module._edges_aggregator._reducer, "reducer")
+    if module._use_nodes:
+      description["nodes_reducer"] = _lookup(
+          _REDUCERS, module._nodes_aggregator._reducer, "reducer")
+    return description
+  if isinstance(module, modules.GraphIndependent):
+    description = {"type": "graph_independent"}
+    for field in ("edge", "node", "global"):
+      model = getattr(module, "_{}_model".format(field))
+      if isinstance(model, snt.AbstractModule):
+        if not hasattr(model, "model"):
+          raise ValueError("The module must be connected before being exported")
+        description[field + "_model"] = _export_model(model.model)
+      else:
+        description[field + "_model"] = None
+    return description
+  # pylint: enable=protected-access
+  raise ValueError("Cannot export the graph module {!r}".format(module))
+
+
+def _collect_variables(description, variables):
+  """Lists the `tf.Variable`s of a description."""
+  if isinstance(description, dict):
+    for value in description.values():
+      _collect_variables(value, variables)
+  elif isinstance(description, list):
+    for value in description:
+      _collect_variables(value, variables)
+  elif isinstance(description, tf.Variable):
+    variables.append(description)
+
+
+def _replace_variables(description, values):
+  """Replaces the `tf.Variable`s of a description by their values."""
+  if isinstance(description, dict):
+    return {k: _replace_variables(v, values) for k, v in description.items()}
+  if isinstance(description, list):
+    return [_replace_variables(v, values) for v in description]
+  if isinstance(description, tf.Variable):
+    return np.asarray(values[id(description)])
+  return description
+
+
+def export(module, session):
+  """Exports a connected graph module to a description for `inference_np`.
+
+  Args:
+    module: A connected graph module, or a list of graph modules applied in
+      order (see the module documentation).
+    session: A `tf.Session` in which the variables of `module` are initialized.
+
+  Returns:
+    The description of `module`, containing the values of its variables, to
+    be passed to `inference_np.build` or `inference_np.save`.
+
+  Raises:
+    ValueError: If `module` or one of its models, activations or reducers
+      cannot be exported.
+  """
+  description = _export_graph_module(module)
+  variables = []
+  _collect_variables(description, variables)
+  values = dict(zip(map(id, variables), session.run(variables)))
+  return _replace_variables(description, values)
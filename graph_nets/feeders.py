@@ -0,0 +1,404 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Background preparation of the batches fed to a session.
+
+A training loop that builds each numpy batch (e.g. with
+`utils_np.networkxs_to_graphs_tuple`) right before running it in a session
+leaves the CPU idle while the session runs, and the session idle while the
+batch is built. `PrefetchFeeder` builds the next batches in a pool of worker
+threads or processes while the current one is being run:
+
+```
+feeder = feeders.PrefetchFeeder(batches_of_networkxs,
+                                utils_np.networkxs_to_graphs_tuple,
+                                num_workers=4)
+with feeder:
+  for graph in feeder:
+    sess.run(train_op, utils_tf.get_feed_dict(placeholders, graph))
+```
+
+When the workers are processes, their batches are pickled through a pipe,
+which can cost more than building them. With `shared_memory_size`, the workers
+instead write the fields of their batches into a `SharedMemoryRing` of
+`multiprocessing.shared_memory` segments, and only send back a small header
+describing the dtype, shape and offset of each field; the iterator rebuilds a
+`graphs.GraphsTuple` of numpy views of the segment, without copying it
+(`write_graphs_tuple` and `read_graphs_tuple`). This requires Python 3.8.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import multiprocessing
+from multiprocessing import pool as multiprocessing_pool
+
+from graph_nets import graphs
+from graph_nets import utils_np
+import numpy as np
+
+try:
+  from multiprocessing import shared_memory  # pylint: disable=g-import-not-at-top
+except ImportError:
+  shared_memory = None
+
+# Alignment of the fields written into shared memory, in bytes.
+_ALIGNMENT = 64
+
+# Shared memory segments attached by the current worker process, by name. The
+# workers are terminated with their feeder, and `SharedMemoryRing.close`
+# detaches the segments of the ring from the current process.
+_attached_segments = {}
+
+
+def _aligned(offset):
+  return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_graphs_tuple(graph, buffer_):
+  """Writes the fields of a numpy `graphs.GraphsTuple` into a buffer.
+
+  Args:
+    graph: A `graphs.GraphsTuple` containing numpy arrays or `None`s.
+    buffer_: A writable buffer, e.g. the `buf` of a
+      `multiprocessing.shared_memory.SharedMemory`.
+
+  Returns:
+    The header describing the fields, to be passed to `read_graphs_tuple`: a
+    dictionary from each field of `graphs.ALL_FIELDS` to `None` or to a
+    `(dtype, shape, offset)` triplet.
+
+  Raises:
+    ValueError: If the fields do not fit in the buffer, or if a field is a
+      sparse matrix.
+  """
+  header = {}
+  offset = 0
+  for field in graphs.ALL_FIELDS:
+    value = getattr(graph, field)
+    if value is None:
+      header[field] = None
+      continue
+    if utils_np._is_sparse(value):  # pylint: disable=protected-access
+      raise ValueError(
+          "Field {} is sparse and cannot be written into a buffer".format(
+              field))
+    value = np.asarray(value)
+    offset = _aligned(offset)
+    if offset + value.nbytes > len(buffer_):
+      raise ValueError(
+          "The graph does not fit in a buffer of {} bytes".format(
+              len(buffer_)))
+    np.ndarray(value.shape, value.dtype, buffer=buffer_, offset=offset)[...] = (
+        value)
+    header[field] = (value.dtype.str, value.shape, offset)
+    offset += value.nbytes
+  return header
+
+
+def read_graphs_tuple(header, buffer_):
+  """Rebuilds a `graphs.GraphsTuple` of views of a buffer, without copies.
+
+  Args:
+    header: The header returned by `write_graphs_tuple`.
+    buffer_: The buffer passed to `write_graphs_tuple`, or a buffer sharing its
+      memory (e.g. the same shared memory segment attached by another process).
+
+  Returns:
+    A `graphs.GraphsTuple` of numpy arrays, which are only valid as long as the
+    buffer is neither modified nor released.
+  """
+  return graphs.GraphsTuple(**{
+      field: None if spec is None else np.ndarray(
+          spec[1], np.dtype(spec[0]), buffer=buffer_, offset=spec[2])
+      for field, spec in header.items()})
+
+
+def _attach_segment(name):
+  """Attaches a shared memory segment, once per process."""
+  if name not in _attached_segments:
+    try:
+      # The segments are owned by the process that created them, and must not
+      # be unlinked by the resource tracker when a worker exits.
+      segment = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13.
+      segment = shared_memory.SharedMemory(name=name)
+    _attached_segments[name] = segment
+  return _attached_segments[name]
+
+
+def _detach_segment(name):
+  """Closes the attachment of a segment by the current process, if any."""
+  segment = _attached_segments.pop(name, None)
+  if segment is not None:
+    try:
+      segment.close()
+    except BufferError:
+      pass
+
+
+def _convert_into_segment(convert_fn, segment_name, inputs):
+  """Converts `inputs` in a worker process, and writes it into a segment."""
+  return write_graphs_tuple(convert_fn(inputs),
+                            _attach_segment(segment_name).buf)
+
+
+def _convert_into_buffer(convert_fn, buffer_, inputs):
+  """Converts `inputs` in a worker thread, and writes it into a buffer."""
+  return write_graphs_tuple(convert_fn(inputs), buffer_)
+
+
+class SharedMemoryRing(object):
+  """A fixed set of reusable shared memory segments.
+
+  The segments are created and owned by the process that constructs the ring,
+  which leases them (`acquire` and `release`) to the batches being written by
+  other processes, which attach them by `name`.
+  """
+
+  def __init__(self, num_segments, segment_size):
+    """Creates the segments.
+
+    Args:
+      num_segments: The number of segments.
+      segment_size: The size of each segment, in bytes.
+
+    Raises:
+      RuntimeError: If `multiprocessing.shared_memory` is not available.
+    """
+    if shared_memory is None:
+      raise RuntimeError(
+          "Shared memory transfers require `multiprocessing.shared_memory` "
+          "(Python >= 3.8)")
+    self._segments = [
+        shared_memory.SharedMemory(create=True, size=segment_size)
+        for _ in range(num_segments)]
+    self._free = collections.deque(range(num_segments))
+
+  @property
+  def num_free(self):
+    """The number of segments which are not leased."""
+    return len(self._free)
+
+  def acquire(self):
+    """Leases a segment and returns its index.
+
+    Raises:
+      RuntimeError: If all the segments are leased.
+    """
+    if not self._free:
+      raise RuntimeError("All the shared memory segments are leased")
+    return self._free.popleft()
+
+  def release(self, index):
+    """Returns a segment to the ring."""
+    self._free.append(index)
+
+  def name(self, index):
+    """The name under which other processes can attach a segment."""
+    return self._segments[index].name
+
+  def buffer(self, index):
+    """The memory of a segment, in this process."""
+    return self._segments[index].buf
+
+  def close(self):
+    """Destroys the segments."""
+    for segment in self._segments:
+      _detach_segment(segment.name)
+      segment.unlink()
+      try:
+        segment.close()
+      except BufferError:
+        # Arrays still view the segment, whose memory is released when they
+        # are garbage collected.
+        pass
+    self._segments = []
+    self._free.clear()
+
+
+class PrefetchFeeder(object):
+  """Iterates over batches prepared ahead of time by a pool of workers.
+
+  Each element of `inputs` is converted by `convert_fn` in a worker, and the
+  results are yielded in the order of `inputs`. At most `capacity` results are
+  pending (being converted or ready) at any time: the next input is only
+  submitted when a result is taken, which bounds the memory used by the ready
+  batches and applies backpressure to `inputs`, which can be infinite.
+
+  With `use_processes=True`, the conversion runs in separate processes, which
+  is not limited by the global interpreter lock, but requires `convert_fn`, the
+  inputs and the results to be picklable (e.g. a module-level function and
+  numpy graphs). Threads can also return objects that cannot be pickled, such
+  as the leases of a `utils_np.GraphsTupleBufferPool`, whose size then also
+  bounds the number of pending batches. In both cases, a
+  `utils_np.feature_dtype_policy` only applies to the conversions if it is
+  entered inside `convert_fn`, since it is local to the thread which entered
+  it.
+
+  With `shared_memory_size`, batches are transferred through a
+  `SharedMemoryRing` of `capacity + 1` segments of that size instead of being
+  pickled, and each yielded batch is a view of a segment that is only valid
+  until the next batch is requested (or the feeder is closed). Copy the batch
+  to keep it longer.
+
+  The feeder must be iterated from a single thread. It is closed when it is
+  exhausted, when a conversion raises an error (which is raised again by the
+  iterator), when `close` is called, or when exiting a `with` block. An error
+  raised by `inputs` is raised again by the iterator once the batches of the
+  previous inputs have been yielded, or by the constructor if it is raised by
+  one of the first `capacity` inputs.
+  """
+
+  def __init__(self,
+               inputs,
+               convert_fn=utils_np.data_dicts_to_graphs_tuple,
+               num_workers=1,
+               capacity=2,
+               use_processes=False,
+               shared_memory_size=None):
+    """Starts preparing the first `capacity` batches.
+
+    Args:
+      inputs: An iterable of the inputs of `convert_fn`, e.g. lists of data
+        dicts or of networkx graphs.
+      convert_fn: (callable, default=`utils_np.data_dicts_to_graphs_tuple`) The
+        function converting an input to a batch.
+      num_workers: (int, default=1) The number of worker threads or processes.
+      capacity: (int, default=2) The maximum number of pending batches.
+      use_processes: (bool, default=False) Whether the workers are processes
+        instead of threads.
+      shared_memory_size: (int, optional) If set, the batches are returned
+        through shared memory segments of this size in bytes, which must fit
+        the largest batch.
+
+    Raises:
+      ValueError: If `num_workers` or `capacity` is not positive.
+      RuntimeError: If `shared_memory_size` is set and shared memory is not
+        available.
+    """
+    if num_workers < 1:
+      raise ValueError(
+          "`num_workers` must be positive, got {}".format(num_workers))
+    if capacity < 1:
+      raise ValueError("`capacity` must be positive, got {}".format(capacity))
+    self._inputs = iter(inputs)
+    self._convert_fn = convert_fn
+    self._use_processes = use_processes
+    self._ring = None
+    self._pool = None
+    # The segment of the last yielded batch, if any.
+    self._current_segment = None
+    self._pending = collections.deque()
+    # An error raised by `inputs`, raised once the pending batches are yielded.
+    self._input_error = None
+    try:
+      if shared_memory_size is not None:
+        self._ring = SharedMemoryRing(capacity + 1, shared_memory_size)
+      if use_processes:
+        self._pool = multiprocessing.Pool(num_workers)
+      else:
+        self._pool = multiprocessing_pool.ThreadPool(num_workers)
+      for _ in range(capacity):
+        if not self._submit_next():
+          break
+    except Exception:
+      self.close()
+      raise
+
+  @property
+  def closed(self):
+    """Whether the workers have been shut down."""
+    return self._pool is None
+
+  @property
+  def num_pending(self):
+    """The number of batches being prepared or ready."""
+    return len(self._pending)
+
+  def _submit_next(self):
+    """Submits the next input, and returns whether there was one."""
+    try:
+      next_input = next(self._inputs)
+    except StopIteration:
+      return False
+    if self._ring is None:
+      self._pending.append(
+          (self._pool.apply_async(self._convert_fn, (next_input,)), None))
+    elif self._use_processes:
+      segment = self._ring.acquire()
+      self._pending.append((self._pool.apply_async(
+          _convert_into_segment,
+          (self._convert_fn, self._ring.name(segment), next_input)), segment))
+    else:
+      # Threads share the memory of the ring, and write into it directly.
+      segment = self._ring.acquire()
+      self._pending.append((self._pool.apply_async(
+          _convert_into_buffer,
+          (self._convert_fn, self._ring.buffer(segment), next_input)), segment))
+    return True
+
+  def __iter__(self):
+    return self
+
+  def __next__(self):
+    if not self._pending:
+      input_error = self._input_error
+      self.close()
+      if input_error is not None:
+        raise input_error
+      raise StopIteration
+    if self._current_segment is not None:
+      self._ring.release(self._current_segment)
+      self._current_segment = None
+    result, segment = self._pending.popleft()
+    try:
+      batch = result.get()
+      if segment is not None:
+        batch = read_graphs_tuple(batch, self._ring.buffer(segment))
+        self._current_segment = segment
+    except Exception:
+      self.close()
+      raise
+    if self._input_error is None:
+      try:
+        self._submit_next()
+      except Exception as e:  # pylint: disable=broad-except
+        # No more inputs are submitted, and the error is raised after the
+        # batches of the previous inputs, including this one.
+        self._input_error = e
+    return batch
+
+  next = __next__  # Python 2.
+
+  def close(self):
+    """Stops the workers and discards the pending batches."""
+    if self._pool is not None:
+      self._pool.terminate()
+      self._pool.join()
+      self._pool = None
+    self._pending.clear()
+    self._input_error = None
+    if self._ring is not None:
+      self._ring.close()
+      self._ring = None
+      self._current_segment = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
@@ -0,0 +1,431 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Vectorized generators of batches of synthetic graphs.
+
+The generators of this module build a `graphs.GraphsTuple` of numpy arrays for
+a whole batch of random graphs at once, without per-graph or per-edge python
+loops nor networkx, e.g. for benchmarks and load tests:
+
+  - `erdos_renyi`: each directed pair of distinct nodes is connected with a
+    given probability;
+
+  - `power_law`: the expected degrees of the nodes follow a power law
+    (Chung-Lu model), so that a few hubs send and receive most of the edges;
+
+  - `grid`: two-dimensional lattices, with edges in both directions between
+    neighboring cells;
+
+  - `molecule_like`: small sparse graphs with a bounded valence backbone and a
+    few ring closures, with bonds in both directions;
+
+  - `tree`: random recursive trees, with edges from parents to children.
+
+The number of nodes of the graphs is either an `int`, or a `(min, max)` pair
+from which the number of nodes of each graph is sampled uniformly (`max`
+excluded). The node, edge and global features are sampled from a standard
+normal distribution, with the sizes `node_size`, `edge_size` and `global_size`;
+a size of `None` yields a `None` field. Senders and receivers are `int32`.
+
+Given the same `seed`, a generator always returns the same graphs.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from graph_nets import graphs
+import numpy as np
+
+# Default size of the node, edge and global features.
+FEATURE_SIZE = 8
+
+
+def _sample_num_nodes(rng, num_graphs, num_nodes):
+  """Returns the number of nodes of each graph as an int64 array."""
+  if isinstance(num_nodes, (tuple, list)):
+    min_nodes, max_nodes = num_nodes
+    if not 0 < min_nodes < max_nodes:
+      raise ValueError(
+          "Expected 0 < min < max for the range of the number of nodes, got "
+          "{}".format(num_nodes))
+    return rng.randint(min_nodes, max_nodes, size=num_graphs).astype(np.int64)
+  if num_nodes <= 0:
+    raise ValueError(
+        "The number of nodes must be positive, got {}".format(num_nodes))
+  return np.full(num_graphs, num_nodes, dtype=np.int64)
+
+
+def _features(rng, num_rows, size, dtype):
+  if size is None:
+    return None
+  return rng.standard_normal((num_rows, size)).astype(dtype)
+
+
+def _build_graphs_tuple(rng, n_node, n_edge, senders, receivers, node_size,
+                        edge_size, global_size, dtype):
+  """Builds a batch from the sizes and the local indices of its graphs.
+
+  Args:
+    rng: The `np.random.RandomState` of the features.
+    n_node: The number of nodes of each graph.
+    n_edge: The number of edges of each graph.
+    senders: The senders of the edges of all the graphs, each indexed within
+      its graph.
+    receivers: The receivers of the edges, indexed like `senders`.
+    node_size: The size of the node features, or `None`.
+    edge_size: The size of the edge features, or `None`.
+    global_size: The size of the global features, or `None`.
+    dtype: The dtype of the features.
+
+  Returns:
+    A `graphs.GraphsTuple`.
+  """
+  offsets = np.repeat(np.cumsum(n_node) - n_node, n_edge)
+  return graphs.GraphsTuple.trusted(
+      nodes=_features(rng, int(n_node.sum()), node_size, dtype),
+      edges=_features(rng, int(n_edge.sum()), edge_size, dtype),
+      receivers=(receivers + offsets).astype(np.int32),
+      senders=(senders + offsets).astype(np.int32),
+      globals=_features(rng, len(n_node), global_size, dtype),
+      n_node=n_node.astype(np.int32),
+      n_edge=n_edge.astype(np.int32))
+
+
+def _bernoulli_positions(rng, length, probability):
+  """Returns the sorted positions of the successes of Bernoulli trials.
+
+  The gaps between successes are geometric, so the cost is proportional to the
+  number of successes rather than to the number of trials.
+
+  Args:
+    rng: A `np.random.RandomState`.
+    length: The number of trials.
+    probability: The probability of success of each trial.
+
+  Returns:
+    An int64 array of positions in `[0, length)`.
+  """
+  if probability <= 0 or length == 0:
+    return np.zeros(0, dtype=np.int64)
+  mean = length * probability
+  chunk = int(mean + 6 * np.sqrt(mean) + 16)
+  positions = np.cumsum(rng.geometric(probability, size=chunk)) - 1
+  while positions[-1] < length:
+    more = np.cumsum(rng.geometric(probability, size=chunk)) + positions[-1]
+    positions = np.concatenate([positions, more])
+  return positions[:np.searchsorted(positions, length)]
+
+
+def erdos_renyi(num_graphs,
+                num_nodes,
+                edge_probability,
+                node_size=FEATURE_SIZE,
+                edge_size=FEATURE_SIZE,
+                global_size=FEATURE_SIZE,
+                dtype=np.float32,
+                seed=None):
+  """Generates directed Erdős–Rényi graphs.
+
+  Each ordered pair of distinct nodes of a graph is connected with probability
+  `edge_probability`, independently of the others.
+
+  Args:
+    num_graphs: The number of graphs.
+    num_nodes: The number of nodes of each graph, or a `(min, max)` range.
+    edge_probability: The probability of each directed edge.
+    node_size: The size of the node features, or `None` for no node features.
+    edge_size: The size of the edge features, or `None` for no edge features.
+    global_size: The size of the global features, or `None`.
+    dtype: The dtype of the features.
+    seed: (optional) The random seed.
+
+  Returns:
+    A `graphs.GraphsTuple` of numpy arrays.
+
+  Raises:
+    ValueError: If `edge_probability` is not in [0, 1], or if `num_nodes` is
+      invalid.
+  """
+  if not 0 <= edge_probability <= 1:
+    raise ValueError("The edge probability must be in [0, 1], got {}".format(
+        edge_probability))
+  rng = np.random.RandomState(seed)
+  n_node = _sample_num_nodes(rng, num_graphs, num_nodes)
+  # Enumerates the n * (n - 1) candidate edges of each graph, and draws all
+  # the edges of the batch at once.
+  num_pairs = n_node * (n_node - 1)
+  pair_offsets = np.cumsum(num_pairs) - num_pairs
+  positions = _bernoulli_positions(rng, int(num_pairs.sum()), edge_probability)
+  graph_index = np.searchsorted(pair_offsets, positions, side="right") - 1
+  pairs = positions - pair_offsets[graph_index]
+  n_minus_one = n_node[graph_index] - 1
+  senders = pairs // n_minus_one
+  receivers = pairs % n_minus_one
+  # Skips the self edge.
+  receivers += receivers >= senders
+  n_edge = np.bincount(graph_index, minlength=num_graphs)
+  return _build_graphs_tuple(rng, n_node, n_edge, senders, receivers,
+                             node_size, edge_size, global_size, dtype)
+
+
+def power_law(num_graphs,
+              num_nodes,
+              avg_degree,
+              exponent=2.5,
+              node_size=FEATURE_SIZE,
+              edge_size=FEATURE_SIZE,
+              global_size=FEATURE_SIZE,
+              dtype=np.float32,
+              seed=None):
+  """Generates directed graphs with power-law degrees.
+
+  The senders and receivers of `avg_degree * n` edges per graph of `n` nodes
+  are drawn independently, with a probability proportional to the weight
+  `(i + 1) ** (-1 / (exponent - 1))` of node `i` (Chung-Lu model), so that the
+  tail of the degree distribution follows a power law of exponent `exponent`.
+  The graphs can have self edges and parallel edges.
+
+  Args:
+    num_graphs: The number of graphs.
+    num_nodes: The number of nodes of each graph, or a `(min, max)` range.
+    avg_degree: The average number of edges sent (and received) per node.
+    exponent: The exponent of the power law, greater than 1.
+    node_size: The size of the node features, or `None` for no node features.
+    edge_size: The size of the edge features, or `None` for no edge features.
+    global_size: The size of the global features, or `None`.
+    dtype: The dtype of the features.
+    seed: (optional) The random seed.
+
+  Returns:
+    A `graphs.GraphsTuple` of numpy arrays.
+
+  Raises:
+    ValueError: If `exponent` is not greater than 1, or if `num_nodes` is
+      invalid.
+  """
+  if exponent <= 1:
+    raise ValueError(
+        "The exponent must be greater than 1, got {}".format(exponent))
+  rng = np.random.RandomState(seed)
+  n_node = _sample_num_nodes(rng, num_graphs, num_nodes)
+  n_edge = np.round(avg_degree * n_node).astype(np.int64)
+  # The cumulative weights of the nodes of graph `g`, normalized to (0, 1] and
+  # shifted by `g`, are concatenated so that sampling the nodes of all the
+  # graphs is a single sorted search of `g + uniform(0, 1)`.
+  node_offsets = np.cumsum(n_node) - n_node
+  graph_of_node = np.repeat(np.arange(num_graphs), n_node)
+  local_index = np.arange(n_node.sum()) - node_offsets[graph_of_node]
+  weights = (local_index + 1.) ** (-1. / (exponent - 1))
+  cumulative = np.cumsum(weights)
+  totals = cumulative[node_offsets + n_node - 1]
+  previous = np.concatenate([[0.], totals[:-1]])
+  cumulative = ((cumulative - previous[graph_of_node]) /
+                (totals - previous)[graph_of_node] + graph_of_node)
+  # Guards against the rounding of the last cumulative weight of each graph.
+  cumulative[node_offsets + n_node - 1] = np.arange(1, num_graphs + 1)
+  graph_of_edge = np.repeat(np.arange(num_graphs), n_edge)
+
+  def sample_nodes():
+    targets = graph_of_edge + rng.random_sample(len(graph_of_edge))
+    return (np.searchsorted(cumulative, targets, side="right") -
+            node_offsets[graph_of_edge])
+
+  senders = sample_nodes()
+  receivers = sample_nodes()
+  return _build_graphs_tuple(rng, n_node, n_edge, senders, receivers,
+                             node_size, edge_size, global_size, dtype)
+
+
+def grid(num_graphs,
+         height,
+         width,
+         periodic=False,
+         node_size=FEATURE_SIZE,
+         edge_size=FEATURE_SIZE,
+         global_size=FEATURE_SIZE,
+         dtype=np.float32,
+         seed=None):
+  """Generates two-dimensional grid graphs.
+
+  The cell `(i, j)` is node `i * width + j`, and is connected in both
+  directions to its horizontal and vertical neighbors.
+
+  Args:
+    num_graphs: The number of graphs.
+    height: The number of rows of the grids.
+    width: The number of columns of the grids.
+    periodic: (bool, default=False) Whether the borders of the grids wrap
+      around (torus). Requires `height` and `width` greater than 2.
+    node_size: The size of the node features, or `None` for no node features.
+    edge_size: The size of the edge features, or `None` for no edge features.
+    global_size: The size of the global features, or `None`.
+    dtype: The dtype of the features.
+    seed: (optional) The random seed.
+
+  Returns:
+    A `graphs.GraphsTuple` of numpy arrays.
+
+  Raises:
+    ValueError: If the dimensions of the grids are invalid.
+  """
+  if height <= 0 or width <= 0:
+    raise ValueError("The dimensions of the grid must be positive, got "
+                     "{}x{}".format(height, width))
+  if periodic and (height <= 2 or width <= 2):
+    raise ValueError("Periodic grids must be larger than 2x2, got "
+                     "{}x{}".format(height, width))
+  rng = np.random.RandomState(seed)
+  cells = np.arange(height * width).reshape(height, width)
+  if periodic:
+    right = np.roll(cells, -1, axis=1)
+    down = np.roll(cells, -1, axis=0)
+    first = np.concatenate([cells.ravel(), cells.ravel()])
+    second = np.concatenate([right.ravel(), down.ravel()])
+  else:
+    first = np.concatenate([cells[:, :-1].ravel(), cells[:-1, :].ravel()])
+    second = np.concatenate([cells[:, 1:].ravel(), cells[1:, :].ravel()])
+  local_senders = np.concatenate([first, second])
+  local_receivers = np.concatenate([second, first])
+  n_node = np.full(num_graphs, height * width, dtype=np.int64)
+  n_edge = np.full(num_graphs, len(local_senders), dtype=np.int64)
+  return _build_graphs_tuple(
+      rng, n_node, n_edge, np.tile(local_senders, num_graphs),
+      np.tile(local_receivers, num_graphs), node_size, edge_size, global_size,
+      dtype)
+
+
+def _random_parents(rng, n_node, max_children=None):
+  """Returns the local index of the parent of each non-root node.
+
+  Node `i > 0` of each graph is attached to a uniformly random node among the
+  `max_children` nodes preceding it (or all the nodes preceding it if
+  `max_children` is `None`), so that no node has more than `max_children`
+  children.
+
+  Args:
+    rng: A `np.random.RandomState`.
+    n_node: The number of nodes of each graph.
+    max_children: (optional) The maximum number of children of a node.
+
+  Returns:
+    A pair of int64 arrays with the local indices of the children (all the
+    nodes but the roots, graph by graph) and of their parents.
+  """
+  num_children = n_node - 1
+  child_offsets = np.cumsum(num_children) - num_children
+  graph_of_child = np.repeat(np.arange(len(n_node)), num_children)
+  children = (np.arange(num_children.sum()) - child_offsets[graph_of_child] +
+              1)
+  if max_children is None:
+    num_candidates = children
+  else:
+    num_candidates = np.minimum(children, max_children)
+  parents = children - 1 - (rng.random_sample(len(children)) *
+                            num_candidates).astype(np.int64)
+  return children, parents
+
+
+def tree(num_graphs,
+         num_nodes,
+         node_size=FEATURE_SIZE,
+         edge_size=FEATURE_SIZE,
+         global_size=FEATURE_SIZE,
+         dtype=np.float32,
+         seed=None):
+  """Generates random recursive trees.
+
+  Node 0 is the root of each tree, and each node `i > 0` is a child of a
+  uniformly random node `j < i`. Edges go from parents to children.
+
+  Args:
+    num_graphs: The number of graphs.
+    num_nodes: The number of nodes of each graph, or a `(min, max)` range.
+    node_size: The size of the node features, or `None` for no node features.
+    edge_size: The size of the edge features, or `None` for no edge features.
+    global_size: The size of the global features, or `None`.
+    dtype: The dtype of the features.
+    seed: (optional) The random seed.
+
+  Returns:
+    A `graphs.GraphsTuple` of numpy arrays.
+
+  Raises:
+    ValueError: If `num_nodes` is invalid.
+  """
+  rng = np.random.RandomState(seed)
+  n_node = _sample_num_nodes(rng, num_graphs, num_nodes)
+  children, parents = _random_parents(rng, n_node)
+  return _build_graphs_tuple(rng, n_node, n_node - 1, parents, children,
+                             node_size, edge_size, global_size, dtype)
+
+
+def molecule_like(num_graphs,
+                  num_nodes=(10, 40),
+                  ring_probability=0.1,
+                  ring_size=6,
+                  node_size=FEATURE_SIZE,
+                  edge_size=FEATURE_SIZE,
+                  global_size=FEATURE_SIZE,
+                  dtype=np.float32,
+                  seed=None):
+  """Generates small sparse graphs resembling molecules.
+
+  The backbone of each graph is a random tree in which each node has at most
+  three children, i.e. a degree of at most four. Each node `i` is also bonded
+  to node `i - ring_size + 1` with probability `ring_probability`, closing a
+  ring. Each bond is represented by an edge in each direction.
+
+  Args:
+    num_graphs: The number of graphs.
+    num_nodes: The number of nodes (atoms) of each graph, or a `(min, max)`
+      range.
+    ring_probability: The probability of closing a ring at each node.
+    ring_size: The size of the rings.
+    node_size: The size of the node features, or `None` for no node features.
+    edge_size: The size of the edge features, or `None` for no edge features.
+    global_size: The size of the global features, or `None`.
+    dtype: The dtype of the features.
+    seed: (optional) The random seed.
+
+  Returns:
+    A `graphs.GraphsTuple` of numpy arrays.
+
+  Raises:
+    ValueError: If `ring_size` is smaller than 3, or if `num_nodes` is
+      invalid.
+  """
+  if ring_size < 3:
+    raise ValueError("Rings must have at least 3 nodes, got {}".format(
+        ring_size))
+  rng = np.random.RandomState(seed)
+  n_node = _sample_num_nodes(rng, num_graphs, num_nodes)
+  children, parents = _random_parents(rng, n_node, max_children=3)
+  is_ring = (children >= ring_size - 1) & (
+      rng.random_sample(len(children)) < ring_probability)
+  first = np.concatenate([parents, children[is_ring]])
+  second = np.concatenate([children, children[is_ring] - ring_size + 1])
+  # Sorts the bonds by graph: the tree bonds and the ring bonds of a graph are
+  # interleaved with those of the other graphs in `first` and `second`.
+  graph_of_child = np.repeat(np.arange(num_graphs), n_node - 1)
+  graph_of_bond = np.concatenate([graph_of_child, graph_of_child[is_ring]])
+  order = np.argsort(graph_of_bond, kind="stable")
+  first, second, graph_of_bond = (
+      first[order], second[order], graph_of_bond[order])
+  num_bonds = np.bincount(graph_of_bond, minlength=num_graphs)
+  # Each bond yields an edge in each direction, next to each other.
+  senders = np.stack([first, second], axis=1).ravel()
+  receivers = np.stack([second, first], axis=1).ravel()
+  return _build_graphs_tuple(rng, n_node, 2 * num_bonds, senders, receivers,
+                             node_size, edge_size, global_size, dtype)
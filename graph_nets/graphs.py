@@ -97,12 +97,41 @@ definition of a graph given above, namely:
   - if RECEIVERS and SENDERS are `None`, then `EDGES` must be `None`.
 
 Those assumptions are checked both upon initialization and when replacing a
-field by calling the `replace` or `map` method.
+field by calling the `replace` or `map` method. These checks can be disabled
+globally with `set_validation(False)`, or within a `validation(False)` context,
+and `GraphsTuple.trusted` builds an instance without checking it.
+
+The `DenseGraphsTuple` class represents the same batch of graphs padded to a
+common number of nodes, together with adjacency and node masks, which is
+better suited to batches of small graphs.
+
+The `BipartiteGraphsTuple` class represents bipartite graphs, whose nodes are
+split into LEFT_NODES and RIGHT_NODES, with edges sent by left nodes and
+received by right nodes. Its SENDERS index into the LEFT_NODES, and its
+RECEIVERS into the RIGHT_NODES, with separate offsets.
+
+The `TypedGraphsTuple` class represents heterogeneous graphs, whose nodes and
+edges have several types with different feature shapes. It has the same fields
+as `GraphsTuple`, all of which but GLOBALS hold a dictionary keyed by node type
+(NODES, N_NODE) or by edge type (EDGES, SENDERS, RECEIVERS, N_EDGE). An edge
+type is a `(sender_node_type, relation, receiver_node_type)` tuple, and the
+SENDERS (resp. RECEIVERS) of an edge type index into the NODES of its sender
+(resp. receiver) node type.
+
+A spec of a batch of graphs is a `GraphsTuple` of `FieldSpec`s, which hold the
+dtype and trailing shape (i.e. the shape of a single node, edge, or graph) of
+each field, and whether it is sparse. It describes graphs without holding any
+data, can be stored as JSON with `spec_to_json` and `spec_from_json`, and is
+used by `utils_tf` to build placeholders and `tf.TensorSpec`s. The specs of
+numpy graphs are inferred with `utils_np.spec_from_data_dict` and
+`utils_np.spec_from_graphs_tuple`.
 """
 
 from __future__ import absolute_import, division, print_function
 
 import collections
+import contextlib
+import json
 
 NODES = "nodes"
 EDGES = "edges"
@@ -118,6 +147,123 @@ GRAPH_DATA_FIELDS = (NODES, EDGES, RECEIVERS, SENDERS, GLOBALS)
 GRAPH_NUMBER_FIELDS = (N_NODE, N_EDGE)
 ALL_FIELDS = (NODES, EDGES, RECEIVERS, SENDERS, GLOBALS, N_NODE, N_EDGE)
 
+ADJACENCY = "adjacency"
+NODE_MASK = "node_mask"
+
+DENSE_MASK_FIELDS = (ADJACENCY, NODE_MASK)
+
+LEFT_NODES = "left_nodes"
+RIGHT_NODES = "right_nodes"
+N_LEFT_NODES = "n_left_nodes"
+N_RIGHT_NODES = "n_right_nodes"
+
+BIPARTITE_GRAPH_FEATURE_FIELDS = (LEFT_NODES, RIGHT_NODES, EDGES, GLOBALS)
+BIPARTITE_GRAPH_DATA_FIELDS = (LEFT_NODES, RIGHT_NODES, EDGES, GLOBALS,
+                               SENDERS, RECEIVERS)
+BIPARTITE_GRAPH_NUMBER_FIELDS = (N_LEFT_NODES, N_RIGHT_NODES, N_EDGE)
+BIPARTITE_ALL_FIELDS = (BIPARTITE_GRAPH_DATA_FIELDS +
+                        BIPARTITE_GRAPH_NUMBER_FIELDS)
+
+# Whether the `None` fields of the graphs are validated upon construction and
+# in `replace` and `map`.
+_validation_enabled = True
+
+
+def set_validation(enabled):
+  """Enables or disables the validation of the `None` fields of graphs.
+
+  Args:
+    enabled: (bool) Whether `GraphsTuple` and `DenseGraphsTuple` instances
+      validate their `None` fields upon construction and in `replace` and
+      `map`.
+  """
+  global _validation_enabled
+  _validation_enabled = bool(enabled)
+
+
+def is_validation_enabled():
+  """Returns whether the `None` fields of graphs are validated."""
+  return _validation_enabled
+
+
+@contextlib.contextmanager
+def validation(enabled):
+  """Enables or disables the validation of `None` fields within the context.
+
+  This changes the module-wide setting (see `set_validation`), which is
+  restored when exiting the context.
+
+  Args:
+    enabled: (bool) Whether to validate `None` fields in the context.
+
+  Yields:
+    `None`.
+  """
+  previously_enabled = _validation_enabled
+  set_validation(enabled)
+  try:
+    yield
+  finally:
+    set_validation(previously_enabled)
+
+
+def _replace_fields(graph, fields):
+  """Returns a copy of the namedtuple `graph` with `fields` replaced.
+
+  This is a faster version of `namedtuple._replace`, which bypasses `__init__`
+  and only validates the `None` fields of the output if validation is enabled.
+
+  Args:
+    graph: A `GraphsTuple`, `DenseGraphsTuple`, `BipartiteGraphsTuple` or
+      `TypedGraphsTuple`.
+    fields: A dictionary from field names to new values.
+
+  Returns:
+    A copy of `graph` of the same type.
+
+  Raises:
+    ValueError: If `fields` contains an unknown field, or if the output has
+      invalid `None` fields.
+  """
+  values = list(graph)
+  field_indices = graph._field_indices  # pylint: disable=protected-access
+  for field, value in fields.items():
+    try:
+      values[field_indices[field]] = value
+    except KeyError:
+      raise ValueError("Got unexpected field name: {!r}".format(field))
+  output = tuple.__new__(type(graph), values)
+  if _validation_enabled:
+    output._validate_none_fields()  # pylint: disable=protected-access
+  return output
+
+
+def _map_fields(graph, field_fn, fields):
+  """Implementation of the `map` method of the graphs namedtuples.
+
+  `field_fn` is applied once to the original value of each distinct field of
+  `fields`, even if a field is repeated.
+
+  Raises:
+    ValueError: If `fields` contains an unknown field, or if the output has
+      invalid `None` fields.
+  """
+  values = list(graph)
+  field_indices = graph._field_indices  # pylint: disable=protected-access
+  mapped_indices = set()
+  for field in fields:
+    try:
+      index = field_indices[field]
+    except KeyError:
+      raise ValueError("Got unexpected field name: {!r}".format(field))
+    if index not in mapped_indices:
+      mapped_indices.add(index)
+      values[index] = field_fn(graph[index])
+  output = tuple.__new__(type(graph), values)
+  if _validation_enabled:
+    output._validate_none_fields()  # pylint: disable=protected-access
+  return output
+
 
 class GraphsTuple(
     collections.namedtuple("GraphsTuple",
@@ -141,8 +287,22 @@ class GraphsTuple(
   `n_edge` are arbitrary, but are typically numpy arrays, tensors, or `None`;
   see module's documentation for a more detailed description of which fields
   can be left `None`.
+
+  `GraphsTuple.trusted` builds an instance without validating it, which is
+  faster when the fields are known to be valid.
   """
 
+  _field_indices = {
+      field: i for i, field in enumerate(GRAPH_DATA_FIELDS +
+                                         GRAPH_NUMBER_FIELDS)}
+
+  @classmethod
+  def trusted(cls, nodes, edges, receivers, senders, globals,  # pylint: disable=redefined-builtin
+              n_node, n_edge):
+    """Builds a `GraphsTuple` without validating its `None` fields."""
+    return tuple.__new__(
+        cls, (nodes, edges, receivers, senders, globals, n_node, n_edge))
+
   def _validate_none_fields(self):
     """Asserts that the set of `None` fields in the instance is valid."""
     if self.n_node is None:
@@ -165,20 +325,97 @@ class GraphsTuple(
     # The fields of a `namedtuple` are filled in the `__new__` method.
     # `__init__` does not accept parameters.
     super(GraphsTuple, self).__init__()
-    self._validate_none_fields()
+    if _validation_enabled:
+      self._validate_none_fields()
 
   def replace(self, **kwargs):
-    output = self._replace(**kwargs)
-    output._validate_none_fields()  # pylint: disable=protected-access
-    return output
+    return _replace_fields(self, kwargs)
 
   def map(self, field_fn, fields=GRAPH_FEATURE_FIELDS):
     """Applies `field_fn` to the fields `fields` of the instance.
 
-    `field_fn` is applied exactly once per field in `fields`. The result must
-    satisfy the `GraphsTuple` requirement w.r.t. `None` fields, i.e. the
-      `SENDERS` cannot be `None` if the `EDGES` or `RECEIVERS` are not `None`,
-    etc.
+    `field_fn` is applied exactly once per distinct field in `fields`, to its
+    original value. The result must satisfy the `GraphsTuple` requirement
+    w.r.t. `None` fields, i.e. the `SENDERS` cannot be `None` if the `EDGES`
+    or `RECEIVERS` are not `None`, etc.
+
+    Args:
+      field_fn: A callable that take a single argument.
+      fields: (iterable of `str`). An iterable of the fields to apply
+        `field_fn` to.
+
+    Returns:
+      A copy of the instance, with the fields in `fields` replaced by the result
+      of applying `field_fn` to them.
+
+    Raises:
+      ValueError: If `fields` contains an unknown field.
+    """
+    return _map_fields(self, field_fn, fields)
+
+
+class DenseGraphsTuple(
+    collections.namedtuple("DenseGraphsTuple",
+                           GRAPH_FEATURE_FIELDS + DENSE_MASK_FIELDS +
+                           (N_NODE,))):
+  """Default namedtuple describing graphs as padded dense tensors.
+
+  For batches of small graphs (typically a few tens of nodes per graph), it is
+  often faster to pad every graph to the same number of nodes `max_n_node` and
+  to use dense batched operations than to gather and scatter along the edges.
+
+  An instance of this class can be constructed as
+  ```
+  DenseGraphsTuple(nodes=nodes,
+                   edges=edges,
+                   globals=globals,
+                   adjacency=adjacency,
+                   node_mask=node_mask,
+                   n_node=n_node)
+  ```
+  where:
+    - `nodes` has shape `[n_graphs, max_n_node] + node_shape`, or is `None`;
+    - `edges` has shape `[n_graphs, max_n_node, max_n_node] + edge_shape`, or
+      is `None`. `edges[b, r, s]` holds the features of the edge sent by node
+      `s` and received by node `r` in the b-th graph;
+    - `globals` has shape `[n_graphs] + global_shape`, or is `None`;
+    - `adjacency` is a boolean tensor of shape
+      `[n_graphs, max_n_node, max_n_node]` such that `adjacency[b, r, s]`
+      indicates whether the b-th graph has an edge from `s` to `r`;
+    - `node_mask` is a boolean tensor of shape `[n_graphs, max_n_node]`
+      indicating which nodes are not padding;
+    - `n_node` is the number of nodes per graph, with shape `[n_graphs]`.
+
+  Graphs with several edges between the same pair of nodes cannot be
+  represented in this format.
+
+  See `utils_tf.graphs_tuple_to_dense` and `utils_tf.dense_to_graphs_tuple` to
+  convert from and to `GraphsTuple`.
+  """
+
+  _field_indices = {
+      field: i for i, field in enumerate(GRAPH_FEATURE_FIELDS +
+                                         DENSE_MASK_FIELDS + (N_NODE,))}
+
+  def _validate_none_fields(self):
+    """Asserts that the set of `None` fields in the instance is valid."""
+    for field in DENSE_MASK_FIELDS + (N_NODE,):
+      if getattr(self, field) is None:
+        raise ValueError("Field `{}` cannot be None".format(field))
+
+  def __init__(self, *args, **kwargs):
+    del args, kwargs
+    # The fields of a `namedtuple` are filled in the `__new__` method.
+    # `__init__` does not accept parameters.
+    super(DenseGraphsTuple, self).__init__()
+    if _validation_enabled:
+      self._validate_none_fields()
+
+  def replace(self, **kwargs):
+    return _replace_fields(self, kwargs)
+
+  def map(self, field_fn, fields=GRAPH_FEATURE_FIELDS):
+    """Applies `field_fn` to the fields `fields` of the instance.
 
     Args:
       field_fn: A callable that take a single argument.
@@ -188,21 +425,242 @@ class GraphsTuple(
     Returns:
       A copy of the instance, with the fields in `fields` replaced by the result
       of applying `field_fn` to them.
+
+    Raises:
+      ValueError: If `fields` contains an unknown field.
     """
-    return self.replace(**{k: field_fn(getattr(self, k)) for k in fields})
+    return _map_fields(self, field_fn, fields)
 
 
 class BipartiteGraphsTuple(
-    collections.namedtuple('BipartiteGraphsTuple', [
-        'left_nodes', 'right_nodes', 'edges', 'globals', 'senders',
-        'receivers', 'n_left_nodes', 'n_right_nodes', 'n_edge'
-    ])):
+    collections.namedtuple("BipartiteGraphsTuple", BIPARTITE_ALL_FIELDS)):
+  """Default namedtuple describing bipartite graphs.
+
+  An instance of this class can be constructed as
+  ```
+  BipartiteGraphsTuple(left_nodes=left_nodes,
+                       right_nodes=right_nodes,
+                       edges=edges,
+                       globals=globals,
+                       senders=senders,
+                       receivers=receivers,
+                       n_left_nodes=n_left_nodes,
+                       n_right_nodes=n_right_nodes,
+                       n_edge=n_edge)
+  ```
+  where:
+    - `left_nodes` (resp. `right_nodes`) has shape
+      `[sum(n_left_nodes)] + left_node_shape` (resp.
+      `[sum(n_right_nodes)] + right_node_shape`), or is `None`;
+    - `edges` has shape `[sum(n_edge)] + edge_shape`, or is `None`;
+    - `globals` has shape `[n_graphs] + global_shape`, or is `None`;
+    - `senders` is a vector of shape `[sum(n_edge)]` of indices into
+      `left_nodes`, offset by the number of left nodes of the previous graphs;
+    - `receivers` is a vector of shape `[sum(n_edge)]` of indices into
+      `right_nodes`, offset by the number of right nodes of the previous
+      graphs;
+    - `n_left_nodes`, `n_right_nodes` and `n_edge` have shape `[n_graphs]`.
+
+  The `None` fields are validated as for `GraphsTuple`: the number fields
+  cannot be `None`, the `SENDERS` and `RECEIVERS` are either both `None` or
+  both defined, and the `EDGES` must be `None` if they are.
+  """
+
+  _field_indices = {
+      field: i for i, field in enumerate(BIPARTITE_ALL_FIELDS)}
+
+  def _validate_none_fields(self):
+    """Asserts that the set of `None` fields in the instance is valid."""
+    for field in BIPARTITE_GRAPH_NUMBER_FIELDS:
+      if getattr(self, field) is None:
+        raise ValueError("Field `{}` cannot be None".format(field))
+    if self.receivers is None and self.senders is not None:
+      raise ValueError(
+          "Field `senders` must be None as field `receivers` is None")
+    if self.senders is None and self.receivers is not None:
+      raise ValueError(
+          "Field `receivers` must be None as field `senders` is None")
+    if self.receivers is None and self.edges is not None:
+      raise ValueError(
+          "Field `edges` must be None as field `receivers` and `senders` are "
+          "None")
+
+  def __init__(self, *args, **kwargs):
+    del args, kwargs
+    # The fields of a `namedtuple` are filled in the `__new__` method.
+    # `__init__` does not accept parameters.
+    super(BipartiteGraphsTuple, self).__init__()
+    if _validation_enabled:
+      self._validate_none_fields()
+
+  def replace(self, **kwargs):
+    return _replace_fields(self, kwargs)
+
+  def map(self, field_fn, fields=None):
+    """Applies `field_fn` to the fields `fields` of the instance.
+
+    Args:
+      field_fn: A callable that take a single argument.
+      fields: (iterable of `str`, optional). An iterable of the fields to apply
+        `field_fn` to. Defaults to all the fields.
+
+    Returns:
+      A copy of the instance, with the fields in `fields` replaced by the result
+      of applying `field_fn` to them.
+
+    Raises:
+      ValueError: If `fields` contains an unknown field.
+    """
+    if fields is None:
+      fields = self._fields
+    return _map_fields(self, field_fn, fields)
+
+
+class TypedGraphsTuple(
+    collections.namedtuple("TypedGraphsTuple",
+                           GRAPH_DATA_FIELDS + GRAPH_NUMBER_FIELDS)):
+  """Default namedtuple describing heterogeneous (typed) graphs.
+
+  An instance of this class can be constructed as
+  ```
+  TypedGraphsTuple(nodes={"atom": atoms, "bond": bonds},
+                   edges={("atom", "in", "bond"): edges},
+                   globals=globals,
+                   receivers={("atom", "in", "bond"): receivers},
+                   senders={("atom", "in", "bond"): senders},
+                   n_node={"atom": n_atom, "bond": n_bond},
+                   n_edge={("atom", "in", "bond"): n_edge})
+  ```
+  where, for each node type `t`, `nodes[t]` has shape
+  `[sum(n_node[t])] + node_shape[t]`, and for each edge type
+  `e = (s, r, t)`, `edges[e]` has shape `[sum(n_edge[e])] + edge_shape[e]`,
+  `senders[e]` indexes into `nodes[s]` and `receivers[e]` into `nodes[t]`,
+  with per-type offsets. `globals` has shape `[n_graphs] + global_shape`.
+
+  The `None` fields are validated as for `GraphsTuple`. In addition, the
+  NODES must have the node types of N_NODE, the EDGES, SENDERS and RECEIVERS
+  must have the edge types of N_EDGE, and the edge types must be triplets of
+  known node types.
+  """
+
+  _field_indices = {
+      field: i for i, field in enumerate(GRAPH_DATA_FIELDS +
+                                         GRAPH_NUMBER_FIELDS)}
+
+  def _validate_none_fields(self):
+    """Asserts that the `None` fields and the types of the instance are valid."""
+    if self.n_node is None:
+      raise ValueError("Field `n_node` cannot be None")
+    if self.n_edge is None:
+      raise ValueError("Field `n_edge` cannot be None")
+    if self.receivers is None and self.senders is not None:
+      raise ValueError(
+          "Field `senders` must be None as field `receivers` is None")
+    if self.senders is None and self.receivers is not None:
+      raise ValueError(
+          "Field `receivers` must be None as field `senders` is None")
+    if self.receivers is None and self.edges is not None:
+      raise ValueError(
+          "Field `edges` must be None as field `receivers` and `senders` are "
+          "None")
+    node_types = set(self.n_node)
+    if self.nodes is not None and set(self.nodes) != node_types:
+      raise ValueError(
+          "Field `nodes` has node types {} but field `n_node` has node types "
+          "{}".format(sorted(self.nodes), sorted(node_types)))
+    edge_types = set(self.n_edge)
+    for field in (EDGES, SENDERS, RECEIVERS):
+      value = getattr(self, field)
+      if value is not None and set(value) != edge_types:
+        raise ValueError(
+            "Field `{}` has edge types {} but field `n_edge` has edge types "
+            "{}".format(field, sorted(value), sorted(edge_types)))
+    for edge_type in edge_types:
+      if (not isinstance(edge_type, tuple) or len(edge_type) != 3 or
+          edge_type[0] not in node_types or edge_type[2] not in node_types):
+        raise ValueError(
+            "Edge type {!r} is not a (sender_node_type, relation, "
+            "receiver_node_type) tuple of known node types".format(edge_type))
+
+  def __init__(self, *args, **kwargs):
+    del args, kwargs
+    # The fields of a `namedtuple` are filled in the `__new__` method.
+    # `__init__` does not accept parameters.
+    super(TypedGraphsTuple, self).__init__()
+    if _validation_enabled:
+      self._validate_none_fields()
+
+  @property
+  def node_types(self):
+    """The sorted node types of the graphs."""
+    return sorted(self.n_node)
+
+  @property
+  def edge_types(self):
+    """The sorted `(sender_node_type, relation, receiver_node_type)` tuples."""
+    return sorted(self.n_edge)
 
   def replace(self, **kwargs):
-    output = self._replace(**kwargs)
-    return output
+    return _replace_fields(self, kwargs)
 
-  def map(self, field_fn):
-    return self.replace(
-        **{k: field_fn(getattr(self, k))
-           for k in self._fields})
+  def map(self, field_fn, fields=GRAPH_FEATURE_FIELDS):
+    """Applies `field_fn` to the fields `fields` of the instance.
+
+    Args:
+      field_fn: A callable that take a single argument. Except for `GLOBALS`,
+        it is called with a whole field, i.e. a dictionary of per-type values.
+      fields: (iterable of `str`). An iterable of the fields to apply
+        `field_fn` to.
+
+    Returns:
+      A copy of the instance, with the fields in `fields` replaced by the result
+      of applying `field_fn` to them.
+
+    Raises:
+      ValueError: If `fields` contains an unknown field.
+    """
+    return _map_fields(self, field_fn, fields)
+
+
+class FieldSpec(collections.namedtuple("FieldSpec",
+                                       ["dtype", "shape", "sparse"])):
+  """The dtype and trailing shape of a field of a batch of graphs.
+
+  `dtype` is the name of a numpy dtype (e.g. "float32"), `shape` is a tuple of
+  integers describing a single node, edge or graph (e.g. `()` for the
+  SENDERS), and `sparse` is whether the field is a sparse matrix.
+  """
+
+  def __new__(cls, dtype, shape, sparse=False):
+    return super(FieldSpec, cls).__new__(
+        cls, str(dtype), tuple(int(dim) for dim in shape), bool(sparse))
+
+
+def spec_to_json(spec):
+  """Serializes a `GraphsTuple` of `FieldSpec`s to a JSON string."""
+  return json.dumps(
+      {field: None if field_spec is None else field_spec._asdict()
+       for field, field_spec in zip(spec._fields, spec)},
+      sort_keys=True)
+
+
+def spec_from_json(string):
+  """Deserializes a `GraphsTuple` of `FieldSpec`s from `spec_to_json`.
+
+  Args:
+    string: The JSON string.
+
+  Returns:
+    A `GraphsTuple` of `FieldSpec`s or `None`s.
+
+  Raises:
+    ValueError: If the JSON object does not have exactly the fields of a
+      `GraphsTuple`.
+  """
+  dct = json.loads(string)
+  if set(dct) != set(ALL_FIELDS):
+    raise ValueError("Expected a spec with fields {}, got {}".format(
+        sorted(ALL_FIELDS), sorted(dct)))
+  return GraphsTuple(**{
+      field: None if value is None else FieldSpec(**value)
+      for field, value in dct.items()})
@@ -0,0 +1,357 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Inference of trained graph networks with numpy only.
+
+Small models can be served on CPU without Tensorflow: `export_tf.export`
+converts a trained stack of blocks and modules to a description of its
+structure and weights, which can be saved and loaded with `save` and `load`,
+and `build` compiles it to a function from numpy `graphs.GraphsTuple`s to numpy
+`graphs.GraphsTuple`s:
+
+```
+description = export_tf.export(graph_network, sess)
+inference_np.save(description, path)
+
+# In the serving process, which does not need to import Tensorflow.
+model = inference_np.build(inference_np.load(path))
+output_graph = model(utils_np.data_dicts_to_graphs_tuple(data_dicts))
+```
+
+A description is a dictionary with a "type" key, and numpy arrays for the
+weights. The graph-level types are:
+
+  - "edge_block", "node_block" and "global_block": the blocks of `blocks.py`,
+    with their `use_*` options, the names of their reducers (one of
+    `REDUCERS`) and the description of their "model";
+
+  - "graph_independent": a `modules.GraphIndependent`, with an "edge_model",
+    "node_model" and "global_model" (`None` for the identity);
+
+  - "sequential": a list of "layers" applied in order, e.g. the blocks of a
+    `modules.GraphNetwork`.
+
+The models of the blocks are described with the types:
+
+  - "linear": a "w" matrix and a "b" bias (or `None`);
+
+  - "activation": an elementwise "function", one of `ACTIVATIONS`;
+
+  - "layer_norm": a layer normalization over all the axes but the first, with
+    "gamma" and "beta" (or `None`) and an "eps";
+
+  - "sequential": a list of "layers", e.g. the linear layers and activations of
+    a `snt.nets.MLP`.
+
+The blocks have the same broadcast, concatenation and reduction semantics as
+their Tensorflow counterparts. The reductions are computed over sorted
+segments with `ufunc.reduceat`, the edges being sorted by receiver (or sender)
+once per block.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+
+from graph_nets import graphs
+import numpy as np
+
+SUM = "sum"
+MEAN = "mean"
+MAX = "max"
+MIN = "min"
+
+REDUCERS = (SUM, MEAN, MAX, MIN)
+
+ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "relu6": lambda x: np.clip(x, 0, 6),
+    "elu": lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "softplus": lambda x: np.logaddexp(x, 0).astype(x.dtype),
+}
+
+_UFUNCS = {SUM: np.add, MEAN: np.add, MAX: np.maximum, MIN: np.minimum}
+
+# Key under which the structure of a description is saved.
+_DESCRIPTION_KEY = "__description__"
+
+
+def segment_reduce(values, counts, reducer=SUM):
+  """Reduces consecutive segments of rows.
+
+  Args:
+    values: An array of shape `[sum(counts)] + feature_shape`.
+    counts: A 1D integer array of the number of rows of each segment.
+    reducer: (default=`SUM`) One of `REDUCERS`. Empty segments are reduced to
+      zeros, as with `blocks.unsorted_segment_max_or_zero`.
+
+  Returns:
+    An array of shape `[len(counts)] + feature_shape`.
+
+  Raises:
+    ValueError: If `reducer` is not one of `REDUCERS`.
+  """
+  if reducer not in REDUCERS:
+    raise ValueError("Unknown reducer {!r}, expected one of {}".format(
+        reducer, REDUCERS))
+  counts = np.asarray(counts)
+  output = np.zeros((len(counts),) + values.shape[1:], dtype=values.dtype)
+  non_empty = counts > 0
+  if not np.any(non_empty):
+    return output
+  # The segment of each non-empty start ends at the next non-empty start.
+  starts = (np.cumsum(counts) - counts)[non_empty]
+  output[non_empty] = _UFUNCS[reducer].reduceat(values, starts, axis=0)
+  if reducer == MEAN:
+    output[non_empty] /= counts[non_empty].reshape(
+        [-1] + [1] * (values.ndim - 1)).astype(values.dtype)
+  return output
+
+
+def unsorted_segment_reduce(values, segment_ids, num_segments, reducer=SUM):
+  """Reduces rows by segment, like `tf.unsorted_segment_sum`.
+
+  Args:
+    values: An array whose first dimension has the length of `segment_ids`.
+    segment_ids: A 1D integer array of the segment of each row.
+    num_segments: The number of segments.
+    reducer: (default=`SUM`) One of `REDUCERS`.
+
+  Returns:
+    An array of shape `[num_segments] + values.shape[1:]`.
+  """
+  order = np.argsort(segment_ids, kind="stable")
+  counts = np.bincount(segment_ids, minlength=num_segments)
+  return segment_reduce(values[order], counts, reducer)
+
+
+def _build_model(description):
+  """Compiles the description of a model to a function of an array."""
+  if description is None:
+    return lambda x: x
+  type_ = description["type"]
+  if type_ == "sequential":
+    layers = [_build_model(layer) for layer in description["layers"]]
+
+    def apply_layers(inputs):
+      for layer in layers:
+        inputs = layer(inputs)
+      return inputs
+    return apply_layers
+  if type_ == "linear":
+    w, b = description["w"], description["b"]
+    if b is None:
+      return lambda x: np.matmul(x, w)
+    return lambda x: np.matmul(x, w) + b
+  if type_ == "activation":
+    if description["function"] not in ACTIVATIONS:
+      raise ValueError("Unknown activation {!r}, expected one of {}".format(
+          description["function"], sorted(ACTIVATIONS)))
+    return ACTIVATIONS[description["function"]]
+  if type_ == "layer_norm":
+    gamma, beta = description["gamma"], description["beta"]
+    eps = description["eps"]
+
+    def layer_norm(inputs):
+      axes = tuple(range(1, inputs.ndim))
+      mean = np.mean(inputs, axis=axes, keepdims=True)
+      variance = np.mean(np.square(inputs - mean), axis=axes, keepdims=True)
+      scale = 1 / np.sqrt(variance + eps)
+      if gamma is not None:
+        scale = scale * gamma
+      outputs = (inputs - mean) * scale
+      if beta is not None:
+        outputs += beta
+      return outputs
+    return layer_norm
+  raise ValueError("Unknown model type {!r}".format(type_))
+
+
+def _edge_block(description):
+  """Compiles the description of a `blocks.EdgeBlock`."""
+  model = _build_model(description["model"])
+
+  def apply_block(graph):
+    edges_to_collect = []
+    if description["use_edges"]:
+      edges_to_collect.append(graph.edges)
+    if description["use_receiver_nodes"]:
+      edges_to_collect.append(graph.nodes[graph.receivers])
+    if description["use_sender_nodes"]:
+      edges_to_collect.append(graph.nodes[graph.senders])
+    if description["use_globals"]:
+      edges_to_collect.append(np.repeat(graph.globals, graph.n_edge, axis=0))
+    return graph.replace(
+        edges=model(np.concatenate(edges_to_collect, axis=-1)))
+  return apply_block
+
+
+def _node_block(description):
+  """Compiles the description of a `blocks.NodeBlock`."""
+  model = _build_model(description["model"])
+
+  def apply_block(graph):
+    nodes_to_collect = []
+    num_nodes = int(np.sum(graph.n_node))
+    if description["use_received_edges"]:
+      nodes_to_collect.append(unsorted_segment_reduce(
+          graph.edges, graph.receivers, num_nodes,
+          description["received_edges_reducer"]))
+    if description["use_sent_edges"]:
+      nodes_to_collect.append(unsorted_segment_reduce(
+          graph.edges, graph.senders, num_nodes,
+          description["sent_edges_reducer"]))
+    if description["use_nodes"]:
+      nodes_to_collect.append(graph.nodes)
+    if description["use_globals"]:
+      nodes_to_collect.append(np.repeat(graph.globals, graph.n_node, axis=0))
+    return graph.replace(
+        nodes=model(np.concatenate(nodes_to_collect, axis=-1)))
+  return apply_block
+
+
+def _global_block(description):
+  """Compiles the description of a `blocks.GlobalBlock`."""
+  model = _build_model(description["model"])
+
+  def apply_block(graph):
+    globals_to_collect = []
+    if description["use_edges"]:
+      globals_to_collect.append(segment_reduce(
+          graph.edges, graph.n_edge, description["edges_reducer"]))
+    if description["use_nodes"]:
+      globals_to_collect.append(segment_reduce(
+          graph.nodes, graph.n_node, description["nodes_reducer"]))
+    if description["use_globals"]:
+      globals_to_collect.append(graph.globals)
+    return graph.replace(
+        globals=model(np.concatenate(globals_to_collect, axis=-1)))
+  return apply_block
+
+
+def _graph_independent(description):
+  """Compiles the description of a `modules.GraphIndependent`."""
+  models = {field: _build_model(description[model_key])
+            for field, model_key in ((graphs.EDGES, "edge_model"),
+                                     (graphs.NODES, "node_model"),
+                                     (graphs.GLOBALS, "global_model"))}
+
+  def apply_module(graph):
+    return graph.replace(**{
+        field: None if getattr(graph, field) is None else model(
+            getattr(graph, field))
+        for field, model in models.items()})
+  return apply_module
+
+
+_GRAPH_MODULES = {
+    "edge_block": _edge_block,
+    "node_block": _node_block,
+    "global_block": _global_block,
+    "graph_independent": _graph_independent,
+}
+
+
+def build(description):
+  """Compiles a description returned by `export_tf.export` or `load`.
+
+  Args:
+    description: The description of a graph module (see the module
+      documentation).
+
+  Returns:
+    A function mapping a `graphs.GraphsTuple` of numpy arrays to the output
+    `graphs.GraphsTuple` of the module.
+
+  Raises:
+    ValueError: If the description contains an unknown type, activation or
+      reducer.
+  """
+  type_ = description["type"]
+  if type_ == "sequential":
+    modules = [build(layer) for layer in description["layers"]]
+
+    def apply_modules(graph):
+      for module in modules:
+        graph = module(graph)
+      return graph
+    return apply_modules
+  if type_ not in _GRAPH_MODULES:
+    raise ValueError(
+        "Unknown graph module type {!r}, expected one of {}".format(
+            type_, ["sequential"] + sorted(_GRAPH_MODULES)))
+  for key in ("received_edges_reducer", "sent_edges_reducer", "edges_reducer",
+              "nodes_reducer"):
+    if description.get(key) not in REDUCERS + (None,):
+      raise ValueError("Unknown reducer {!r}, expected one of {}".format(
+          description[key], REDUCERS))
+  return _GRAPH_MODULES[type_](description)
+
+
+def _split_arrays(description, arrays):
+  """Replaces the arrays of a description by their index in `arrays`."""
+  if isinstance(description, np.ndarray):
+    arrays.append(description)
+    return {"__array__": len(arrays) - 1}
+  if isinstance(description, dict):
+    return {k: _split_arrays(v, arrays) for k, v in description.items()}
+  if isinstance(description, (list, tuple)):
+    return [_split_arrays(v, arrays) for v in description]
+  return description
+
+
+def _merge_arrays(structure, arrays):
+  """Inverse of `_split_arrays`."""
+  if isinstance(structure, dict):
+    if set(structure) == {"__array__"}:
+      return arrays["array_{}".format(structure["__array__"])]
+    return {k: _merge_arrays(v, arrays) for k, v in structure.items()}
+  if isinstance(structure, list):
+    return [_merge_arrays(v, arrays) for v in structure]
+  return structure
+
+
+def save(description, file_):
+  """Saves a description to a `.npz` file.
+
+  Args:
+    description: A description returned by `export_tf.export`.
+    file_: A path, or a writable binary file object.
+  """
+  arrays = []
+  structure = _split_arrays(description, arrays)
+  np.savez(file_, **dict(
+      [(_DESCRIPTION_KEY, np.array(json.dumps(structure)))] +
+      [("array_{}".format(i), array) for i, array in enumerate(arrays)]))
+
+
+def load(file_):
+  """Loads a description saved by `save`.
+
+  Args:
+    file_: A path, or a readable binary file object.
+
+  Returns:
+    The description.
+  """
+  with np.load(file_) as arrays:
+    arrays = dict(arrays.items())
+  structure = json.loads(str(arrays.pop(_DESCRIPTION_KEY)))
+  return _merge_arrays(structure, arrays)
+
@@ -31,6 +31,13 @@ The provided modules are:
   - `GraphIndependent`: a Graph Network producing updated edges (resp. nodes,
     globals) based on the input's edges (resp. nodes, globals) only;
 
+  - `SparseLinear`: a linear layer accepting `tf.SparseTensor` features, to be
+    used as the first layer of the models of a `GraphIndependent` encoder;
+
+  - `NodeIdEmbedding`: an embedding lookup of id-valued nodes, which only looks
+    up each distinct id of a batch once, to be used as the node model of a
+    `GraphIndependent` encoder;
+
   - `InteractionNetwork` (from https://arxiv.org/abs/1612.00222): a
     network propagating information on the edges and nodes of a graph;
 
@@ -48,9 +55,12 @@ The provided modules are:
 
 from __future__ import absolute_import, division, print_function
 
+import math
+
 import sonnet as snt
 import tensorflow as tf
 from graph_nets import blocks
+from graph_nets import utils_tf
 
 _DEFAULT_EDGE_BLOCK_OPT = {
     "use_edges": True,
@@ -237,6 +247,7 @@ class GraphNetwork(snt.AbstractModule):
                edge_block_opt=None,
                node_block_opt=None,
                global_block_opt=None,
+               fused=False,
                name="graph_network"):
     """Initializes the GraphNetwork module.
 
@@ -265,9 +276,15 @@ class GraphNetwork(snt.AbstractModule):
         contain the keys `use_edges`, `use_nodes`, `use_globals` (all set to
         True by default), and `edges_reducer`, `nodes_reducer` (defaults to
         `reducer`).
+      fused: (bool, default=False) Whether to compute the index of the graph
+        of each node and edge, and the total number of nodes, once for the
+        whole step, and share them between the blocks (which then broadcast
+        the globals with a `tf.gather` and reuse the indices to aggregate).
+        This produces the same outputs with fewer ops.
       name: The module name.
     """
     super(GraphNetwork, self).__init__(name=name)
+    self._fused = fused
     edge_block_opt = _make_default_edge_block_opt(edge_block_opt)
     node_block_opt = _make_default_node_block_opt(node_block_opt, reducer)
     global_block_opt = _make_default_global_block_opt(global_block_opt,
@@ -294,7 +311,41 @@ class GraphNetwork(snt.AbstractModule):
     Returns:
       An output `graphs.GraphsTuple` with updated edges, nodes and globals.
     """
-    return self._global_block(self._node_block(self._edge_block(graph)))
+    if not self._fused:
+      return self._global_block(self._node_block(self._edge_block(graph)))
+
+    with tf.name_scope("graph_index"):
+      node_graph_index = utils_tf.repeat_graph_index(graph.n_node)
+      edge_graph_index = utils_tf.repeat_graph_index(graph.n_edge)
+      num_nodes = tf.reduce_sum(graph.n_node)
+    graph = self._edge_block(graph, edge_graph_index=edge_graph_index)
+    graph = self._node_block(
+        graph, node_graph_index=node_graph_index, num_nodes=num_nodes)
+    return self._global_block(
+        graph,
+        node_graph_index=node_graph_index,
+        edge_graph_index=edge_graph_index)
+
+
+def _model_fn_module(model_fn, name):
+  """Wraps the models built by `model_fn` in a module named `name`.
+
+  The model built by the last connection of the module is kept as its `model`
+  attribute (e.g. to be exported by `export_tf.export`).
+
+  Args:
+    model_fn: A callable returning a Sonnet module (or equivalent callable).
+    name: The name of the module.
+
+  Returns:
+    A `snt.Module`.
+  """
+  def build(inputs):
+    module.model = model_fn()
+    return module.model(inputs)
+
+  module = snt.Module(build, name=name)
+  return module
 
 
 class GraphIndependent(snt.AbstractModule):
@@ -334,18 +385,15 @@ class GraphIndependent(snt.AbstractModule):
       if edge_model_fn is None:
         self._edge_model = lambda x: x
       else:
-        self._edge_model = snt.Module(lambda x: edge_model_fn()(x),
-                                      name="edge_model")  # pylint: disable=unnecessary-lambda
+        self._edge_model = _model_fn_module(edge_model_fn, "edge_model")
       if node_model_fn is None:
         self._node_model = lambda x: x
       else:
-        self._node_model = snt.Module(lambda x: node_model_fn()(x),
-                                      name="node_model")  # pylint: disable=unnecessary-lambda
+        self._node_model = _model_fn_module(node_model_fn, "node_model")
       if global_model_fn is None:
         self._global_model = lambda x: x
       else:
-        self._global_model = snt.Module(lambda x: global_model_fn()(x),
-                                        name="global_model")  # pylint: disable=unnecessary-lambda
+        self._global_model = _model_fn_module(global_model_fn, "global_model")
 
   def _build(self, graph):
     """Connects the GraphIndependent.
@@ -436,6 +484,151 @@ class BipartiteGraphIndependent(snt.AbstractModule):
                          globals=self._global_model(graph.globals))
 
 
+class SparseLinear(snt.AbstractModule):
+  """Linear module which accepts sparse inputs.
+
+  Computes `inputs * w + b`, with a sparse-dense matmul if `inputs` is a 2D
+  `tf.SparseTensor` (for instance sparse node features fed from a
+  `scipy.sparse` matrix), and a dense matmul otherwise. It can be used as the
+  first layer of the models of a `GraphIndependent` encoder, e.g.
+  ```
+  GraphIndependent(node_model_fn=lambda: snt.Sequential(
+      [SparseLinear(64), tf.nn.relu, snt.nets.MLP([64])]))
+  ```
+  so that the high-dimensional sparse features are never densified.
+  """
+
+  def __init__(self,
+               output_size,
+               input_size=None,
+               use_bias=True,
+               initializers=None,
+               name="sparse_linear"):
+    """Initializes the SparseLinear module.
+
+    Args:
+      output_size: The output size.
+      input_size: (optional) The input size. Defaults to the static size of the
+        last dimension of the inputs, which may be unknown for sparse inputs.
+      use_bias: Whether to include a bias.
+      initializers: (optional) A dictionary containing initializers for the
+        weights ("w") and the bias ("b"). The weights default to a truncated
+        normal initializer with standard deviation `1 / sqrt(input_size)`, and
+        the bias to zeros.
+      name: The module name.
+    """
+    super(SparseLinear, self).__init__(name=name)
+    self._output_size = output_size
+    self._input_size = input_size
+    self._use_bias = use_bias
+    self._initializers = dict(initializers or {})
+
+  def _build(self, inputs):
+    """Connects the SparseLinear module.
+
+    Args:
+      inputs: A 2D `Tensor` or `tf.SparseTensor` of shape
+        `[batch_size, input_size]`.
+
+    Returns:
+      A dense `Tensor` of shape `[batch_size, output_size]`.
+
+    Raises:
+      ValueError: If the input size is neither given nor statically known.
+    """
+    input_size = self._input_size
+    if input_size is None:
+      input_size = inputs.get_shape().with_rank(2)[1].value
+    if input_size is None:
+      raise ValueError(
+          "The last dimension of the inputs of a SparseLinear module must be "
+          "statically known, or passed as `input_size`.")
+    w_initializer = self._initializers.get(
+        "w", tf.truncated_normal_initializer(stddev=1 / math.sqrt(input_size)))
+    w = tf.get_variable("w", shape=[input_size, self._output_size],
+                        dtype=inputs.dtype, initializer=w_initializer)
+    if isinstance(inputs, tf.SparseTensor):
+      outputs = tf.sparse_tensor_dense_matmul(inputs, w)
+    else:
+      outputs = tf.matmul(inputs, w)
+    if self._use_bias:
+      b = tf.get_variable("b", shape=[self._output_size], dtype=inputs.dtype,
+                          initializer=self._initializers.get(
+                              "b", tf.zeros_initializer()))
+      outputs += b
+    return outputs
+
+
+class NodeIdEmbedding(snt.AbstractModule):
+  """Embeds categorical ids with a single lookup per distinct id.
+
+  When nodes are identified by categorical ids (e.g. entities shared across the
+  graphs of a batch), the same ids typically appear many times in a batch. This
+  module looks up the embeddings of the distinct ids only, and then gathers
+  them for every node, e.g.
+  ```
+  GraphIndependent(node_model_fn=lambda: NodeIdEmbedding(vocab_size, 64))
+  ```
+  The gradient with respect to the embedding table is a `tf.IndexedSlices`
+  with one row per distinct id.
+
+  The ids can either be deduplicated on device (with `tf.unique`), or on the
+  host with `utils_np.deduplicate_node_ids`, in which case the unique ids are
+  passed to the module and the nodes contain indices into them.
+  """
+
+  def __init__(self,
+               vocab_size,
+               embedding_dim,
+               deduplicate=True,
+               initializer=None,
+               name="node_id_embedding"):
+    """Initializes the NodeIdEmbedding module.
+
+    Args:
+      vocab_size: The number of distinct ids.
+      embedding_dim: The size of the embeddings.
+      deduplicate: (bool, default=True) Whether to deduplicate the ids before
+        the lookup. If `False`, the embeddings of all the ids are looked up.
+      initializer: (optional) The initializer of the embedding table. Defaults
+        to a truncated normal initializer with standard deviation
+        `1 / sqrt(embedding_dim)`.
+      name: The module name.
+    """
+    super(NodeIdEmbedding, self).__init__(name=name)
+    self._vocab_size = vocab_size
+    self._embedding_dim = embedding_dim
+    self._deduplicate = deduplicate
+    if initializer is None:
+      initializer = tf.truncated_normal_initializer(
+          stddev=1 / math.sqrt(embedding_dim))
+    self._initializer = initializer
+
+  def _build(self, ids, unique_ids=None):
+    """Connects the NodeIdEmbedding module.
+
+    Args:
+      ids: An integer `Tensor` of shape `[n_nodes]` or `[n_nodes, 1]`, the ids
+        of the nodes, or indices into `unique_ids` if it is provided.
+      unique_ids: (optional) A 1D integer `Tensor` of distinct ids, as returned
+        by `utils_np.deduplicate_node_ids`.
+
+    Returns:
+      A `Tensor` of shape `[n_nodes, embedding_dim]`.
+    """
+    embeddings = tf.get_variable(
+        "embeddings", shape=[self._vocab_size, self._embedding_dim],
+        initializer=self._initializer)
+    ids = tf.convert_to_tensor(ids)
+    if ids.shape.ndims == 2:
+      ids = tf.squeeze(ids, axis=1)
+    if unique_ids is None:
+      if not self._deduplicate:
+        return tf.gather(embeddings, ids)
+      unique_ids, ids = tf.unique(ids, out_idx=tf.int32)
+    return tf.gather(tf.gather(embeddings, unique_ids), ids)
+
+
 class DeepSets(snt.AbstractModule):
   """DeepSets module.
 
@@ -653,6 +846,218 @@ def _received_edges_normalizer(graph,
                       num_segments=tf.reduce_sum(graph.n_node))
 
 
+def _dot_product_logits(queries, keys):
+  """Dot product attention logits between all the queries and keys.
+
+  Args:
+    queries: Tensor of shape [n_pairs, n_receivers, num_heads, key_size].
+    keys: Tensor of shape [n_pairs, n_senders, num_heads, key_size].
+
+  Returns:
+    A tensor of shape [n_pairs, n_receivers, n_senders, num_heads].
+  """
+  return tf.einsum("brhk,bshk->brsh", queries, keys)
+
+
+def _fully_connected_attention(node_values,
+                               node_keys,
+                               node_queries,
+                               n_node,
+                               logits_fn=_dot_product_logits,
+                               exclude_self_edges=False,
+                               block_size=128,
+                               name="fully_connected_attention"):
+  """Multi-head attention between all the nodes of each graph.
+
+  Computes the same output as attending along the edges of
+  `utils_tf.fully_connect_graph_dynamic(graph, exclude_self_edges)`, without
+  building any per-edge tensor. The nodes of the batch are split into
+  consecutive blocks of `block_size` nodes (without padding each graph), and
+  only the pairs of a block of queries and a block of keys sharing at least
+  one graph are computed. The pairs are processed in a `tf.while_loop`, by
+  chunks of as many pairs as there are blocks, keeping a running maximum and
+  sum of the exponentiated logits for each receiver (as in
+  https://arxiv.org/abs/2205.14135). The tensors of a step have shape
+  [num_blocks, block_size, block_size, num_heads], i.e. linear in the total
+  number of nodes however skewed the sizes of the graphs are, and the number
+  of steps is the average number of key blocks attended by a block of queries.
+
+  When the output is differentiated, the `tf.while_loop` keeps the logits and
+  weights of every step for the backward pass, so that the memory used during
+  training grows with the number of attended pairs of blocks (roughly the
+  number of fully connected edges), as with the edge-based attention.
+
+  Args:
+    node_values: Tensor of shape [total_num_nodes, num_heads, value_size].
+    node_keys: Tensor of shape [total_num_nodes, num_heads, key_size].
+    node_queries: Tensor of shape [total_num_nodes, num_heads, key_size].
+    n_node: Tensor of shape [n_graphs] with the number of nodes of each graph.
+    logits_fn: A callable taking a batch of blocks of queries of shape
+      [n_pairs, n_receivers, num_heads, key_size] and of blocks of keys of
+      shape [n_pairs, n_senders, num_heads, key_size], and returning logits of
+      shape [n_pairs, n_receivers, n_senders, num_heads].
+    exclude_self_edges: (bool, default=False) Whether nodes attend to
+      themselves.
+    block_size: (int, default=128) The maximum number of nodes of a block. It
+      is reduced to the largest number of nodes of a graph of the batch.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A tensor of shape [total_num_nodes, num_heads, value_size] with the
+    attended values. Nodes without any node to attend to get a value of 0.
+  """
+  with tf.name_scope(name):
+    n_node = tf.cast(n_node, tf.int32)
+    num_graphs = tf.shape(n_node)[0]
+    num_nodes = tf.reduce_sum(n_node)
+    max_n_node = tf.maximum(tf.reduce_max(n_node), 0)
+    block_size = tf.minimum(block_size, tf.maximum(max_n_node, 1))
+    num_blocks = (num_nodes + block_size - 1) // block_size
+    num_padding = num_blocks * block_size - num_nodes
+
+    graph_index = utils_tf.repeat(tf.range(num_graphs), n_node)
+    graph_starts = tf.cumsum(n_node, exclusive=True)
+
+    def to_blocks(tensor, padding_value=0):
+      padded = tf.pad(tensor, [[0, num_padding]] + [[0, 0]] *
+                      (tensor.shape.ndims - 1), constant_values=padding_value)
+      return tf.reshape(padded, tf.concat(
+          [[num_blocks, block_size], tf.shape(tensor)[1:]], 0))
+
+    # [num_blocks, block_size, num_heads, key_size (or value_size)]
+    queries = to_blocks(node_queries)
+    keys = to_blocks(node_keys)
+    values = to_blocks(node_values)
+    # [num_blocks, block_size]. The padding nodes of the queries and of the
+    # keys belong to different (nonexistent) graphs.
+    receiver_graphs = to_blocks(graph_index, -1)
+    sender_graphs = to_blocks(graph_index, -2)
+
+    # Each block of queries attends to the blocks of keys spanning the nodes
+    # of its graphs.
+    first_nodes = tf.range(num_blocks) * block_size
+    last_nodes = tf.minimum(first_nodes + block_size, num_nodes) - 1
+    first_key_blocks = tf.gather(
+        graph_starts, tf.gather(graph_index, first_nodes)) // block_size
+    last_key_blocks = (tf.gather(graph_starts + n_node,
+                                 tf.gather(graph_index, last_nodes)) -
+                       1) // block_size
+    num_key_blocks = last_key_blocks - first_key_blocks + 1
+    # The (query block, key block) pairs, sorted by query block.
+    pair_queries = utils_tf.repeat(tf.range(num_blocks), num_key_blocks)
+    pair_keys = (
+        tf.gather(first_key_blocks, pair_queries) +
+        tf.range(tf.reduce_sum(num_key_blocks)) -
+        tf.gather(tf.cumsum(num_key_blocks, exclusive=True), pair_queries))
+    pairs_per_step = tf.maximum(num_blocks, 1)
+    num_steps = (tf.shape(pair_queries)[0] + pairs_per_step - 1) // (
+        pairs_per_step)
+    dtype = values.dtype
+    block_range = tf.range(block_size)
+
+    def body(i, running_max, running_sum, accumulator):
+      start = i * pairs_per_step
+      step_queries = pair_queries[start:start + pairs_per_step]
+      step_keys = pair_keys[start:start + pairs_per_step]
+      # [n_pairs, block_size, block_size, num_heads]
+      logits = logits_fn(tf.gather(queries, step_queries),
+                         tf.gather(keys, step_keys))
+      # [n_pairs, block_size, block_size]
+      mask = tf.equal(tf.gather(receiver_graphs, step_queries)[:, :, None],
+                      tf.gather(sender_graphs, step_keys)[:, None])
+      if exclude_self_edges:
+        receivers = step_queries[:, None] * block_size + block_range
+        senders = step_keys[:, None] * block_size + block_range
+        mask = tf.logical_and(
+            mask, tf.not_equal(receivers[:, :, None], senders[:, None]))
+      mask = tf.broadcast_to(mask[..., None], tf.shape(logits))
+      logits = tf.where(mask, logits,
+                        tf.fill(tf.shape(logits), tf.constant(dtype.min, dtype)))
+      # Softmax statistics of each pair, [n_pairs, block_size, num_heads].
+      pair_max = tf.reduce_max(logits, axis=2)
+      weights = tf.exp(logits - pair_max[:, :, None]) * tf.cast(mask, dtype)
+      pair_sum = tf.reduce_sum(weights, axis=2)
+      pair_values = tf.einsum("brsh,bshv->brhv", weights,
+                              tf.gather(values, step_keys))
+      # Merges the pairs into the running statistics of their query blocks.
+      new_max = tf.maximum(running_max, tf.unsorted_segment_max(
+          pair_max, step_queries, num_blocks))
+      rescaling = tf.exp(running_max - new_max)
+      pair_rescaling = tf.exp(pair_max - tf.gather(new_max, step_queries))
+      running_sum = running_sum * rescaling + tf.unsorted_segment_sum(
+          pair_sum * pair_rescaling, step_queries, num_blocks)
+      accumulator = (
+          accumulator * rescaling[..., None] + tf.unsorted_segment_sum(
+              pair_values * pair_rescaling[..., None], step_queries,
+              num_blocks))
+      return i + 1, new_max, running_sum, accumulator
+
+    stats_shape = tf.shape(queries)[:3]
+    initial_loop_vars = [
+        0,
+        tf.fill(stats_shape, tf.constant(dtype.min, dtype)),
+        tf.zeros(stats_shape, dtype),
+        tf.zeros(tf.concat([stats_shape, tf.shape(values)[3:]], 0), dtype),
+    ]
+    _, _, running_sum, accumulator = tf.while_loop(
+        lambda i, *_: tf.less(i, num_steps), body, initial_loop_vars)
+
+    # Receivers without any sender have a zero sum and get a zero value.
+    running_sum = tf.where(running_sum > 0, running_sum,
+                           tf.ones_like(running_sum))
+    attended_values = accumulator / running_sum[..., None]
+    return tf.reshape(attended_values, tf.concat(
+        [[-1], tf.shape(attended_values)[2:]], 0))[:num_nodes]
+
+
+def _received_edges_weighted_sum(weights,
+                                 node_values,
+                                 graph,
+                                 name="received_edges_weighted_sum"):
+  """Sums the sender values weighted by the edges, for each receiver node.
+
+  Computes the same output as broadcasting `node_values` to the edges,
+  multiplying them by `weights` and aggregating the edges with
+  `tf.unsorted_segment_sum` on the receivers, but with a single sparse-dense
+  matrix multiplication per batch (with a block-diagonal matrix with one block
+  per head), which never materializes the weighted values of the edges.
+
+  Args:
+    weights: Tensor of shape [total_num_edges, num_heads].
+    node_values: Tensor of shape [total_num_nodes, num_heads, value_size].
+    graph: Graph containing the senders and receivers of the edges.
+    name: A name for the operation (optional).
+
+  Returns:
+    A tensor of shape [total_num_nodes, num_heads, value_size].
+  """
+  with tf.name_scope(name):
+    num_nodes = tf.shape(node_values)[0]
+    num_heads = tf.shape(node_values)[1]
+    value_size = tf.shape(node_values)[2]
+    # [1, num_heads]
+    head_offsets = (tf.range(num_heads) * num_nodes)[None]
+    # [total_num_edges * num_heads]
+    rows = tf.reshape(tf.cast(graph.receivers, tf.int32)[:, None] +
+                      head_offsets, [-1])
+    cols = tf.reshape(tf.cast(graph.senders, tf.int32)[:, None] + head_offsets,
+                      [-1])
+    size = tf.cast(num_heads * num_nodes, tf.int64)
+    weights_matrix = tf.SparseTensor(
+        indices=tf.cast(tf.stack([rows, cols], axis=1), tf.int64),
+        values=tf.reshape(weights, [-1]),
+        dense_shape=tf.stack([size, size]))
+    # [num_heads * total_num_nodes, value_size]
+    values = tf.reshape(tf.transpose(node_values, [1, 0, 2]),
+                        [num_heads * num_nodes, value_size])
+    aggregated_values = tf.sparse_tensor_dense_matmul(weights_matrix, values)
+    aggregated_values = tf.transpose(
+        tf.reshape(aggregated_values, [num_heads, num_nodes, value_size]),
+        [1, 0, 2])
+    aggregated_values.set_shape(node_values.shape)
+    return aggregated_values
+
+
 class SelfAttention(snt.AbstractModule):
   """Multi-head self-attention module.
 
@@ -678,16 +1083,50 @@ class SelfAttention(snt.AbstractModule):
   Values, keys and queries contain a "head" axis to compute independent
   self-attention for each of the heads.
 
+  If the attention graph is known to be fully connected (e.g. the output of
+  `utils_tf.fully_connect_graph_dynamic`), `fully_connected=True` computes the
+  same output blockwise for each graph, without gathering keys, queries and
+  values on the edges: the memory of the forward pass then grows linearly with
+  the number of nodes instead of the number of edges, even for batches of
+  graphs of very different sizes. When training, the intermediate blocks are
+  kept for the backward pass, which then needs memory proportional to the
+  number of edges of the fully connected graphs.
+
+  With `use_sparse_matmul=True`, the sender values are not gathered on the
+  edges: the attended values are aggregated with a sparse-dense matrix
+  multiplication, which removes the [total_num_edges, num_heads, value_size]
+  tensors from the computation.
+
   """
 
-  def __init__(self, name="self_attention"):
+  def __init__(self,
+               fully_connected=False,
+               exclude_self_edges=False,
+               block_size=128,
+               use_sparse_matmul=False,
+               name="self_attention"):
     """Inits the module.
 
     Args:
+      fully_connected: (bool, default=False) Whether to ignore the senders and
+        receivers of the attention graph and attend between all the nodes of
+        each graph, blockwise.
+      exclude_self_edges: (bool, default=False) When `fully_connected` is
+        `True`, whether nodes attend to themselves. It should match the option
+        used to fully connect the attention graph.
+      block_size: (int, default=128) When `fully_connected` is `True`, the
+        number of nodes whose keys and values are processed at once.
+      use_sparse_matmul: (bool, default=False) Whether to aggregate the values
+        of the senders with a sparse-dense matrix multiplication instead of
+        gathering them on the edges.
       name: The module name.
     """
     super(SelfAttention, self).__init__(name=name)
     self._normalizer = _unsorted_segment_softmax
+    self._fully_connected = fully_connected
+    self._exclude_self_edges = exclude_self_edges
+    self._block_size = block_size
+    self._use_sparse_matmul = use_sparse_matmul
 
   def _build(self, node_values, node_keys, node_queries, attention_graph):
     """Connects the multi-head self-attention module.
@@ -716,14 +1155,16 @@ class SelfAttention(snt.AbstractModule):
     Raises:
       ValueError: if the input graph does not have edges.
     """
+    if self._fully_connected:
+      return attention_graph.replace(nodes=_fully_connected_attention(
+          node_values, node_keys, node_queries, attention_graph.n_node,
+          exclude_self_edges=self._exclude_self_edges,
+          block_size=self._block_size))
 
-    # Sender nodes put their keys and values in the edges.
+    # Sender nodes put their keys in the edges.
     # [total_num_edges, num_heads, query_size]
     sender_keys = blocks.broadcast_sender_nodes_to_edges(
         attention_graph.replace(nodes=node_keys))
-    # [total_num_edges, num_heads, value_size]
-    sender_values = blocks.broadcast_sender_nodes_to_edges(
-        attention_graph.replace(nodes=node_values))
 
     # Receiver nodes put their queries in the edges.
     # [total_num_edges, num_heads, key_size]
@@ -738,6 +1179,17 @@ class SelfAttention(snt.AbstractModule):
         attention_graph.replace(edges=attention_weights_logits),
         normalizer=self._normalizer)
 
+    if self._use_sparse_matmul:
+      # [total_num_nodes, num_heads, embedding_size]
+      aggregated_attended_values = _received_edges_weighted_sum(
+          normalized_attention_weights, node_values, attention_graph)
+      return attention_graph.replace(nodes=aggregated_attended_values)
+
+    # Sender nodes put their values in the edges.
+    # [total_num_edges, num_heads, value_size]
+    sender_values = blocks.broadcast_sender_nodes_to_edges(
+        attention_graph.replace(nodes=node_values))
+
     # Attending to sender values according to the weights.
     # [total_num_edges, num_heads, embedding_size]
     attented_edges = sender_values * normalized_attention_weights[..., None]
@@ -752,6 +1204,64 @@ class SelfAttention(snt.AbstractModule):
     return attention_graph.replace(nodes=aggregated_attended_values)
 
 
+class DenseSelfAttention(snt.AbstractModule):
+  """Multi-head self-attention module operating on padded dense graphs.
+
+  Dense counterpart of `SelfAttention`, for a `graphs.DenseGraphsTuple`
+  attention graph (see `utils_tf.graphs_tuple_to_dense`). The attention logits
+  are computed for all pairs of nodes of each graph with a single batched
+  matrix multiplication, and the softmax is masked by the `ADJACENCY` field
+  of the attention graph. This trades the gathers and segment reductions of
+  `SelfAttention` for dense matrix multiplications, which is faster when the
+  graphs are small and densely connected.
+
+  Nodes with no received edges get an updated value of 0.
+  """
+
+  def __init__(self, name="dense_self_attention"):
+    """Inits the module.
+
+    Args:
+      name: The module name.
+    """
+    super(DenseSelfAttention, self).__init__(name=name)
+
+  def _build(self, node_values, node_keys, node_queries, attention_graph):
+    """Connects the dense multi-head self-attention module.
+
+    Args:
+      node_values: Tensor containing the values associated to each of the nodes.
+        The expected shape is [n_graphs, max_n_node, num_heads, value_size].
+      node_keys: Tensor containing the key associated to each of the nodes. The
+        expected shape is [n_graphs, max_n_node, num_heads, key_size].
+      node_queries: Tensor containing the query associated to each of the nodes.
+        The expected shape is [n_graphs, max_n_node, num_heads, key_size].
+      attention_graph: A `graphs.DenseGraphsTuple` whose `ADJACENCY` field
+        contains the connectivity between the nodes. Node `r` attends to node
+        `s` of the same graph if `adjacency[b, r, s]` is `True`.
+
+    Returns:
+      An output `graphs.DenseGraphsTuple` with updated nodes containing the
+      aggregated attended value for each of the nodes with shape
+      [n_graphs, max_n_node, num_heads, value_size].
+    """
+    # [n_graphs, num_heads, max_n_node (receivers), max_n_node (senders)]
+    logits = tf.einsum("brhk,bshk->bhrs", node_queries, node_keys)
+    mask = tf.broadcast_to(attention_graph.adjacency[:, None], tf.shape(logits))
+    logits = tf.where(mask, logits,
+                      tf.fill(tf.shape(logits),
+                              tf.constant(logits.dtype.min, logits.dtype)))
+    # Possibly refactor to `tf.stop_gradient(maxes)` for better performance.
+    logits -= tf.reduce_max(logits, axis=-1, keepdims=True)
+    exp_logits = tf.exp(logits) * tf.cast(mask, logits.dtype)
+    sum_exp_logits = tf.reduce_sum(exp_logits, axis=-1, keepdims=True)
+    # Receivers without edges have a zero sum and get zero weights.
+    weights = exp_logits / tf.where(sum_exp_logits > 0, sum_exp_logits,
+                                    tf.ones_like(sum_exp_logits))
+    attended_values = tf.einsum("bhrs,bshv->brhv", weights, node_values)
+    return attention_graph.replace(nodes=attended_values)
+
+
 class EdgelessGAT(snt.AbstractModule):
   """Multi-head self-attention module.
 
@@ -769,6 +1279,9 @@ class EdgelessGAT(snt.AbstractModule):
                num_heads,
                key_size,
                value_size,
+               fully_connected=False,
+               exclude_self_edges=False,
+               block_size=128,
                name="GAT"):
     """
       Args:
@@ -780,6 +1293,12 @@ class EdgelessGAT(snt.AbstractModule):
         num_heads: Number of attention heads
         key_size: Key dimension
         value_size: value dimension
+        fully_connected: Whether to attend between all the nodes of each graph
+          blockwise, ignoring the senders and receivers. See `SelfAttention`.
+        exclude_self_edges: When `fully_connected`, whether nodes attend to
+          themselves.
+        block_size: When `fully_connected`, the number of nodes whose keys and
+          values are processed at once.
         name: The module name.
     """
     super().__init__(name=name)
@@ -787,50 +1306,42 @@ class EdgelessGAT(snt.AbstractModule):
     self._attention_projection_model = attention_projection_model
     self._query_key_product_model = query_key_product_model
     self._node_model = node_model
+    self.num_heads = num_heads
+    self.key_size = key_size
+    self.value_size = value_size
+    self._fully_connected = fully_connected
+    self._exclude_self_edges = exclude_self_edges
+    self._block_size = block_size
 
-  def _build(self, graph_features):
-    """Connects the multi-head self-attention module.
-
-    The self-attention is only computed according to the connectivity of the
-    input graphs, with receiver nodes attending to sender nodes.
+  def _query_key_product_logits(self, queries, keys):
+    """Applies the query key product model to all pairs of queries and keys.
 
     Args:
-      graph_features: Graph containing connectivity information between nodes
-        via the senders and receivers fields. Node A will only attempt to attend
-        to Node B if `attention_graph` contains an edge sent by Node A and
-        received by Node B.
+      queries: Tensor of shape [n_pairs, n_receivers, num_heads, key_size].
+      keys: Tensor of shape [n_pairs, n_senders, num_heads, key_size].
 
     Returns:
-      An output `graphs.GraphsTuple` with updated nodes containing the
-      aggregated attended value for each of the nodes with shape
-      [total_num_nodes, num_heads, value_size].
-
-    Raises:
-      ValueError: if the input graph does not have edges.
-    """
-    """
-    # TODO(arc): Figure out how to incorporate edge information into
-                 attention updates.
+      A tensor of shape [n_pairs, n_receivers, n_senders, num_heads].
     """
-    nodes = graph_features.nodes
-
-    num_heads = self.num_heads
-    key_size = self.key_size
-    value_size = self.value_size
-    node_embed_dim = tf.shape(nodes)[-1]
-
-    qkv_size = 2 * key_size + value_size
-    total_size = qkv_size * num_heads  # denote as F
+    sender_keys = tf.tile(keys[:, None], [1, tf.shape(queries)[1], 1, 1, 1])
+    receiver_queries = tf.tile(queries[:, :, None],
+                               [1, 1, tf.shape(keys)[1], 1, 1])
+    logits = snt.BatchApply(self._query_key_product_model, n_dims=4)(
+        tf.concat([sender_keys, receiver_queries], axis=-1))
+    return tf.squeeze(logits, -1)
 
-    # [total_num_nodes, d] => [total_num_nodes, F]
-    qkv_flat = self._attention_projection_model(nodes)
+  def _attend_along_edges(self, graph_features, q, k, v):
+    """Attends from the receivers to the senders of each edge.
 
-    qkv = tf.reshape(qkv_flat, [-1, num_heads, qkv_size])
-    # q => [total_num_nodes, num_heads, key_size]
-    # k => [total_num_nodes, num_heads, key_size]
-    # v => [total_num_nodes, num_heads, value_size]
-    q, k, v = tf.split(qkv, [key_size, key_size, value_size], -1)
+    Args:
+      graph_features: Graph containing the senders and receivers.
+      q: Queries of shape [total_num_nodes, num_heads, key_size].
+      k: Keys of shape [total_num_nodes, num_heads, key_size].
+      v: Values of shape [total_num_nodes, num_heads, value_size].
 
+    Returns:
+      The attended values, of shape [total_num_nodes, num_heads, value_size].
+    """
     # Sender nodes put their keys and values in the edges.
     # [total_num_edges, num_heads, query_size]
     sender_keys = blocks.broadcast_sender_nodes_to_edges(
@@ -865,9 +1376,63 @@ class EdgelessGAT(snt.AbstractModule):
         reducer=tf.unsorted_segment_sum)
     # Summing all of the attended values from each node.
     # [total_num_nodes, num_heads, value_size]
-    aggregated_attended_values = received_edges_aggregator(
+    return received_edges_aggregator(
         graph_features.replace(edges=attented_edges))
 
+  def _build(self, graph_features):
+    """Connects the multi-head self-attention module.
+
+    The self-attention is only computed according to the connectivity of the
+    input graphs, with receiver nodes attending to sender nodes.
+
+    Args:
+      graph_features: Graph containing connectivity information between nodes
+        via the senders and receivers fields. Node A will only attempt to attend
+        to Node B if `attention_graph` contains an edge sent by Node A and
+        received by Node B.
+
+    Returns:
+      An output `graphs.GraphsTuple` with updated nodes containing the
+      aggregated attended value for each of the nodes with shape
+      [total_num_nodes, num_heads, value_size].
+
+    Raises:
+      ValueError: if the input graph does not have edges.
+    """
+    """
+    # TODO(arc): Figure out how to incorporate edge information into
+                 attention updates.
+    """
+    nodes = graph_features.nodes
+
+    num_heads = self.num_heads
+    key_size = self.key_size
+    value_size = self.value_size
+    node_embed_dim = tf.shape(nodes)[-1]
+
+    qkv_size = 2 * key_size + value_size
+    total_size = qkv_size * num_heads  # denote as F
+
+    # [total_num_nodes, d] => [total_num_nodes, F]
+    qkv_flat = self._attention_projection_model(nodes)
+
+    qkv = tf.reshape(qkv_flat, [-1, num_heads, qkv_size])
+    # q => [total_num_nodes, num_heads, key_size]
+    # k => [total_num_nodes, num_heads, key_size]
+    # v => [total_num_nodes, num_heads, value_size]
+    q, k, v = tf.split(qkv, [key_size, key_size, value_size], -1)
+
+    if self._fully_connected:
+      # [total_num_nodes, num_heads, value_size]
+      aggregated_attended_values = _fully_connected_attention(
+          v, k, q, graph_features.n_node,
+          logits_fn=self._query_key_product_logits,
+          exclude_self_edges=self._exclude_self_edges,
+          block_size=self._block_size)
+    else:
+      aggregated_attended_values = self._attend_along_edges(
+          graph_features, q, k, v)
+
     # concatenate all the heads and project to required dimension.
     # cast to [total_num_nodes, num_heads * value_size]
     aggregated_attended_values = tf.reshape(aggregated_attended_values,
@@ -0,0 +1,290 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+"""Per-region profiling of graph network blocks.
+
+The blocks of `blocks.py` delimit named regions of their computation:
+
+  - BROADCAST: gathering node or global features onto edges or nodes;
+
+  - AGGREGATE: reducing edge or node features onto nodes or globals;
+
+  - COLLECT: concatenating the inputs of a model;
+
+  - MODEL: applying the edge, node or global model.
+
+Regions are only instrumented while a `Profiler` is active, i.e. within a
+`with profile() as profiler:` context; otherwise `region` does not modify the
+graph. When active, each region is a name scope (so that the ops of a region
+are grouped in TF's timeline and `tf.profiler` scope views) and records the
+tensors it consumes and produces. `Profiler.run` then runs a session with
+tracing enabled and returns a summary with, for each region, its execution
+time, the number of rows (e.g. `n_edges`) and width of its output, and an
+estimate of the FLOPs and bytes it moves. The summary can be exported to JSON
+with `Profiler.export_json`, and the trace to the Chrome trace format with
+`Profiler.export_chrome_trace`.
+
+The FLOP and byte counts are first-order estimates from the tensor sizes:
+
+  - BROADCAST and COLLECT regions move twice the size of their output (read and
+    write) and do no FLOPs;
+
+  - AGGREGATE regions read their input and write their output, and do one FLOP
+    per input element;
+
+  - MODEL regions read their input and write their output, and are counted as
+    a single dense layer, i.e. `2 * rows * input_width * output_width` FLOPs.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import contextlib
+import json
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.python.client import timeline
+
+BROADCAST = "broadcast"
+AGGREGATE = "aggregate"
+COLLECT = "collect"
+MODEL = "model"
+
+REGION_KINDS = (BROADCAST, AGGREGATE, COLLECT, MODEL)
+
+# Stack of the active `Profiler`s; only the innermost one records regions.
+_PROFILERS = []
+
+
+class _NullRegion(object):
+  """Region yielded when no profiler is active; recording is a no-op."""
+
+  def record(self, inputs=(), outputs=()):
+    del inputs, outputs
+
+
+_NULL_REGION = _NullRegion()
+
+
+class _Region(object):
+  """A named region of a block, and the tensors it consumes and produces."""
+
+  def __init__(self, name, kind):
+    self.name = name
+    self.kind = kind
+    self.inputs = []
+    self.outputs = []
+    # Names of the ops created within the region, including the ops of the
+    # Sonnet modules it connects, which may live in other name scopes.
+    self.op_names = set()
+
+  def record(self, inputs=(), outputs=()):
+    """Records the dense input and output tensors of the region."""
+    self.inputs.extend(t for t in inputs if isinstance(t, tf.Tensor))
+    self.outputs.extend(t for t in outputs if isinstance(t, tf.Tensor))
+
+  def size_tensors(self):
+    """Returns the shapes of the recorded tensors, to be fetched at run time."""
+    return {"inputs": [tf.shape(t, out_type=tf.int64) for t in self.inputs],
+            "outputs": [tf.shape(t, out_type=tf.int64) for t in self.outputs]}
+
+  def summarize(self, shapes, time_us):
+    """Returns a JSON-serializable summary of the region given its shapes."""
+    def num_bytes(tensors, tensor_shapes):
+      return int(sum(np.prod(s) * t.dtype.size
+                     for t, s in zip(tensors, tensor_shapes)))
+
+    def width(tensor_shapes):
+      return int(sum(np.prod(s[1:]) for s in tensor_shapes))
+
+    input_bytes = num_bytes(self.inputs, shapes["inputs"])
+    output_bytes = num_bytes(self.outputs, shapes["outputs"])
+    rows = int(shapes["outputs"][0][0]) if shapes["outputs"] else 0
+    output_width = width(shapes["outputs"])
+    input_width = width(shapes["inputs"])
+    if self.kind in (BROADCAST, COLLECT):
+      flops = 0
+      bytes_moved = 2 * output_bytes
+    elif self.kind == AGGREGATE:
+      flops = int(sum(np.prod(s) for s in shapes["inputs"]))
+      bytes_moved = input_bytes + output_bytes
+    else:
+      flops = 2 * rows * input_width * output_width
+      bytes_moved = input_bytes + output_bytes
+    return collections.OrderedDict([
+        ("name", self.name),
+        ("kind", self.kind),
+        ("time_us", time_us),
+        ("rows", rows),
+        ("width", output_width),
+        ("flops", flops),
+        ("bytes", bytes_moved),
+    ])
+
+
+class Profiler(object):
+  """Collects the regions of the blocks connected while it is active."""
+
+  def __init__(self):
+    self._regions = []
+
+  @property
+  def regions(self):
+    """The recorded regions, in the order in which they were connected."""
+    return list(self._regions)
+
+  def _add_region(self, name, kind):
+    region = _Region(name, kind)
+    self._regions.append(region)
+    return region
+
+  def fetches(self):
+    """Returns the size tensors to fetch alongside the profiled outputs."""
+    return [region.size_tensors() for region in self._regions]
+
+  def summarize(self, fetched_sizes, run_metadata=None):
+    """Summarizes the regions of a profiled run.
+
+    Args:
+      fetched_sizes: The result of fetching `fetches()`.
+      run_metadata: (optional) A `tf.RunMetadata` of a traced run, from which
+        the execution time of the regions is computed.
+
+    Returns:
+      A JSON-serializable dictionary with a "regions" list of per-region
+      summaries (see the module documentation), and a "totals" dictionary of
+      the time, FLOPs and bytes per region kind.
+    """
+    op_times = _op_times(run_metadata) if run_metadata is not None else {}
+    regions = []
+    for region, shapes in zip(self._regions, fetched_sizes):
+      time_us = sum(op_times.get(name, 0) for name in region.op_names)
+      regions.append(region.summarize(shapes, time_us))
+    totals = collections.OrderedDict()
+    for kind in REGION_KINDS:
+      kind_regions = [r for r in regions if r["kind"] == kind]
+      totals[kind] = collections.OrderedDict(
+          (key, sum(r[key] for r in kind_regions))
+          for key in ("time_us", "flops", "bytes"))
+    return {"regions": regions, "totals": totals}
+
+  def run(self, session, fetches, feed_dict=None):
+    """Runs `fetches` with tracing, and summarizes the profiled regions.
+
+    Args:
+      session: A `tf.Session`.
+      fetches: The fetches to run, typically the outputs of the profiled
+        blocks.
+      feed_dict: (optional) The feed dictionary of the run.
+
+    Returns:
+      A triplet of the fetched values, the summary (see `summarize`), and the
+      `tf.RunMetadata` of the run, which can be passed to
+      `export_chrome_trace`.
+    """
+    run_metadata = tf.RunMetadata()
+    options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
+    values, sizes = session.run((fetches, self.fetches()), feed_dict=feed_dict,
+                                options=options, run_metadata=run_metadata)
+    return values, self.summarize(sizes, run_metadata), run_metadata
+
+  def export_json(self, summary, path):
+    """Writes a summary returned by `summarize` or `run` to a JSON file."""
+    with open(path, "w") as f:
+      json.dump(summary, f, indent=2)
+
+  def export_chrome_trace(self, run_metadata, path):
+    """Writes the timeline of a traced run in the Chrome trace format.
+
+    The ops of each region are grouped under the name scope of the region.
+
+    Args:
+      run_metadata: The `tf.RunMetadata` of a traced run.
+      path: The path of the output file, to be opened in `chrome://tracing`.
+    """
+    trace = timeline.Timeline(run_metadata.step_stats)
+    with open(path, "w") as f:
+      f.write(trace.generate_chrome_trace_format())
+
+
+def _op_times(run_metadata):
+  """Returns the execution time of each op of a traced run, in microseconds.
+
+  When an op appears in the stats of several devices (e.g. the compute and
+  stream stats of a GPU), its longest duration is kept.
+  """
+  op_times = {}
+  for device_stats in run_metadata.step_stats.dev_stats:
+    for node_stats in device_stats.node_stats:
+      name = node_stats.node_name.split(":")[0]
+      op_times[name] = max(op_times.get(name, 0),
+                           node_stats.all_end_rel_micros)
+  return op_times
+
+
+@contextlib.contextmanager
+def profile():
+  """Activates a `Profiler` for the blocks connected within the context.
+
+  Yields:
+    The active `Profiler`.
+  """
+  profiler = Profiler()
+  _PROFILERS.append(profiler)
+  try:
+    yield profiler
+  finally:
+    _PROFILERS.pop()
+
+
+def is_profiling():
+  """Returns whether a `Profiler` is active."""
+  return bool(_PROFILERS)
+
+
+@contextlib.contextmanager
+def region(kind):
+  """Delimits a region of a block.
+
+  If no profiler is active, this does nothing and yields a region whose
+  `record` method is a no-op. Otherwise, the region is a name scope named after
+  `kind`, within the current name scope, and all the ops created within the
+  context are attributed to the region.
+
+  Args:
+    kind: One of `REGION_KINDS`.
+
+  Yields:
+    An object whose `record(inputs=(), outputs=())` method records the tensors
+    consumed and produced by the region.
+
+  Raises:
+    ValueError: If `kind` is not a valid region kind.
+  """
+  if kind not in REGION_KINDS:
+    raise ValueError("Unknown region kind {!r}, expected one of {}".format(
+        kind, REGION_KINDS))
+  if not _PROFILERS:
+    yield _NULL_REGION
+    return
+  graph = tf.get_default_graph()
+  num_ops = len(graph.get_operations())
+  with tf.name_scope(kind) as scope:
+    profiled_region = _PROFILERS[-1]._add_region(scope.rstrip("/"), kind)  # pylint: disable=protected-access
+    yield profiled_region
+  profiled_region.op_names.update(
+      op.name for op in graph.get_operations()[num_ops:])
@@ -0,0 +1,94 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for the benchmarks package."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+
+from absl.testing import parameterized
+from graph_nets.benchmarks import suite
+from graph_nets.benchmarks import synthetic
+import numpy as np
+import tensorflow as tf
+
+
+class SyntheticTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(*synthetic.REGIMES)
+  def test_regime_graphs(self, regime_name):
+    regime = synthetic.REGIMES[regime_name]
+    graph = synthetic.regime_graphs(regime, feature_size=5)
+    num_nodes = regime.num_graphs * regime.num_nodes
+    self.assertEqual((num_nodes, 5), graph.nodes.shape)
+    self.assertEqual((regime.num_graphs, 5), graph.globals.shape)
+    self.assertEqual(np.float32, graph.edges.dtype)
+    self.assertAllEqual([regime.num_nodes] * regime.num_graphs, graph.n_node)
+    # The average degree is close to the one of the regime.
+    self.assertAllClose(regime.avg_degree,
+                        graph.edges.shape[0] / num_nodes, rtol=0.2)
+
+  def test_seed(self):
+    regime = synthetic.REGIMES["small_sparse"]
+    graph_1 = synthetic.regime_graphs(regime, seed=1)
+    graph_2 = synthetic.regime_graphs(regime, seed=1)
+    for value_1, value_2 in zip(graph_1, graph_2):
+      self.assertAllEqual(value_1, value_2)
+
+  def test_skewed(self):
+    graph = synthetic.regime_graphs(synthetic.REGIMES["large_skewed"])
+    in_degrees = np.bincount(graph.receivers[:graph.n_edge[0]],
+                             minlength=graph.n_node[0])
+    self.assertGreater(in_degrees[0], 100 * np.mean(in_degrees))
+
+
+class SuiteTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(*suite.BENCHMARKS)
+  def test_run_benchmark(self, name):
+    record = suite.run_benchmark(name, "small_sparse", num_iters=2,
+                                 num_warmup_iters=1)
+    self.assertEqual(name, record["benchmark"])
+    self.assertEqual("small_sparse", record["regime"])
+    self.assertEqual(2, record["num_iters"])
+    self.assertGreaterEqual(record["median_s"], record["min_s"])
+
+  def test_fully_connect_skipped_for_large_graphs(self):
+    self.assertIsNone(suite.run_benchmark(
+        "fully_connect_graph_dynamic", "large_sparse", num_iters=1))
+
+  def test_run_suite_is_serializable(self):
+    summary = suite.run_suite(["GraphNetwork", "concat"], ["small_dense"],
+                              num_iters=1, num_warmup_iters=0)
+    self.assertEqual(
+        [("GraphNetwork", "small_dense"), ("concat", "small_dense")],
+        [(r["benchmark"], r["regime"]) for r in summary["results"]])
+    self.assertEqual(summary, json.loads(json.dumps(summary)))
+    for library in ["tensorflow", "sonnet", "graph_nets",
+                    "graph_nets_revision"]:
+      self.assertIn(library, summary["environment"])
+
+  def test_unknown_names(self):
+    with self.assertRaisesRegexp(ValueError, "Unknown benchmark"):
+      suite.run_benchmark("Transformer", "small_sparse")
+    with self.assertRaisesRegexp(ValueError, "Unknown regime"):
+      suite.run_benchmark("concat", "huge")
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -26,6 +26,7 @@ from graph_nets import blocks
 from graph_nets import graphs
 from graph_nets import utils_np
 from graph_nets import utils_tf
+from graph_nets.tests import test_utils
 import numpy as np
 import sonnet as snt
 import tensorflow as tf
@@ -1099,5 +1100,198 @@ class CommonBlockTests(GraphModuleTest):
     for field in ["receivers", "senders"]:
       self.assertEqual(indices_dtype, getattr(output, field).dtype)
 
+
+class DenseBlocksTest(GraphModuleTest):
+  """Tests that the dense blocks match the sparse blocks."""
+
+  def _assert_dense_matches_sparse(self, sparse_block, dense_block, field):
+    input_graph = self._get_input_graph()
+    sparse_output = sparse_block(input_graph)
+    dense_output = utils_tf.dense_to_graphs_tuple(
+        dense_block(utils_tf.graphs_tuple_to_dense(input_graph)), input_graph)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      sparse_output, dense_output = sess.run([sparse_output, dense_output])
+    self.assertAllClose(getattr(sparse_output, field),
+                        getattr(dense_output, field))
+
+  @parameterized.named_parameters(
+      ("all inputs", True, True, True, True),
+      ("edges only", True, False, False, False),
+      ("nodes only", False, True, True, False),
+      ("globals only", False, False, False, True),
+  )
+  def test_edge_block(
+      self, use_edges, use_receiver_nodes, use_sender_nodes, use_globals):
+    model = snt.Linear(output_size=5)
+    block_kwargs = dict(use_edges=use_edges,
+                        use_receiver_nodes=use_receiver_nodes,
+                        use_sender_nodes=use_sender_nodes,
+                        use_globals=use_globals)
+    self._assert_dense_matches_sparse(
+        blocks.EdgeBlock(lambda: model, **block_kwargs),
+        blocks.DenseEdgeBlock(lambda: model, **block_kwargs), "edges")
+
+  @parameterized.named_parameters(
+      ("sum", tf.unsorted_segment_sum),
+      ("mean", tf.math.unsorted_segment_mean),
+      ("max", blocks.unsorted_segment_max_or_zero),
+      ("min", blocks.unsorted_segment_min_or_zero),
+  )
+  def test_node_block(self, reducer):
+    model = snt.Linear(output_size=5)
+    block_kwargs = dict(use_received_edges=True,
+                        use_sent_edges=True,
+                        received_edges_reducer=reducer,
+                        sent_edges_reducer=reducer)
+    self._assert_dense_matches_sparse(
+        blocks.NodeBlock(lambda: model, **block_kwargs),
+        blocks.DenseNodeBlock(lambda: model, **block_kwargs), "nodes")
+
+  @parameterized.named_parameters(
+      ("sum", tf.unsorted_segment_sum),
+      ("mean", tf.math.unsorted_segment_mean),
+      ("max", blocks.unsorted_segment_max_or_zero),
+      ("min", blocks.unsorted_segment_min_or_zero),
+  )
+  def test_global_block(self, reducer):
+    model = snt.Linear(output_size=5)
+    block_kwargs = dict(nodes_reducer=reducer, edges_reducer=reducer)
+    self._assert_dense_matches_sparse(
+        blocks.GlobalBlock(lambda: model, **block_kwargs),
+        blocks.DenseGlobalBlock(lambda: model, **block_kwargs), "globals")
+
+  def test_unsupported_reducer_raises_exception(self):
+    with self.assertRaisesRegexp(ValueError, "no dense counterpart"):
+      blocks.DenseNodeBlock(lambda: None, received_edges_reducer=tf.reduce_sum)
+
+  def test_no_input_raises_exception(self):
+    with self.assertRaisesRegexp(ValueError, "At least one of "):
+      blocks.DenseEdgeBlock(lambda: None, use_edges=False,
+                            use_receiver_nodes=False, use_sender_nodes=False,
+                            use_globals=False)
+
+
+class TypedBlocksTest(GraphModuleTest):
+  """Tests for the typed blocks."""
+
+  def setUp(self):
+    super(TypedBlocksTest, self).setUp()
+    r, s = ("a", "r", "b"), ("b", "s", "a")
+    self.np_graph = graphs.TypedGraphsTuple(
+        nodes={"a": np.arange(6, dtype=np.float32).reshape([3, 2]),
+               "b": np.arange(3, dtype=np.float32)[:, None] + 10.},
+        edges={r: np.arange(4, dtype=np.float32)[:, None] + 20.,
+               s: np.arange(6, dtype=np.float32).reshape([2, 3]) + 30.},
+        receivers={r: np.array([0, 0, 1, 2], dtype=np.int32),
+                   s: np.array([1, 2], dtype=np.int32)},
+        senders={r: np.array([1, 0, 2, 2], dtype=np.int32),
+                 s: np.array([0, 2], dtype=np.int32)},
+        globals=np.array([[1.], [2.]], dtype=np.float32),
+        n_node={"a": np.array([2, 1], dtype=np.int32),
+                "b": np.array([2, 1], dtype=np.int32)},
+        n_edge={r: np.array([2, 2], dtype=np.int32),
+                s: np.array([1, 1], dtype=np.int32)})
+    to_tensors = lambda d: {k: tf.constant(v) for k, v in d.items()}
+    self.graph = self.np_graph.map(
+        to_tensors, ["nodes", "edges", "receivers", "senders", "n_node",
+                     "n_edge"]).replace(
+                         globals=tf.constant(self.np_graph.globals))
+
+  def test_edge_block(self):
+    edge_model_fns = {t: (lambda: tf.identity) for t in self.np_graph.n_edge}
+    output = blocks.TypedEdgeBlock(edge_model_fns)(self.graph)
+    with self.test_session() as sess:
+      actual = sess.run(output.edges)
+    graph = self.np_graph
+    for edge_type in graph.edge_types:
+      sender_type, _, receiver_type = edge_type
+      graph_index = np.repeat(np.arange(2), graph.n_edge[edge_type])
+      expected = np.concatenate(
+          [graph.edges[edge_type],
+           graph.nodes[receiver_type][graph.receivers[edge_type]],
+           graph.nodes[sender_type][graph.senders[edge_type]],
+           graph.globals[graph_index]], axis=-1)
+      self.assertAllClose(expected, actual[edge_type])
+
+  def test_node_block(self):
+    node_model_fns = {t: (lambda: tf.identity) for t in self.np_graph.n_node}
+    block = blocks.TypedNodeBlock(node_model_fns, use_sent_edges=True)
+    output = block(self.graph)
+    with self.test_session() as sess:
+      actual = sess.run(output.nodes)
+    graph = self.np_graph
+
+    def aggregate(edge_type, indices, num_nodes):
+      edges = graph.edges[edge_type]
+      aggregated = np.zeros([num_nodes, edges.shape[1]], np.float32)
+      np.add.at(aggregated, indices, edges)
+      return aggregated
+
+    for node_type in graph.node_types:
+      nodes = graph.nodes[node_type]
+      received = [aggregate(t, graph.receivers[t], nodes.shape[0])
+                  for t in graph.edge_types if t[2] == node_type]
+      sent = [aggregate(t, graph.senders[t], nodes.shape[0])
+              for t in graph.edge_types if t[0] == node_type]
+      graph_index = np.repeat(np.arange(2), graph.n_node[node_type])
+      expected = np.concatenate(
+          received + sent + [nodes, graph.globals[graph_index]], axis=-1)
+      self.assertAllClose(expected, actual[node_type])
+
+  def test_missing_model_raises_exception(self):
+    block = blocks.TypedNodeBlock({"a": lambda: tf.identity})
+    with self.assertRaisesRegexp(ValueError, "No node model for type 'b'"):
+      block(self.graph)
+
+
+class BipartiteBlocksTest(GraphModuleTest):
+  """Tests for the bipartite blocks."""
+
+  def setUp(self):
+    super(BipartiteBlocksTest, self).setUp()
+    self.np_graph = utils_np.bipartite_data_dicts_to_graphs_tuple(
+        test_utils.make_bipartite_data_dicts())
+    self.graph = utils_tf.bipartite_data_dicts_to_graphs_tuple(
+        test_utils.make_bipartite_data_dicts())
+
+  def test_edge_block(self):
+    block = blocks.BipartiteEdgeBlock(lambda: tf.identity)
+    output = block(self.graph)
+    with self.test_session() as sess:
+      actual = sess.run(output.edges)
+    graph = self.np_graph
+    graph_index = np.repeat(np.arange(3), graph.n_edge)
+    expected = np.concatenate(
+        [graph.edges, graph.left_nodes[graph.senders],
+         graph.right_nodes[graph.receivers], graph.globals[graph_index]],
+        axis=-1)
+    self.assertAllClose(expected, actual)
+
+  @parameterized.named_parameters(
+      ("left", "left", "left_nodes", "n_left_nodes", "senders"),
+      ("right", "right", "right_nodes", "n_right_nodes", "receivers"),
+  )
+  def test_node_block(self, side, nodes_field, count_field, index_field):
+    block = blocks.BipartiteNodeBlock(lambda: tf.identity, side=side)
+    output = block(self.graph)
+    with self.test_session() as sess:
+      actual = sess.run(output)
+    graph = self.np_graph
+    nodes = getattr(graph, nodes_field)
+    aggregated = np.zeros([nodes.shape[0], graph.edges.shape[1]], np.float32)
+    np.add.at(aggregated, getattr(graph, index_field), graph.edges)
+    graph_index = np.repeat(np.arange(3), getattr(graph, count_field))
+    expected = np.concatenate(
+        [aggregated, nodes, graph.globals[graph_index]], axis=-1)
+    self.assertAllClose(expected, getattr(actual, nodes_field))
+    other_field = "right_nodes" if side == "left" else "left_nodes"
+    self.assertAllClose(getattr(graph, other_field),
+                        getattr(actual, other_field))
+
+  def test_invalid_side_raises_exception(self):
+    with self.assertRaisesRegexp(ValueError, "`side` must be"):
+      blocks.BipartiteNodeBlock(lambda: None, side="top")
+
 if __name__ == "__main__":
   tf.test.main()
@@ -0,0 +1,152 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for export_tf.py, against the numpy engine of inference_np.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import functools
+import time
+
+from absl.testing import parameterized
+from graph_nets import blocks
+from graph_nets import export_tf
+from graph_nets import generators
+from graph_nets import inference_np
+from graph_nets import modules
+from graph_nets import utils_np
+from graph_nets import utils_tf
+import numpy as np
+import sonnet as snt
+import tensorflow as tf
+
+
+def _mlp_with_layer_norm():
+  return snt.Sequential([
+      snt.nets.MLP([8, 8], activate_final=True),
+      snt.LayerNorm()])
+
+
+def _graph(num_graphs=4, seed=0):
+  return generators.erdos_renyi(
+      num_graphs, (1, 10), 0.3, node_size=3, edge_size=2, global_size=4,
+      seed=seed)
+
+
+class ExportTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _assert_same_outputs(self, module, graph):
+    placeholders = utils_tf.placeholders_from_spec(
+        utils_np.spec_from_graphs_tuple(graph))
+    output = module(placeholders)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      expected = sess.run(utils_tf.make_runnable_in_session(output),
+                          utils_tf.get_feed_dict(placeholders, graph))
+      description = export_tf.export(module, sess)
+    actual = inference_np.build(description)(graph)
+    for field in ["nodes", "edges", "globals"]:
+      self.assertAllClose(getattr(expected, field), getattr(actual, field),
+                          rtol=1e-4, atol=1e-4)
+    return description
+
+  @parameterized.named_parameters(
+      ("sum", tf.unsorted_segment_sum),
+      ("mean", tf.unsorted_segment_mean),
+      ("max", blocks.unsorted_segment_max_or_zero),
+      ("min", blocks.unsorted_segment_min_or_zero))
+  def test_graph_network(self, reducer):
+    module = modules.GraphNetwork(
+        _mlp_with_layer_norm, _mlp_with_layer_norm, _mlp_with_layer_norm,
+        reducer=reducer, node_block_opt={"use_sent_edges": True})
+    self._assert_same_outputs(module, _graph())
+
+  def test_encode_process_decode(self):
+    encoder = modules.GraphIndependent(
+        edge_model_fn=functools.partial(snt.Linear, 5),
+        node_model_fn=_mlp_with_layer_norm)
+    core = modules.InteractionNetwork(
+        functools.partial(snt.nets.MLP, [8], activation=tf.nn.tanh),
+        functools.partial(snt.nets.MLP, [8]))
+    decoder = blocks.GlobalBlock(
+        lambda: snt.Sequential([snt.Linear(3), tf.nn.sigmoid]),
+        use_edges=False)
+    description = self._assert_same_outputs(
+        snt.Sequential([encoder, core, core, decoder]), _graph())
+    self.assertEqual(4, len(description["layers"]))
+    self.assertIsNone(description["layers"][0]["global_model"])
+
+  def test_unsupported_module_raises(self):
+    module = modules.RelationNetwork(functools.partial(snt.Linear, 3),
+                                     functools.partial(snt.Linear, 3))
+    with self.test_session() as sess:
+      with self.assertRaisesRegexp(ValueError, "Cannot export the graph"):
+        export_tf.export(module, sess)
+
+  def test_unsupported_activation_raises(self):
+    module = blocks.NodeBlock(
+        lambda: snt.Sequential([snt.Linear(3), tf.nn.selu]),
+        use_received_edges=False)
+    graph = _graph()
+    module(utils_tf.placeholders_from_spec(
+        utils_np.spec_from_graphs_tuple(graph)))
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      with self.assertRaisesRegexp(ValueError, "Cannot export the activation"):
+        export_tf.export(module, sess)
+
+
+class InferenceBenchmark(tf.test.Benchmark):
+  """Benchmarks the latency of a small model in numpy and in a session."""
+
+  def _benchmark_latency(self, num_graphs, num_iters=100):
+    graph = _graph(num_graphs)
+    with tf.Graph().as_default():
+      module = modules.GraphNetwork(
+          _mlp_with_layer_norm, _mlp_with_layer_norm, _mlp_with_layer_norm)
+      placeholders = utils_tf.placeholders_from_spec(
+          utils_np.spec_from_graphs_tuple(graph))
+      output = utils_tf.make_runnable_in_session(module(placeholders))
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        model = inference_np.build(export_tf.export(module, sess))
+        feed_dict = utils_tf.get_feed_dict(placeholders, graph)
+        sess.run(output, feed_dict)
+        start_time = time.time()
+        for _ in range(num_iters):
+          sess.run(output, utils_tf.get_feed_dict(placeholders, graph))
+        session_time = (time.time() - start_time) / num_iters
+    start_time = time.time()
+    for _ in range(num_iters):
+      model(graph)
+    numpy_time = (time.time() - start_time) / num_iters
+    self.report_benchmark(
+        iters=num_iters, wall_time=session_time,
+        name="session_{}_graphs".format(num_graphs))
+    self.report_benchmark(
+        iters=num_iters, wall_time=numpy_time,
+        name="numpy_{}_graphs".format(num_graphs))
+
+  def benchmark_latency_1_graph(self):
+    self._benchmark_latency(1)
+
+  def benchmark_latency_16_graphs(self):
+    self._benchmark_latency(16)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,209 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for feeders.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+from absl.testing import parameterized
+from graph_nets import feeders
+from graph_nets import utils_np
+import numpy as np
+import tensorflow as tf
+
+
+def _make_data_dicts(batch_index):
+  return [{"nodes": np.full([n, 2], batch_index, np.float32),
+           "globals": np.array([batch_index], np.float32)}
+          for n in range(1, 4)]
+
+
+def _attached_segments():
+  return feeders._attached_segments  # pylint: disable=protected-access
+
+
+def _raise_on_negative(value):
+  if value < 0:
+    raise ValueError("Negative value")
+  return value
+
+
+class PrefetchFeederTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.named_parameters(("threads", False), ("processes", True))
+  def test_batches_in_order(self, use_processes):
+    inputs = [_make_data_dicts(i) for i in range(10)]
+    with feeders.PrefetchFeeder(inputs, num_workers=3, capacity=4,
+                                use_processes=use_processes) as feeder:
+      batches = list(feeder)
+    self.assertTrue(feeder.closed)
+    self.assertEqual(10, len(batches))
+    for i, batch in enumerate(batches):
+      expected = utils_np.data_dicts_to_graphs_tuple(inputs[i])
+      self.assertAllEqual(expected.nodes, batch.nodes)
+      self.assertAllEqual(expected.globals, batch.globals)
+      self.assertAllEqual([1, 2, 3], batch.n_node)
+
+  def test_backpressure(self):
+    consumed = []
+
+    def inputs():
+      i = 0
+      while True:
+        consumed.append(i)
+        yield i
+        i += 1
+
+    with feeders.PrefetchFeeder(inputs(), convert_fn=lambda x: x,
+                                capacity=3) as feeder:
+      self.assertEqual(3, len(consumed))
+      self.assertEqual([0, 1, 2], [next(feeder) for _ in range(3)])
+      self.assertEqual(6, len(consumed))
+      self.assertEqual(3, feeder.num_pending)
+
+  def test_error_is_raised_and_closes(self):
+    feeder = feeders.PrefetchFeeder([1, -1, 2], convert_fn=_raise_on_negative)
+    self.assertEqual(1, next(feeder))
+    with self.assertRaisesRegexp(ValueError, "Negative value"):
+      next(feeder)
+    self.assertTrue(feeder.closed)
+    self.assertEqual([], list(feeder))
+
+  def test_input_error_is_raised_after_previous_batches(self):
+
+    def inputs():
+      for i in range(3):
+        yield i
+      raise ValueError("Broken inputs")
+
+    feeder = feeders.PrefetchFeeder(inputs(), convert_fn=lambda x: x,
+                                    capacity=2)
+    self.assertEqual([0, 1, 2], [next(feeder) for _ in range(3)])
+    self.assertFalse(feeder.closed)
+    with self.assertRaisesRegexp(ValueError, "Broken inputs"):
+      next(feeder)
+    self.assertTrue(feeder.closed)
+    self.assertEqual([], list(feeder))
+
+  def test_input_error_in_constructor_closes(self):
+
+    def inputs():
+      yield 0
+      raise ValueError("Broken inputs")
+
+    num_threads = threading.active_count()
+    with self.assertRaisesRegexp(ValueError, "Broken inputs"):
+      feeders.PrefetchFeeder(inputs(), convert_fn=lambda x: x, capacity=2)
+    # The worker threads were stopped.
+    self.assertEqual(num_threads, threading.active_count())
+
+  def test_close(self):
+    feeder = feeders.PrefetchFeeder(range(100), convert_fn=lambda x: x)
+    self.assertEqual(0, next(feeder))
+    feeder.close()
+    self.assertTrue(feeder.closed)
+    self.assertEqual(0, feeder.num_pending)
+    self.assertEqual([], list(feeder))
+
+  def test_invalid_arguments(self):
+    with self.assertRaisesRegexp(ValueError, "`num_workers` must be positive"):
+      feeders.PrefetchFeeder([], num_workers=0)
+    with self.assertRaisesRegexp(ValueError, "`capacity` must be positive"):
+      feeders.PrefetchFeeder([], capacity=0)
+
+
+class SharedMemoryTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ("no nones", []),
+      ("no features", ["nodes", "edges", "globals"]),
+      ("no edges", ["edges", "receivers", "senders"]))
+  def test_write_read_round_trip(self, none_fields):
+    graph = utils_np.data_dicts_to_graphs_tuple([
+        {"nodes": np.random.randn(3, 2).astype(np.float32),
+         "edges": np.random.randn(2, 5),
+         "senders": [0, 1], "receivers": [1, 2],
+         "globals": np.array([1, 2], np.int64)}])
+    graph = graph.map(lambda _: None, none_fields)
+    buffer_ = bytearray(4096)
+    header = feeders.write_graphs_tuple(graph, buffer_)
+    output = feeders.read_graphs_tuple(header, buffer_)
+    for field in utils_np.ALL_FIELDS:
+      value = getattr(graph, field)
+      if value is None:
+        self.assertIsNone(getattr(output, field))
+      else:
+        self.assertAllEqual(value, getattr(output, field))
+        self.assertEqual(value.dtype, getattr(output, field).dtype)
+        self.assertEqual(0, header[field][2] % 64)
+    # The output is a view of the buffer.
+    output.n_node[0] = 7
+    self.assertEqual(7, feeders.read_graphs_tuple(header, buffer_).n_node[0])
+
+  def test_write_too_large_raises(self):
+    graph = utils_np.data_dicts_to_graphs_tuple(
+        [{"nodes": np.zeros([100, 10])}])
+    with self.assertRaisesRegexp(ValueError, "does not fit"):
+      feeders.write_graphs_tuple(graph, bytearray(1024))
+
+  def test_ring(self):
+    ring = feeders.SharedMemoryRing(2, 1024)
+    try:
+      first = ring.acquire()
+      second = ring.acquire()
+      self.assertNotEqual(ring.name(first), ring.name(second))
+      with self.assertRaisesRegexp(RuntimeError, "leased"):
+        ring.acquire()
+      ring.release(first)
+      self.assertEqual(1, ring.num_free)
+      self.assertEqual(first, ring.acquire())
+    finally:
+      ring.close()
+
+  @parameterized.named_parameters(("threads", False), ("processes", True))
+  def test_feeder_with_shared_memory(self, use_processes):
+    inputs = [_make_data_dicts(i) for i in range(6)]
+    with feeders.PrefetchFeeder(inputs, num_workers=2, capacity=2,
+                                use_processes=use_processes,
+                                shared_memory_size=1 << 16) as feeder:
+      for i, batch in enumerate(feeder):
+        expected = utils_np.data_dicts_to_graphs_tuple(inputs[i])
+        self.assertFalse(batch.nodes.flags.owndata)
+        self.assertAllEqual(expected.nodes, batch.nodes)
+        self.assertAllEqual(expected.n_node, batch.n_node)
+        self.assertIsNone(batch.edges)
+    self.assertEqual(5, i)
+    self.assertTrue(feeder.closed)
+    # No segment stays attached to this process once the ring is closed.
+    self.assertEqual({}, _attached_segments())
+
+  def test_ring_close_detaches_segments(self):
+    ring = feeders.SharedMemoryRing(1, 1024)
+    graph = utils_np.data_dicts_to_graphs_tuple(_make_data_dicts(0))
+    header = feeders._convert_into_segment(  # pylint: disable=protected-access
+        lambda x: x, ring.name(0), graph)
+    self.assertAllEqual(graph.nodes, feeders.read_graphs_tuple(
+        header, ring.buffer(0)).nodes)
+    self.assertIn(ring.name(0), _attached_segments())
+    ring.close()
+    self.assertEqual({}, _attached_segments())
+
+
+if __name__ == "__main__":
+  tf.test.main()
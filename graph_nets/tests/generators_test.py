@@ -0,0 +1,138 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for generators.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from absl.testing import parameterized
+from graph_nets import generators
+import numpy as np
+import tensorflow as tf
+
+
+def _graph_of_edges(graph):
+  return np.repeat(np.arange(len(graph.n_node)), graph.n_edge)
+
+
+class GeneratorsTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _assert_valid(self, graph, node_size, edge_size, global_size):
+    num_graphs = len(graph.n_node)
+    self.assertEqual((graph.n_node.sum(), node_size), graph.nodes.shape)
+    self.assertEqual((graph.n_edge.sum(), edge_size), graph.edges.shape)
+    self.assertEqual((num_graphs, global_size), graph.globals.shape)
+    self.assertEqual(np.int32, graph.senders.dtype)
+    self.assertEqual(np.int32, graph.receivers.dtype)
+    graph_of_edges = _graph_of_edges(graph)
+    first_node = (np.cumsum(graph.n_node) - graph.n_node)[graph_of_edges]
+    last_node = first_node + graph.n_node[graph_of_edges]
+    for indices in (graph.senders, graph.receivers):
+      self.assertTrue(np.all(indices >= first_node))
+      self.assertTrue(np.all(indices < last_node))
+
+  @parameterized.named_parameters(
+      ("erdos_renyi",
+       lambda **kw: generators.erdos_renyi(7, (3, 20), 0.3, **kw)),
+      ("power_law", lambda **kw: generators.power_law(7, (3, 20), 3, **kw)),
+      ("grid", lambda **kw: generators.grid(7, 3, 5, **kw)),
+      ("periodic_grid",
+       lambda **kw: generators.grid(7, 3, 5, periodic=True, **kw)),
+      ("tree", lambda **kw: generators.tree(7, (1, 20), **kw)),
+      ("molecule_like", lambda **kw: generators.molecule_like(7, **kw)),
+  )
+  def test_generators(self, generator_fn):
+    graph = generator_fn(node_size=2, edge_size=3, global_size=4, seed=0)
+    self._assert_valid(graph, 2, 3, 4)
+    self.assertEqual(np.float32, graph.nodes.dtype)
+    same_graph = generator_fn(node_size=2, edge_size=3, global_size=4, seed=0)
+    for field, same_field in zip(graph, same_graph):
+      self.assertAllEqual(field, same_field)
+    featureless_graph = generator_fn(node_size=None, edge_size=None,
+                                     global_size=None, seed=0)
+    self.assertIsNone(featureless_graph.nodes)
+    self.assertIsNone(featureless_graph.edges)
+    self.assertIsNone(featureless_graph.globals)
+
+  def test_erdos_renyi(self):
+    graph = generators.erdos_renyi(50, (5, 30), 0.2, seed=1)
+    self.assertTrue(np.all(graph.senders != graph.receivers))
+    edges = set(zip(graph.senders, graph.receivers))
+    self.assertEqual(len(graph.senders), len(edges))
+    num_pairs = np.sum(graph.n_node * (graph.n_node - 1))
+    self.assertNear(0.2, graph.n_edge.sum() / num_pairs, 0.02)
+
+    complete_graph = generators.erdos_renyi(3, 4, 1.)
+    self.assertAllEqual([12, 12, 12], complete_graph.n_edge)
+    empty_graph = generators.erdos_renyi(3, 4, 0.)
+    self.assertAllEqual([0, 0, 0], empty_graph.n_edge)
+    with self.assertRaisesRegexp(ValueError, "edge probability"):
+      generators.erdos_renyi(3, 4, 1.5)
+
+  def test_power_law(self):
+    graph = generators.power_law(1, 1000, 5, seed=0)
+    self.assertEqual([5000], graph.n_edge)
+    in_degrees = np.bincount(graph.receivers, minlength=1000)
+    self.assertGreater(in_degrees[0], 20 * np.median(in_degrees))
+    with self.assertRaisesRegexp(ValueError, "exponent"):
+      generators.power_law(1, 10, 5, exponent=1.)
+
+  def test_grid(self):
+    graph = generators.grid(2, 2, 3, node_size=None)
+    self.assertAllEqual([6, 6], graph.n_node)
+    self.assertAllEqual([14, 14], graph.n_edge)
+    edges = set(zip(graph.senders[:14], graph.receivers[:14]))
+    self.assertEqual(
+        {(0, 1), (1, 2), (3, 4), (4, 5), (0, 3), (1, 4), (2, 5)},
+        {(s, r) for s, r in edges if s < r})
+    self.assertTrue(all((r, s) in edges for s, r in edges))
+    self.assertAllEqual(graph.senders[:14] + 6, graph.senders[14:])
+    periodic_graph = generators.grid(1, 3, 4, periodic=True)
+    self.assertEqual([4 * 12], periodic_graph.n_edge)
+    with self.assertRaisesRegexp(ValueError, "Periodic grids"):
+      generators.grid(1, 2, 4, periodic=True)
+
+  def test_tree(self):
+    graph = generators.tree(10, (1, 50), seed=2)
+    self.assertAllEqual(graph.n_node - 1, graph.n_edge)
+    # Each node but the roots has exactly one parent, with a smaller index.
+    roots = np.cumsum(graph.n_node) - graph.n_node
+    self.assertAllEqual(
+        np.setdiff1d(np.arange(graph.n_node.sum()), roots),
+        np.sort(graph.receivers))
+    self.assertTrue(np.all(graph.senders < graph.receivers))
+
+  def test_molecule_like(self):
+    graph = generators.molecule_like(100, num_nodes=(5, 30), seed=3)
+    # Bonds are represented in both directions.
+    self.assertAllEqual(graph.senders[0::2], graph.receivers[1::2])
+    self.assertAllEqual(graph.receivers[0::2], graph.senders[1::2])
+    self.assertTrue(np.all(graph.n_edge >= 2 * (graph.n_node - 1)))
+    self.assertTrue(np.all(graph.senders != graph.receivers))
+    tree_graph = generators.molecule_like(100, ring_probability=0., seed=3)
+    self.assertAllEqual(2 * (tree_graph.n_node - 1), tree_graph.n_edge)
+    self.assertLessEqual(np.bincount(tree_graph.senders).max(), 4)
+
+  def test_invalid_num_nodes(self):
+    with self.assertRaisesRegexp(ValueError, "must be positive"):
+      generators.tree(2, 0)
+    with self.assertRaisesRegexp(ValueError, "range of the number of nodes"):
+      generators.tree(2, (5, 5))
+
+
+if __name__ == "__main__":
+  tf.test.main()
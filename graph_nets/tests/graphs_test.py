@@ -19,9 +19,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import timeit
 
 from absl.testing import parameterized
 from graph_nets import graphs
+import numpy as np
 import tensorflow as tf
 
 
@@ -139,6 +141,213 @@ class GraphsTest(tf.test.TestCase, parameterized.TestCase):
     graph = graphs.GraphsTuple(**self.graph)
     graph = graph.map(lambda v: None, ["edges", "receivers", "senders"])
 
+  def test_map_repeated_field_called_once(self):
+    """Tests that a repeated field is mapped once, from its original value."""
+    graph = graphs.GraphsTuple(**self.graph)
+    mapped_fields = []
+    def map_fn(v):
+      mapped_fields.append(v)
+      return v + v
+    graph = graph.map(map_fn, ["nodes", "edges", "nodes"])
+    self.assertListEqual(["nodes", "edges"], mapped_fields)
+    self.assertEqual("nodesnodes", graph.nodes)
+
+  def test_map_unknown_field_raises_error(self):
+    graph = graphs.GraphsTuple(**self.graph)
+    with self.assertRaisesRegexp(ValueError, "unexpected field name"):
+      graph.map(lambda v: v, ["nodes", "unknown_field"])
+
+  def test_replace_unknown_field_raises_error(self):
+    graph = graphs.GraphsTuple(**self.graph)
+    with self.assertRaisesRegexp(ValueError, "unexpected field name"):
+      graph.replace(unknown_field=None)
+
+  def test_trusted_is_not_validated(self):
+    self.graph["n_node"] = None
+    graph = graphs.GraphsTuple.trusted(**self.graph)
+    self.assertIsInstance(graph, graphs.GraphsTuple)
+    for k, v in self.graph.items():
+      self.assertEqual(v, getattr(graph, k))
+
+  def test_validation_context(self):
+    self.assertTrue(graphs.is_validation_enabled())
+    with graphs.validation(False):
+      self.assertFalse(graphs.is_validation_enabled())
+      graph = graphs.GraphsTuple(**self.graph)
+      graph = graph.replace(n_node=None)
+      graph = graph.map(lambda v: None, ["receivers"])
+      self.assertIsNone(graph.n_node)
+      self.assertIsNone(graph.receivers)
+    self.assertTrue(graphs.is_validation_enabled())
+    with self.assertRaisesRegexp(ValueError, "n_node"):
+      graph.replace(nodes=None)
+
+  def test_set_validation(self):
+    graphs.set_validation(False)
+    try:
+      self.graph["n_edge"] = None
+      graphs.GraphsTuple(**self.graph)
+    finally:
+      graphs.set_validation(True)
+    with self.assertRaisesRegexp(ValueError, "n_edge"):
+      graphs.GraphsTuple(**self.graph)
+
+
+class BipartiteGraphsTest(tf.test.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super(BipartiteGraphsTest, self).setUp()
+    self.graph = {k: k for k in graphs.BIPARTITE_ALL_FIELDS}
+
+  @parameterized.named_parameters(
+      ("no n_left_nodes", ["n_left_nodes"],),
+      ("no n_right_nodes", ["n_right_nodes"],),
+      ("no n_edge", ["n_edge"],),
+      ("receivers but no senders", ["edges", "senders"],),
+      ("senders but no receivers", ["edges", "receivers"],),
+      ("edges but no senders/receivers", ["receivers", "senders"],),
+  )
+  def test_inconsistent_none_fields_raise_error(self, none_fields):
+    for none_field in none_fields:
+      self.graph[none_field] = None
+    with self.assertRaisesRegexp(ValueError, none_fields[-1]):
+      graphs.BipartiteGraphsTuple(**self.graph)
+    with graphs.validation(False):
+      graphs.BipartiteGraphsTuple(**self.graph)
+
+  @parameterized.named_parameters(
+      ("all fields defined", []),
+      ("no node features", ["left_nodes", "right_nodes"]),
+      ("no edges", ["edges", "receivers", "senders"]),
+      ("no globals", ["globals"]),
+  )
+  def test_replace_and_map_with_valid_none_fields(self, none_fields):
+    graph = graphs.BipartiteGraphsTuple(**self.graph)
+    replaced = graph.replace(**{k: None for k in none_fields})
+    mapped = graph.map(lambda v: None, none_fields)
+    for k in graphs.BIPARTITE_ALL_FIELDS:
+      expected = None if k in none_fields else k
+      self.assertEqual(expected, getattr(replaced, k))
+      self.assertEqual(expected, getattr(mapped, k))
+
+  def test_map_defaults_to_all_fields(self):
+    graph = graphs.BipartiteGraphsTuple(**self.graph)
+    graph = graph.map(lambda v: v + v)
+    for k in graphs.BIPARTITE_ALL_FIELDS:
+      self.assertEqual(k + k, getattr(graph, k))
+
+
+class TypedGraphsTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(TypedGraphsTest, self).setUp()
+    edge_types = [("a", "r", "b"), ("b", "r", "b")]
+    self.graph = dict(
+        nodes={"a": "nodes_a", "b": "nodes_b"},
+        edges={t: "edges" for t in edge_types},
+        receivers={t: "receivers" for t in edge_types},
+        senders={t: "senders" for t in edge_types},
+        globals="globals",
+        n_node={"a": "n_node_a", "b": "n_node_b"},
+        n_edge={t: "n_edge" for t in edge_types})
+
+  def test_creation_with_valid_fields(self):
+    graph = graphs.TypedGraphsTuple(**self.graph)
+    self.assertEqual(["a", "b"], graph.node_types)
+    self.assertEqual([("a", "r", "b"), ("b", "r", "b")], graph.edge_types)
+    graph = graph.replace(edges=None, senders=None, receivers=None, nodes=None)
+    self.assertIsNone(graph.senders)
+
+  def test_inconsistent_node_types_raise_error(self):
+    self.graph["nodes"] = {"a": "nodes_a"}
+    with self.assertRaisesRegexp(ValueError, "node types"):
+      graphs.TypedGraphsTuple(**self.graph)
+
+  def test_inconsistent_edge_types_raise_error(self):
+    self.graph["senders"] = {("a", "r", "b"): "senders"}
+    with self.assertRaisesRegexp(ValueError, "`senders` has edge types"):
+      graphs.TypedGraphsTuple(**self.graph)
+
+  def test_unknown_node_type_in_edge_type_raises_error(self):
+    edge_type = ("a", "r", "c")
+    for field in ["edges", "receivers", "senders", "n_edge"]:
+      self.graph[field] = {edge_type: field}
+    with self.assertRaisesRegexp(ValueError, "known node types"):
+      graphs.TypedGraphsTuple(**self.graph)
+
+  def test_none_number_field_raises_error(self):
+    self.graph["n_node"] = None
+    with self.assertRaisesRegexp(ValueError, "n_node"):
+      graphs.TypedGraphsTuple(**self.graph)
+
+
+class FieldSpecTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(FieldSpecTest, self).setUp()
+    self.spec = graphs.GraphsTuple(
+        nodes=graphs.FieldSpec("float32", [3, 2]),
+        edges=graphs.FieldSpec(np.dtype("float64"), (4,), sparse=True),
+        receivers=graphs.FieldSpec("int32", ()),
+        senders=graphs.FieldSpec("int32", ()),
+        globals=None,
+        n_node=graphs.FieldSpec("int32", ()),
+        n_edge=graphs.FieldSpec("int32", ()))
+
+  def test_field_spec_is_normalized(self):
+    self.assertEqual(("float32", (3, 2), False), self.spec.nodes)
+    self.assertEqual(("float64", (4,), True), self.spec.edges)
+
+  def test_json_round_trip(self):
+    self.assertEqual(
+        self.spec, graphs.spec_from_json(graphs.spec_to_json(self.spec)))
+
+  def test_json_with_missing_field_raises(self):
+    string = graphs.spec_to_json(self.spec).replace('"n_edge"', '"n_edges"')
+    with self.assertRaisesRegexp(ValueError, "Expected a spec with fields"):
+      graphs.spec_from_json(string)
+
+
+class GraphsTupleBenchmark(tf.test.Benchmark):
+  """Benchmarks the construction, `replace` and `map` of `GraphsTuple`s."""
+
+  def _numpy_fields(self):
+    return dict(
+        nodes=np.zeros([10, 4], np.float32),
+        edges=np.zeros([20, 4], np.float32),
+        receivers=np.zeros([20], np.int32),
+        senders=np.zeros([20], np.int32),
+        globals=np.zeros([2, 4], np.float32),
+        n_node=np.array([5, 5], np.int32),
+        n_edge=np.array([10, 10], np.int32))
+
+  def _run_benchmarks(self, payload_name, fields):
+    graph = graphs.GraphsTuple(**fields)
+    benchmarks = [
+        ("construct", lambda: graphs.GraphsTuple(**fields)),
+        ("construct_trusted", lambda: graphs.GraphsTuple.trusted(**fields)),
+        ("replace", lambda: graph.replace(nodes=fields["nodes"])),
+        ("map", lambda: graph.map(lambda v: v)),
+    ]
+    num_iters = 10000
+    for validate in (True, False):
+      with graphs.validation(validate):
+        for name, fn in benchmarks:
+          wall_time = timeit.timeit(fn, number=num_iters) / num_iters
+          self.report_benchmark(
+              iters=num_iters,
+              wall_time=wall_time,
+              name="graphs_tuple_{}_{}{}".format(
+                  name, payload_name, "" if validate else "_no_validation"))
+
+  def benchmark_numpy_payload(self):
+    self._run_benchmarks("numpy", self._numpy_fields())
+
+  def benchmark_tf_payload(self):
+    with tf.Graph().as_default():
+      self._run_benchmarks(
+          "tf", {k: tf.constant(v) for k, v in self._numpy_fields().items()})
+
 
 if __name__ == "__main__":
   tf.test.main()
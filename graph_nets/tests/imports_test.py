@@ -0,0 +1,90 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for the lazy import of the Tensorflow parts of the package."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import subprocess
+import sys
+import time
+
+import tensorflow as tf
+
+
+def _run_in_subprocess(statement):
+  """Runs `statement` in a new interpreter and returns the loaded modules."""
+  code = ("import json, sys\n{}\n"
+          "print(json.dumps(sorted(sys.modules)))".format(statement))
+  output = subprocess.check_output([sys.executable, "-c", code])
+  return set(json.loads(output.decode("utf-8").splitlines()[-1]))
+
+
+class LazyImportTest(tf.test.TestCase):
+
+  def test_numpy_modules_do_not_load_tensorflow(self):
+    modules = _run_in_subprocess(
+        "import graph_nets\n"
+        "from graph_nets import graphs, utils_np\n"
+        "utils_np.data_dicts_to_graphs_tuple([{'nodes': [[0.]], 'senders': [],"
+        " 'receivers': [], 'edges': None, 'globals': None}])")
+    self.assertIn("graph_nets.utils_np", modules)
+    self.assertNotIn("tensorflow", modules)
+    self.assertNotIn("sonnet", modules)
+    self.assertNotIn("graph_nets.utils_tf", modules)
+
+  def test_tensorflow_modules_are_loaded_on_access(self):
+    modules = _run_in_subprocess(
+        "import graph_nets\n"
+        "assert graph_nets.modules.GraphNetwork")
+    self.assertIn("tensorflow", modules)
+    self.assertIn("graph_nets.blocks", modules)
+
+  def test_unknown_attribute_raises(self):
+    import graph_nets  # pylint: disable=g-import-not-at-top
+    with self.assertRaisesRegexp(AttributeError, "no attribute 'foo'"):
+      graph_nets.foo  # pylint: disable=pointless-statement
+    self.assertIn("utils_tf", dir(graph_nets))
+
+
+class ImportBenchmark(tf.test.Benchmark):
+  """Benchmarks the import time of the numpy and Tensorflow parts."""
+
+  def _benchmark_import(self, statement, name, num_iters=5):
+    wall_times = []
+    for _ in range(num_iters):
+      start_time = time.time()
+      subprocess.check_call([sys.executable, "-c", statement])
+      wall_times.append(time.time() - start_time)
+    self.report_benchmark(iters=num_iters, wall_time=min(wall_times),
+                          name=name)
+
+  def benchmark_import_python(self):
+    self._benchmark_import("pass", "import_python")
+
+  def benchmark_import_utils_np(self):
+    self._benchmark_import("from graph_nets import utils_np",
+                           "import_utils_np")
+
+  def benchmark_import_utils_tf(self):
+    self._benchmark_import("from graph_nets import utils_tf",
+                           "import_utils_tf")
+
+
+if __name__ == "__main__":
+  tf.test.main()
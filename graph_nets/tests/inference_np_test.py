@@ -0,0 +1,153 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for inference_np."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import io
+
+from absl.testing import parameterized
+from graph_nets import inference_np
+from graph_nets import utils_np
+import numpy as np
+import tensorflow as tf
+
+
+def _linear(input_size, output_size, seed):
+  random_state = np.random.RandomState(seed)
+  return {"type": "linear",
+          "w": random_state.randn(input_size, output_size).astype(np.float32),
+          "b": random_state.randn(output_size).astype(np.float32)}
+
+
+def _graph():
+  return utils_np.data_dicts_to_graphs_tuple([
+      {"nodes": np.arange(6, dtype=np.float32).reshape([3, 2]),
+       "edges": np.ones([4, 1], np.float32),
+       "senders": [0, 2, 1, 0], "receivers": [2, 2, 0, 1],
+       "globals": np.array([1., -1.], np.float32)},
+      {"nodes": np.ones([1, 2], np.float32),
+       "edges": np.zeros([0, 1], np.float32),
+       "senders": [], "receivers": [],
+       "globals": np.array([2., 0.], np.float32)},
+  ])
+
+
+class SegmentReduceTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ("sum", inference_np.SUM, np.sum),
+      ("mean", inference_np.MEAN, np.mean),
+      ("max", inference_np.MAX, np.max),
+      ("min", inference_np.MIN, np.min))
+  def test_unsorted_segment_reduce(self, reducer, reduce_fn):
+    values = np.random.RandomState(0).randn(20, 3).astype(np.float32)
+    segment_ids = np.random.RandomState(1).randint(0, 8, size=20)
+    segment_ids[segment_ids == 5] = 4  # Segment 5 is empty.
+    output = inference_np.unsorted_segment_reduce(
+        values, segment_ids, 9, reducer)
+    self.assertEqual((9, 3), output.shape)
+    for segment in range(9):
+      rows = values[segment_ids == segment]
+      expected = reduce_fn(rows, axis=0) if len(rows) else np.zeros([3])
+      self.assertAllClose(expected, output[segment])
+
+  def test_segment_reduce_with_empty_segments(self):
+    output = inference_np.segment_reduce(
+        np.arange(4.).reshape([4, 1]), [0, 3, 0, 1, 0], inference_np.MAX)
+    self.assertAllEqual([[0.], [2.], [0.], [3.], [0.]], output)
+
+  def test_unknown_reducer_raises(self):
+    with self.assertRaisesRegexp(ValueError, "Unknown reducer"):
+      inference_np.segment_reduce(np.zeros([1, 1]), [1], "prod")
+
+
+class BuildTest(tf.test.TestCase):
+
+  def test_graph_network(self):
+    graph = _graph()
+    edge_block = {"type": "edge_block", "use_edges": True,
+                  "use_receiver_nodes": True, "use_sender_nodes": False,
+                  "use_globals": True, "model": _linear(5, 3, 0)}
+    node_block = {"type": "node_block", "use_received_edges": True,
+                  "use_sent_edges": False, "use_nodes": True,
+                  "use_globals": False, "received_edges_reducer": "sum",
+                  "sent_edges_reducer": None,
+                  "model": {"type": "sequential", "layers": [
+                      _linear(5, 4, 1), {"type": "activation",
+                                         "function": "relu"}]}}
+    model = inference_np.build(
+        {"type": "sequential", "layers": [edge_block, node_block]})
+    output = model(graph)
+
+    globals_ = np.repeat(graph.globals, graph.n_edge, axis=0)
+    edges = np.concatenate(
+        [graph.edges, graph.nodes[graph.receivers], globals_], axis=-1).dot(
+            edge_block["model"]["w"]) + edge_block["model"]["b"]
+    self.assertAllClose(edges, output.edges)
+    received = np.zeros([4, 3], np.float32)
+    np.add.at(received, graph.receivers, edges)
+    linear = node_block["model"]["layers"][0]
+    nodes = np.maximum(np.concatenate(
+        [received, graph.nodes], axis=-1).dot(linear["w"]) + linear["b"], 0)
+    self.assertAllClose(nodes, output.nodes)
+    self.assertIs(graph.globals, output.globals)
+
+  def test_layer_norm(self):
+    inputs = np.random.RandomState(0).randn(5, 6).astype(np.float32)
+    gamma = np.linspace(0.5, 1.5, 6).astype(np.float32)
+    model = inference_np.build({
+        "type": "graph_independent", "edge_model": None, "global_model": None,
+        "node_model": {"type": "layer_norm", "gamma": gamma, "beta": None,
+                       "eps": 1e-5}})
+    output = model(utils_np.data_dicts_to_graphs_tuple([{"nodes": inputs}]))
+    expected = (inputs - inputs.mean(1, keepdims=True)) / np.sqrt(
+        inputs.var(1, keepdims=True) + 1e-5) * gamma
+    self.assertAllClose(expected, output.nodes, atol=1e-5)
+
+  def test_unknown_type_raises(self):
+    with self.assertRaisesRegexp(ValueError, "Unknown graph module type"):
+      inference_np.build({"type": "relation_network"})
+    with self.assertRaisesRegexp(ValueError, "Unknown activation"):
+      inference_np.build({"type": "graph_independent", "edge_model": None,
+                          "global_model": None, "node_model": {
+                              "type": "activation", "function": "swish"}})
+
+  def test_save_load(self):
+    description = {"type": "graph_independent", "edge_model": None,
+                   "node_model": {"type": "sequential", "layers": [
+                       _linear(2, 3, 0),
+                       {"type": "activation", "function": "tanh"}]},
+                   "global_model": {"type": "layer_norm", "gamma": None,
+                                    "beta": np.ones([2], np.float32),
+                                    "eps": 1e-3}}
+    file_ = io.BytesIO()
+    inference_np.save(description, file_)
+    file_.seek(0)
+    loaded = inference_np.load(file_)
+    graph = _graph()
+    expected = inference_np.build(description)(graph)
+    output = inference_np.build(loaded)(graph)
+    for field in ["nodes", "edges", "globals"]:
+      self.assertAllEqual(getattr(expected, field), getattr(output, field))
+    self.assertAllEqual(description["node_model"]["layers"][0]["w"],
+                        loaded["node_model"]["layers"][0]["w"])
+
+
+if __name__ == "__main__":
+  tf.test.main()
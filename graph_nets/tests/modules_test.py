@@ -28,6 +28,7 @@ from graph_nets import modules
 from graph_nets import utils_np
 from graph_nets import utils_tf
 import numpy as np
+from scipy import sparse
 import sonnet as snt
 import tensorflow as tf
 
@@ -200,6 +201,93 @@ class GraphIndependentTest(GraphModuleTest):
     self._assert_build_and_run(network, input_graph)
 
 
+class SparseLinearTest(GraphModuleTest):
+
+  def _get_sparse_input_graph(self):
+    data_dicts = [
+        dict(nodes=sparse.random(n, 50, density=0.1, format="csr",
+                                 random_state=n, dtype=np.float32),
+             globals=np.zeros([1], dtype=np.float32))
+        for n in [3, 0, 4]]
+    dense_nodes = np.concatenate([d["nodes"].toarray() for d in data_dicts])
+    return utils_tf.data_dicts_to_graphs_tuple(data_dicts), dense_nodes
+
+  def test_same_as_dense(self):
+    input_graph, dense_nodes = self._get_sparse_input_graph()
+    linear = modules.SparseLinear(output_size=7)
+    sparse_output = linear(input_graph.nodes)
+    dense_output = linear(tf.constant(dense_nodes))
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      sparse_output, dense_output = sess.run([sparse_output, dense_output])
+    self.assertEqual((7, 7), sparse_output.shape)
+    self.assertAllClose(dense_output, sparse_output)
+
+  def test_graph_independent_encoder(self):
+    input_graph, dense_nodes = self._get_sparse_input_graph()
+    placeholders = utils_tf._placeholders_from_graphs_tuple(input_graph)  # pylint: disable=protected-access
+    model = modules.GraphIndependent(
+        node_model_fn=lambda: snt.Sequential(
+            [modules.SparseLinear(output_size=5, input_size=50), tf.nn.relu]))
+    output_graph = model(placeholders)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      input_graph = sess.run(input_graph)
+      variables = {v.op.name.split("/")[-1]: v for v in model.get_variables()}
+      w, b = sess.run([variables["w"], variables["b"]])
+      output_nodes = sess.run(
+          output_graph.nodes,
+          utils_tf.get_feed_dict(placeholders, input_graph))
+    self.assertAllClose(np.maximum(dense_nodes.dot(w) + b, 0.), output_nodes)
+
+  def test_unknown_input_size_raises(self):
+    inputs = tf.sparse_placeholder(tf.float32)
+    with self.assertRaisesRegexp(ValueError, "statically known"):
+      modules.SparseLinear(output_size=5)(inputs)
+
+
+class NodeIdEmbeddingTest(GraphModuleTest):
+
+  def setUp(self):
+    super(NodeIdEmbeddingTest, self).setUp()
+    self.data_dicts = [
+        dict(nodes=np.array([[3], [1], [3]]), globals=np.zeros([1])),
+        dict(nodes=np.array([[1], [7]]), globals=np.zeros([1])),
+    ]
+    self.ids = np.array([3, 1, 3, 1, 7])
+
+  def _get_table(self, module):
+    embeddings, = module.get_variables()
+    return embeddings
+
+  @parameterized.named_parameters(
+      ("deduplicate", True, 3), ("no deduplication", False, 5))
+  def test_graph_independent_encoder(self, deduplicate, num_gradient_rows):
+    input_graph = utils_tf.data_dicts_to_graphs_tuple(self.data_dicts)
+    model = modules.GraphIndependent(
+        node_model_fn=lambda: modules.NodeIdEmbedding(
+            vocab_size=10, embedding_dim=4, deduplicate=deduplicate))
+    output_graph = model(input_graph)
+    table, = model.get_variables()
+    gradient, = tf.gradients(output_graph.nodes, table)
+    self.assertIsInstance(gradient, tf.IndexedSlices)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      table, nodes, gradient = sess.run([table, output_graph.nodes, gradient])
+    self.assertAllClose(table[self.ids], nodes)
+    self.assertEqual(num_gradient_rows, gradient.values.shape[0])
+
+  def test_host_deduplicated_ids(self):
+    input_graph = utils_np.data_dicts_to_graphs_tuple(self.data_dicts)
+    unique_ids, input_graph = utils_np.deduplicate_node_ids(input_graph)
+    module = modules.NodeIdEmbedding(vocab_size=10, embedding_dim=4)
+    nodes = module(input_graph.nodes, unique_ids=unique_ids)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      table, nodes = sess.run([self._get_table(module), nodes])
+    self.assertAllClose(table[self.ids], nodes)
+
+
 class GraphNetworkTest(GraphModuleTest):
 
   def _get_model(self):
@@ -298,6 +386,41 @@ class GraphNetworkTest(GraphModuleTest):
     self.assertAllEqual(expected_nodes_out, output_graph_out.nodes)
     self.assertAllEqual(expected_globals_out, output_graph_out.globals)
 
+  @parameterized.named_parameters(
+      ("reduce sum reduction", tf.unsorted_segment_sum, False),
+      ("reduce max or zero reduction", blocks.unsorted_segment_max_or_zero,
+       False),
+      ("sent edges", tf.unsorted_segment_sum, True),)
+  def test_fused_same_as_unfused(self, reducer, use_sent_edges):
+    """Compares the output of a fused GraphNetwork to the unfused one."""
+    input_graph = self._get_input_graph()
+    node_block_opt = {"use_sent_edges": use_sent_edges}
+    graph_network = modules.GraphNetwork(
+        edge_model_fn=functools.partial(snt.Linear, output_size=5),
+        node_model_fn=functools.partial(snt.Linear, output_size=10),
+        global_model_fn=functools.partial(snt.Linear, output_size=15),
+        reducer=reducer,
+        node_block_opt=node_block_opt)
+    fused_graph_network = modules.GraphNetwork(
+        edge_model_fn=lambda: graph_network._edge_block._edge_model,
+        node_model_fn=lambda: graph_network._node_block._node_model,
+        global_model_fn=lambda: graph_network._global_block._global_model,
+        reducer=reducer,
+        node_block_opt=node_block_opt,
+        fused=True)
+
+    expected_output_graph = graph_network(input_graph)
+    output_graph = fused_graph_network(input_graph)
+
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      expected_output_graph, output_graph = sess.run(
+          (expected_output_graph, output_graph))
+
+    self.assertAllClose(expected_output_graph.edges, output_graph.edges)
+    self.assertAllClose(expected_output_graph.nodes, output_graph.nodes)
+    self.assertAllClose(expected_output_graph.globals, output_graph.globals)
+
   def test_dynamic_batch_sizes(self):
     """Checks that all batch sizes are as expected through a GraphNetwork."""
     input_graph = self._get_input_graph()
@@ -587,6 +710,29 @@ class GraphNetworkTest(GraphModuleTest):
     with self.assertRaisesRegexp(ValueError, "in both shapes must be equal"):
       graph_network(input_graph)
 
+  def test_compiled_without_retracing(self):
+    """A `GraphsTupleFunction` should be traced once for all the batches."""
+    data_dicts = [SMALL_GRAPH_1, SMALL_GRAPH_2, SMALL_GRAPH_3, SMALL_GRAPH_4]
+    batches = [utils_np.data_dicts_to_graphs_tuple(data_dicts[:num_graphs])
+               for num_graphs in (1, 4, 2)]
+    model = self._get_model()
+    expected_outputs = [model(utils_tf.data_dicts_to_graphs_tuple(
+        data_dicts[:num_graphs])) for num_graphs in (1, 4, 2)]
+    compiled_model = utils_tf.GraphsTupleFunction(
+        model, utils_np.spec_from_graphs_tuple(batches[0]))
+    outputs = [compiled_model(batch) for batch in batches]
+    self.assertEqual(1, compiled_model.num_traces)
+    self.assertEqual(6, len(model.get_variables()))
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      expected_outputs, outputs = sess.run((expected_outputs, outputs))
+    for expected_output, output in zip(expected_outputs, outputs):
+      for field in ["nodes", "edges", "globals", "n_node", "n_edge"]:
+        self.assertAllClose(getattr(expected_output, field),
+                            getattr(output, field))
+    with self.assertRaisesRegexp(ValueError, "non-`None` fields"):
+      compiled_model(batches[0].replace(globals=None))
+
 
 class InteractionNetworkTest(GraphModuleTest):
 
@@ -1120,7 +1266,7 @@ class SelfAttentionTest(GraphModuleTest):
 
     self.assertAllClose(expected_normalized, actual_normalized_edges_output)
 
-  def test_self_attention(self):
+  def _get_self_attention_inputs(self):
     # Just one feature per node.
     values_np = np.arange(sum(self.N_NODE)) + 1.
     # Multiple heads, one positive values, one negative values.
@@ -1157,6 +1303,22 @@ class SelfAttentionTest(GraphModuleTest):
         senders=tf.constant(self.SENDERS, dtype=tf.int32),
         n_node=tf.constant(self.N_NODE, dtype=tf.int32),
         n_edge=tf.constant(self.N_EDGE, dtype=tf.int32),)
+    return values, keys, queries, attention_graph
+
+  EXPECTED_MIXED_NODES = [
+      [[0., 0.], [0., 0.]],  # Does not receive any edges
+      [[1., 0.1], [-1., -0.1]],  # Only receives from n0.
+      [[0., 0.], [0., 0.]],  # Does not receive any edges
+      [[0., 0.], [0., 0.]],  # Does not receive any edges
+      [[0., 0.], [0., 0.]],  # Does not receive any edges
+      [[11/3, 11/3*0.1],  # Head one, receives from n2(1/3) n3(2/3)
+       [-15/4, -15/4*0.1]],  # Head two, receives from n2(1/4) n3(3/4)
+      [[20/5, 20/5*0.1],   # Head one, receives from n2(2/5) n3(1/5) n4(2/5)
+       [-28/7, -28/7*0.1]],  # Head two, receives from n2(3/7) n3(1/7) n4(3/7)
+  ]
+
+  def test_self_attention(self):
+    values, keys, queries, attention_graph = self._get_self_attention_inputs()
 
     self_attention = modules.SelfAttention()
     output_graph = self_attention(values, keys, queries, attention_graph)
@@ -1165,19 +1327,180 @@ class SelfAttentionTest(GraphModuleTest):
     with self.test_session() as sess:
       mixed_nodes_output = sess.run(mixed_nodes)
 
-    expected_mixed_nodes = [
-        [[0., 0.], [0., 0.]],  # Does not receive any edges
-        [[1., 0.1], [-1., -0.1]],  # Only receives from n0.
-        [[0., 0.], [0., 0.]],  # Does not receive any edges
-        [[0., 0.], [0., 0.]],  # Does not receive any edges
-        [[0., 0.], [0., 0.]],  # Does not receive any edges
-        [[11/3, 11/3*0.1],  # Head one, receives from n2(1/3) n3(2/3)
-         [-15/4, -15/4*0.1]],  # Head two, receives from n2(1/4) n3(3/4)
-        [[20/5, 20/5*0.1],   # Head one, receives from n2(2/5) n3(1/5) n4(2/5)
-         [-28/7, -28/7*0.1]],  # Head two, receives from n2(3/7) n3(1/7) n4(3/7)
-    ]
+    self.assertAllClose(self.EXPECTED_MIXED_NODES, mixed_nodes_output)
+
+  def test_self_attention_sparse_matmul(self):
+    values, keys, queries, attention_graph = self._get_self_attention_inputs()
+
+    self_attention = modules.SelfAttention(use_sparse_matmul=True)
+    output_graph = self_attention(values, keys, queries, attention_graph)
+    mixed_nodes = output_graph.nodes
+    gradients = tf.gradients(tf.reduce_sum(mixed_nodes * mixed_nodes),
+                             [values, keys, queries])
+    expected_gradients = tf.gradients(
+        tf.reduce_sum(tf.square(modules.SelfAttention()(
+            values, keys, queries, attention_graph).nodes)),
+        [values, keys, queries])
+
+    with self.test_session() as sess:
+      mixed_nodes_output, gradients, expected_gradients = sess.run(
+          [mixed_nodes, gradients, expected_gradients])
+
+    self.assertAllClose(self.EXPECTED_MIXED_NODES, mixed_nodes_output)
+    self.assertAllClose(expected_gradients, gradients)
+
+  def test_dense_self_attention(self):
+    values, keys, queries, attention_graph = self._get_self_attention_inputs()
+    to_dense = lambda x: utils_tf.graphs_tuple_to_dense(
+        attention_graph.replace(nodes=x)).nodes
+
+    dense_self_attention = modules.DenseSelfAttention()
+    output_graph = dense_self_attention(
+        to_dense(values), to_dense(keys), to_dense(queries),
+        utils_tf.graphs_tuple_to_dense(attention_graph))
+    mixed_nodes = utils_tf.dense_to_graphs_tuple(
+        output_graph, attention_graph).nodes
+
+    with self.test_session() as sess:
+      mixed_nodes_output = sess.run(mixed_nodes)
+
+    self.assertAllClose(self.EXPECTED_MIXED_NODES, mixed_nodes_output)
+
+  def _get_fully_connected_inputs(self, exclude_self_edges,
+                                  n_node=(3, 0, 1, 5, 2)):
+    num_nodes = sum(n_node)
+    rng = np.random.RandomState(0)
+    values = tf.constant(rng.randn(num_nodes, 2, 3), dtype=tf.float32)
+    keys = tf.constant(rng.randn(num_nodes, 2, 4), dtype=tf.float32)
+    queries = tf.constant(rng.randn(num_nodes, 2, 4), dtype=tf.float32)
+    graph = graphs.GraphsTuple(
+        nodes=tf.constant(rng.randn(num_nodes, 6), dtype=tf.float32),
+        edges=None,
+        globals=None,
+        receivers=None,
+        senders=None,
+        n_node=tf.constant(list(n_node), dtype=tf.int32),
+        n_edge=tf.zeros([len(n_node)], dtype=tf.int32))
+    attention_graph = utils_tf.fully_connect_graph_dynamic(
+        graph, exclude_self_edges)
+    return values, keys, queries, attention_graph
+
+  @parameterized.named_parameters(
+      ("with self edges, one block", False, 128),
+      ("with self edges, several blocks", False, 2),
+      ("without self edges, one block", True, 128),
+      ("without self edges, several blocks", True, 2),
+  )
+  def test_fully_connected_self_attention(self, exclude_self_edges,
+                                          block_size):
+    values, keys, queries, attention_graph = self._get_fully_connected_inputs(
+        exclude_self_edges)
+    expected_nodes = modules.SelfAttention()(
+        values, keys, queries, attention_graph).nodes
+    fully_connected_attention = modules.SelfAttention(
+        fully_connected=True, exclude_self_edges=exclude_self_edges,
+        block_size=block_size)
+    actual_nodes = fully_connected_attention(
+        values, keys, queries, attention_graph).nodes
 
-    self.assertAllClose(expected_mixed_nodes, mixed_nodes_output)
+    with self.test_session() as sess:
+      expected_nodes, actual_nodes = sess.run([expected_nodes, actual_nodes])
+
+    self.assertAllClose(expected_nodes, actual_nodes, atol=1e-5)
+
+  @parameterized.named_parameters(
+      ("with self edges, small blocks", False, 8),
+      ("without self edges, large blocks", True, 128),
+  )
+  def test_fully_connected_self_attention_skewed_batch(
+      self, exclude_self_edges, block_size):
+    """Many small graphs and a large one, compared to the edge-based path."""
+    n_node = [2] * 40 + [70] + [1, 0, 3] * 5
+    values, keys, queries, attention_graph = self._get_fully_connected_inputs(
+        exclude_self_edges, n_node)
+    expected_nodes = modules.SelfAttention()(
+        values, keys, queries, attention_graph).nodes
+    actual_nodes = modules.SelfAttention(
+        fully_connected=True, exclude_self_edges=exclude_self_edges,
+        block_size=block_size)(values, keys, queries, attention_graph).nodes
+    expected_gradients = tf.gradients(
+        tf.reduce_sum(tf.square(expected_nodes)), [values, keys, queries])
+    actual_gradients = tf.gradients(
+        tf.reduce_sum(tf.square(actual_nodes)), [values, keys, queries])
+
+    with self.test_session() as sess:
+      expected, actual = sess.run(
+          [[expected_nodes] + expected_gradients,
+           [actual_nodes] + actual_gradients])
+
+    self.assertEqual((sum(n_node), 2, 3), actual[0].shape)
+    for expected_value, actual_value in zip(expected, actual):
+      self.assertAllClose(expected_value, actual_value, atol=1e-4)
+
+  @parameterized.named_parameters(
+      ("with self edges", False),
+      ("without self edges", True),
+  )
+  def test_fully_connected_edgeless_gat(self, exclude_self_edges):
+    _, _, _, attention_graph = self._get_fully_connected_inputs(
+        exclude_self_edges)
+    num_heads, key_size, value_size = 2, 4, 3
+    projection = snt.Linear(num_heads * (2 * key_size + value_size))
+    product = snt.nets.MLP([5, 1])
+    node_model = snt.Linear(6)
+    make_gat = functools.partial(
+        modules.EdgelessGAT, projection, product, node_model, num_heads,
+        key_size, value_size)
+    expected_nodes = make_gat()(attention_graph).nodes
+    actual_nodes = make_gat(
+        fully_connected=True, exclude_self_edges=exclude_self_edges,
+        block_size=2)(attention_graph).nodes
+
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      expected_nodes, actual_nodes = sess.run([expected_nodes, actual_nodes])
+
+    self.assertAllClose(expected_nodes, actual_nodes, atol=1e-5)
+
+
+class GraphNetworkBenchmark(tf.test.Benchmark):
+  """Benchmarks the fused and unfused `GraphNetwork`."""
+
+  def _benchmark_graph_network(self, fused):
+    with tf.Graph().as_default():
+      rng = np.random.RandomState(0)
+      data_dicts = []
+      for _ in range(64):
+        n_node = rng.randint(10, 30)
+        n_edge = 4 * n_node
+        data_dicts.append({
+            "globals": rng.randn(16).astype(np.float32),
+            "nodes": rng.randn(n_node, 16).astype(np.float32),
+            "edges": rng.randn(n_edge, 16).astype(np.float32),
+            "senders": rng.randint(n_node, size=n_edge),
+            "receivers": rng.randint(n_node, size=n_edge),
+        })
+      input_graph = utils_tf.data_dicts_to_graphs_tuple(data_dicts)
+      model_fn = functools.partial(snt.nets.MLP, output_sizes=[16, 16])
+      graph_network = modules.GraphNetwork(
+          model_fn, model_fn, model_fn, fused=fused)
+      num_ops_before = len(tf.get_default_graph().get_operations())
+      output_graph = graph_network(input_graph)
+      num_ops = len(tf.get_default_graph().get_operations()) - num_ops_before
+      with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        self.run_op_benchmark(
+            sess,
+            output_graph,
+            min_iters=50,
+            name="graph_network_{}".format("fused" if fused else "unfused"),
+            extras={"num_ops": num_ops})
+
+  def benchmark_graph_network_unfused(self):
+    self._benchmark_graph_network(fused=False)
+
+  def benchmark_graph_network_fused(self):
+    self._benchmark_graph_network(fused=True)
 
 if __name__ == "__main__":
   tf.test.main()
@@ -0,0 +1,126 @@
+# Copyright 2018 The GraphNets Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or  implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ============================================================================
+
+"""Tests for profiling.py."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import os
+
+from absl.testing import parameterized
+from graph_nets import blocks
+from graph_nets import profiling
+from graph_nets import utils_tf
+import numpy as np
+import sonnet as snt
+import tensorflow as tf
+
+
+class ProfilingTest(tf.test.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super(ProfilingTest, self).setUp()
+    tf.set_random_seed(0)
+
+  def _get_graph(self):
+    rng = np.random.RandomState(0)
+    data_dicts = []
+    for num_nodes, num_edges in [(3, 5), (6, 10), (4, 0)]:
+      data_dicts.append({
+          "globals": rng.randn(9).astype(np.float32),
+          "nodes": rng.randn(num_nodes, 7).astype(np.float32),
+          "edges": rng.randn(num_edges, 8).astype(np.float32),
+          "senders": rng.randint(num_nodes, size=num_edges),
+          "receivers": rng.randint(num_nodes, size=num_edges),
+      })
+    return utils_tf.data_dicts_to_graphs_tuple(data_dicts), data_dicts
+
+  def test_no_regions_without_profiler(self):
+    graph, _ = self._get_graph()
+    self.assertFalse(profiling.is_profiling())
+    blocks.EdgeBlock(lambda: snt.Linear(5))(graph)
+    op_names = [op.name for op in tf.get_default_graph().get_operations()]
+    for kind in profiling.REGION_KINDS:
+      self.assertFalse(any("/{}/".format(kind) in name for name in op_names))
+
+  def test_invalid_region_kind(self):
+    with self.assertRaisesRegexp(ValueError, "Unknown region kind"):
+      with profiling.region("reduce"):
+        pass
+
+  @parameterized.named_parameters(
+      ("edge_block", lambda: blocks.EdgeBlock(lambda: snt.Linear(5)),
+       [profiling.BROADCAST, profiling.COLLECT, profiling.MODEL]),
+      ("node_block", lambda: blocks.NodeBlock(lambda: snt.Linear(5)),
+       [profiling.AGGREGATE, profiling.BROADCAST, profiling.COLLECT,
+        profiling.MODEL]),
+      ("global_block", lambda: blocks.GlobalBlock(lambda: snt.Linear(5)),
+       [profiling.AGGREGATE, profiling.COLLECT, profiling.MODEL]),
+  )
+  def test_block_regions(self, block_fn, expected_kinds):
+    graph, _ = self._get_graph()
+    block = block_fn()
+    with profiling.profile() as profiler:
+      self.assertTrue(profiling.is_profiling())
+      block(graph)
+    self.assertFalse(profiling.is_profiling())
+    self.assertEqual(expected_kinds,
+                     [region.kind for region in profiler.regions])
+    for region in profiler.regions:
+      self.assertTrue(region.name.endswith(region.kind))
+      self.assertTrue(region.op_names)
+
+  def test_run_summary(self):
+    graph, data_dicts = self._get_graph()
+    n_edges = sum(len(d["senders"]) for d in data_dicts)
+    with profiling.profile() as profiler:
+      output = blocks.EdgeBlock(lambda: snt.Linear(5))(graph)
+    with self.test_session() as sess:
+      sess.run(tf.global_variables_initializer())
+      _, summary, run_metadata = profiler.run(sess, output.edges)
+    regions = {region["kind"]: region for region in summary["regions"]}
+    # The edges are concatenated with the broadcast receiver nodes, sender
+    # nodes and globals.
+    collected_width = 8 + 7 + 7 + 9
+    self.assertEqual(n_edges, regions[profiling.BROADCAST]["rows"])
+    self.assertEqual(7 + 7 + 9, regions[profiling.BROADCAST]["width"])
+    self.assertEqual(0, regions[profiling.BROADCAST]["flops"])
+    self.assertEqual(n_edges, regions[profiling.COLLECT]["rows"])
+    self.assertEqual(collected_width, regions[profiling.COLLECT]["width"])
+    self.assertEqual(2 * n_edges * collected_width * 4,
+                     regions[profiling.COLLECT]["bytes"])
+    self.assertEqual(n_edges, regions[profiling.MODEL]["rows"])
+    self.assertEqual(5, regions[profiling.MODEL]["width"])
+    self.assertEqual(2 * n_edges * collected_width * 5,
+                     regions[profiling.MODEL]["flops"])
+    self.assertEqual(regions[profiling.MODEL]["flops"],
+                     summary["totals"][profiling.MODEL]["flops"])
+    self.assertGreaterEqual(summary["totals"][profiling.MODEL]["time_us"], 0)
+
+    json_path = os.path.join(self.get_temp_dir(), "summary.json")
+    profiler.export_json(summary, json_path)
+    with open(json_path) as f:
+      self.assertEqual(json.loads(json.dumps(summary)), json.load(f))
+    trace_path = os.path.join(self.get_temp_dir(), "trace.json")
+    profiler.export_chrome_trace(run_metadata, trace_path)
+    with open(trace_path) as f:
+      self.assertIn("traceEvents", json.load(f))
+
+
+if __name__ == "__main__":
+  tf.test.main()
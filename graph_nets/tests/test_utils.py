@@ -52,6 +52,30 @@ def mask_leading_dimension(tensor):
                                      [None] + tensor.get_shape().as_list()[1:])
 
 
+def make_bipartite_data_dicts():
+  """Returns a list of bipartite data dicts, including a graph without edges."""
+  return [
+      dict(left_nodes=np.arange(4, dtype=np.float32).reshape([2, 2]),
+           right_nodes=np.arange(9, dtype=np.float32).reshape([3, 3]) + 10.,
+           edges=np.arange(4, dtype=np.float32)[:, None] + 20.,
+           globals=np.array([1.], dtype=np.float32),
+           senders=np.array([0, 1, 1, 0], dtype=np.int32),
+           receivers=np.array([2, 2, 0, 1], dtype=np.int32)),
+      dict(left_nodes=np.arange(6, dtype=np.float32).reshape([3, 2]) + 30.,
+           right_nodes=np.arange(12, dtype=np.float32).reshape([4, 3]) + 40.,
+           edges=np.arange(5, dtype=np.float32)[:, None] + 50.,
+           globals=np.array([2.], dtype=np.float32),
+           senders=np.array([0, 2, 2, 1, 0], dtype=np.int32),
+           receivers=np.array([1, 3, 3, 0, 2], dtype=np.int32)),
+      dict(left_nodes=np.arange(2, dtype=np.float32).reshape([1, 2]) + 60.,
+           right_nodes=np.zeros([0, 3], dtype=np.float32),
+           edges=np.zeros([0, 1], dtype=np.float32),
+           globals=np.array([3.], dtype=np.float32),
+           senders=np.zeros([0], dtype=np.int32),
+           receivers=np.zeros([0], dtype=np.int32)),
+  ]
+
+
 class GraphsTest(tf.test.TestCase):
   """A base class for tests that operate on GraphsNP or GraphsTF."""
 
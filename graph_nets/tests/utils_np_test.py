@@ -20,12 +20,15 @@ from __future__ import division
 from __future__ import print_function
 
 import itertools
+import threading
+import warnings
 
 from absl.testing import parameterized
 from graph_nets import utils_np
 from graph_nets.tests import test_utils
 import networkx as nx
 import numpy as np
+from scipy import sparse
 from six.moves import range
 import tensorflow as tf
 
@@ -103,6 +106,29 @@ class DataDictsConversionTest(test_utils.GraphsTest, parameterized.TestCase):
     for key in ["nodes", "edges"]:
       self.assertEqual(tf.float64, getattr(out, key).dtype)
 
+  def test_data_dicts_to_graphs_tuple_local_indices(self):
+    graphs = utils_np.data_dicts_to_graphs_tuple(
+        self.graphs_dicts_in, local_index_dtype=np.uint8)
+    offsets = np.repeat(np.cumsum(np.hstack([0, graphs.n_node[:-1]])),
+                        graphs.n_edge)
+    for field in ["receivers", "senders"]:
+      self.assertEqual(np.uint8, getattr(graphs, field).dtype)
+      self.assertAllEqual(getattr(self.reference_graph, field),
+                          getattr(graphs, field) + offsets)
+    self.assertAllEqual(self.reference_graph.nodes, graphs.nodes)
+
+  def test_data_dicts_to_graphs_tuple_local_indices_overflow_raises(self):
+    graph_dict = {"nodes": np.zeros([300, 2]), "senders": [299],
+                  "receivers": [0], "edges": np.zeros([1, 2]), "globals": [0.]}
+    with self.assertRaisesRegexp(ValueError, "cannot be represented as uint8"):
+      utils_np.data_dicts_to_graphs_tuple([graph_dict],
+                                          local_index_dtype=np.uint8)
+    graphs = utils_np.data_dicts_to_graphs_tuple(
+        [graph_dict], local_index_dtype=utils_np.narrowest_index_dtype(300))
+    self.assertEqual(np.uint16, graphs.senders.dtype)
+    self.assertEqual(np.uint8, utils_np.narrowest_index_dtype(256))
+    self.assertEqual(np.int32, utils_np.narrowest_index_dtype(70000))
+
   def test_data_dicts_to_graphs_tuple_from_lists(self):
     """Tests creatings a GraphsTuple from python lists."""
     for graph_dict in self.graphs_dicts_in:
@@ -290,5 +316,413 @@ class GetItemTest(test_utils.GraphsTest, parameterized.TestCase):
       for k, v in ex.items():
         self.assertAllClose(v, ac[k])
 
+
+class SpecTest(test_utils.GraphsTest, parameterized.TestCase):
+
+  def setUp(self):
+    super(SpecTest, self).setUp()
+    self.populate_test_data(max_size=2)
+
+  @parameterized.named_parameters(
+      ("no nones", []),
+      ("no features", ["nodes", "edges", "globals"]),
+      ("no edges", ["edges", "receivers", "senders"]))
+  def test_spec_from_data_dict(self, none_fields):
+    data_dicts = [dict(d) for d in self.graphs_dicts_in]
+    for data_dict in data_dicts:
+      for none_field in none_fields:
+        data_dict[none_field] = None
+    spec = utils_np.spec_from_data_dict(data_dicts[0])
+    batched_spec = utils_np.spec_from_graphs_tuple(
+        utils_np.data_dicts_to_graphs_tuple(data_dicts))
+    self.assertEqual(batched_spec, spec)
+    for none_field in none_fields:
+      self.assertIsNone(getattr(spec, none_field))
+    if "nodes" not in none_fields:
+      self.assertEqual(("float32", (7, 11), False), spec.nodes)
+    if "receivers" not in none_fields:
+      self.assertEqual(("int32", (), False), spec.receivers)
+    self.assertEqual(("int32", (), False), spec.n_node)
+
+  def test_spec_from_data_dict_sparse(self):
+    data_dict = {"nodes": sparse.random(3, 20, format="csr"),
+                 "globals": np.zeros([2], np.float32)}
+    spec = utils_np.spec_from_data_dict(data_dict)
+    self.assertEqual(("float64", (20,), True), spec.nodes)
+    self.assertEqual(("float32", (2,), False), spec.globals)
+    self.assertIsNone(spec.receivers)
+
+  def test_spec_from_networkx(self):
+    graph_nx = nx.OrderedMultiDiGraph(features=np.zeros([2], np.float32))
+    graph_nx.add_node(0, features=np.zeros([3], np.float32))
+    graph_nx.add_node(1, features=np.zeros([3], np.float32))
+    spec = utils_np.spec_from_networkx(graph_nx, edge_shape_hint=[5],
+                                       data_type_hint=np.float16)
+    self.assertEqual(("float32", (3,), False), spec.nodes)
+    self.assertEqual(("float16", (5,), False), spec.edges)
+    self.assertEqual(("float32", (2,), False), spec.globals)
+
+
+class BufferPoolTest(test_utils.GraphsTest, parameterized.TestCase):
+
+  def setUp(self):
+    super(BufferPoolTest, self).setUp()
+    self.populate_test_data(max_size=2)
+
+  def _make_pool(self, data_dicts, num_buffers=2):
+    return utils_np.GraphsTupleBufferPool(
+        utils_np.spec_from_data_dict(data_dicts[0]), max_n_graph=20,
+        max_n_node=40, max_n_edge=40, num_buffers=num_buffers)
+
+  @parameterized.named_parameters(
+      ("no nones", []),
+      ("no features", ["nodes", "edges", "globals"]),
+      ("no edges", ["edges", "receivers", "senders"]))
+  def test_data_dicts_to_graphs_tuple(self, none_fields):
+    data_dicts = [dict(d) for d in self.graphs_dicts_in]
+    for data_dict in data_dicts:
+      for none_field in none_fields:
+        data_dict[none_field] = None
+    pool = self._make_pool(data_dicts)
+    expected = utils_np.data_dicts_to_graphs_tuple(data_dicts)
+    for _ in range(3):
+      with pool.data_dicts_to_graphs_tuple(data_dicts) as lease:
+        for field in utils_np.ALL_FIELDS:
+          expected_value = getattr(expected, field)
+          value = getattr(lease.graph, field)
+          if expected_value is None:
+            self.assertIsNone(value)
+          else:
+            self.assertAllEqual(expected_value, value)
+            self.assertEqual(expected_value.dtype, value.dtype)
+      self.assertEqual(2, pool.num_available)
+
+  def test_buffers_are_recycled(self):
+    pool = self._make_pool(self.graphs_dicts_in, num_buffers=1)
+    lease = pool.data_dicts_to_graphs_tuple(self.graphs_dicts_in[:2])
+    nodes = lease.graph.nodes
+    lease.release()
+    self.assertIsNone(lease.graph)
+    lease = pool.data_dicts_to_graphs_tuple(self.graphs_dicts_in[2:])
+    self.assertTrue(np.shares_memory(nodes, lease.graph.nodes))
+    self.assertIs(lease.buffers.nodes, lease.graph.nodes.base)
+    lease.release()
+    with self.assertRaisesRegexp(ValueError, "released"):
+      lease.release()
+
+  def test_acquire_timeout(self):
+    pool = self._make_pool(self.graphs_dicts_in, num_buffers=1)
+    with pool.acquire():
+      self.assertEqual(0, pool.num_available)
+      with self.assertRaisesRegexp(RuntimeError, "No buffers were released"):
+        pool.acquire(timeout=0.01)
+    self.assertEqual(1, pool.num_available)
+
+  def test_budget_exceeded_raises(self):
+    pool = self._make_pool(self.graphs_dicts_in)
+    with self.assertRaisesRegexp(ValueError, "exceeds the budget"):
+      pool.data_dicts_to_graphs_tuple(self.graphs_dicts_in * 10)
+    self.assertEqual(2, pool.num_available)
+
+  def test_none_fields_mismatch_raises(self):
+    pool = self._make_pool(self.graphs_dicts_in)
+    data_dicts = [dict(d, globals=None) for d in self.graphs_dicts_in]
+    with self.assertRaisesRegexp(ValueError, "Field globals should be"):
+      pool.data_dicts_to_graphs_tuple(data_dicts)
+
+
+class FeatureDtypePolicyTest(tf.test.TestCase):
+
+  def _data_dicts(self):
+    return [{"nodes": [[0.5, 1.], [2., 3.]], "edges": [[1.5]],
+             "senders": [0], "receivers": [1], "globals": [0.25]},
+            {"nodes": np.ones([1, 2], np.float64), "edges": np.zeros([0, 1]),
+             "senders": [], "receivers": [], "globals": [np.float64(1.)]}]
+
+  def test_data_dicts_to_graphs_tuple(self):
+    with utils_np.feature_dtype_policy(np.float32):
+      graph = utils_np.data_dicts_to_graphs_tuple(self._data_dicts())
+    for field in ["nodes", "edges", "globals"]:
+      self.assertEqual(np.float32, getattr(graph, field).dtype)
+    self.assertAllEqual([[0.5, 1.], [2., 3.], [1., 1.]], graph.nodes)
+    self.assertEqual(np.int32, graph.senders.dtype)
+
+  def test_networkx_to_data_dict(self):
+    graph_nx = nx.OrderedMultiDiGraph()
+    graph_nx.add_node(0, features=[0.5, 1.])
+    graph_nx.add_node(1, features=np.array([2., 3.]))
+    graph_nx.add_edge(0, 1, features=[1.5])
+    with utils_np.feature_dtype_policy(np.float16):
+      data_dict = utils_np.networkx_to_data_dict(graph_nx)
+    self.assertEqual(np.float16, data_dict["nodes"].dtype)
+    self.assertEqual(np.float16, data_dict["edges"].dtype)
+
+  def test_spec_from_data_dict(self):
+    with utils_np.feature_dtype_policy(np.float32):
+      spec = utils_np.spec_from_data_dict(self._data_dicts()[0])
+      graph = utils_np.data_dicts_to_graphs_tuple(self._data_dicts())
+    self.assertEqual(spec, utils_np.spec_from_graphs_tuple(graph))
+    self.assertEqual("float32", spec.nodes.dtype)
+
+  def test_integer_features_are_kept(self):
+    data_dict = {"nodes": [[1], [2]], "globals": np.array([3], np.int64)}
+    with utils_np.feature_dtype_policy(np.float32):
+      graph = utils_np.data_dicts_to_graphs_tuple([data_dict])
+    self.assertEqual(np.int64, graph.globals.dtype)
+    self.assertEqual(np.asarray([[1]]).dtype, graph.nodes.dtype)
+
+  def test_implicit_float64_warns(self):
+    with warnings.catch_warnings(record=True) as caught:
+      warnings.simplefilter("always")
+      graph = utils_np.data_dicts_to_graphs_tuple(self._data_dicts())
+      with utils_np.feature_dtype_policy():
+        utils_np.data_dicts_to_graphs_tuple(self._data_dicts())
+    self.assertEqual(np.float64, graph.nodes.dtype)
+    categories = [w.category for w in caught]
+    # Nodes, edges and globals of the first graph.
+    self.assertEqual([utils_np.Float64FeaturesWarning] * 3, categories)
+    # The warnings point at this call, not at the internals of utils_np.
+    for w in caught:
+      self.assertIn("utils_np_test", w.filename)
+
+  def test_policy_is_local_to_each_thread(self):
+    entered = [threading.Event(), threading.Event()]
+    exited = threading.Event()
+    dtypes = {}
+
+    def convert(index, dtype):
+      with utils_np.feature_dtype_policy(dtype):
+        entered[index].set()
+        if index == 0:
+          # Waits until the other thread has entered its own policy.
+          entered[1].wait()
+        else:
+          # Converts after the first thread has exited its policy.
+          exited.wait()
+        dtypes[index] = utils_np.data_dicts_to_graphs_tuple(
+            self._data_dicts()).nodes.dtype
+      if index == 0:
+        exited.set()
+
+    threads = [threading.Thread(target=convert, args=(0, np.float32)),
+               threading.Thread(target=convert, args=(1, np.float16))]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual({0: np.float32, 1: np.float16}, dtypes)
+    with warnings.catch_warnings():
+      warnings.simplefilter("ignore")
+      graph = utils_np.data_dicts_to_graphs_tuple(self._data_dicts())
+    self.assertEqual(np.float64, graph.nodes.dtype)
+
+  def test_invalid_dtype_raises(self):
+    with self.assertRaisesRegexp(ValueError, "floating-point dtype"):
+      with utils_np.feature_dtype_policy(np.int32):
+        pass
+
+
+class PackTest(test_utils.GraphsTest, parameterized.TestCase):
+
+  def setUp(self):
+    super(PackTest, self).setUp()
+    self.populate_test_data(max_size=2)
+
+  @parameterized.named_parameters(
+      ("no nones", []),
+      ("no features", ["nodes", "edges", "globals"]),
+      ("no edges", ["edges", "receivers", "senders"]))
+  def test_round_trip(self, none_fields):
+    data_dicts = [dict(d) for d in self.graphs_dicts_in]
+    for data_dict in data_dicts:
+      for none_field in none_fields:
+        data_dict[none_field] = None
+    graph = utils_np.data_dicts_to_graphs_tuple(data_dicts)
+    spec = utils_np.spec_from_graphs_tuple(graph)
+    buffer_ = utils_np.pack_graphs_tuple(graph)
+    self.assertEqual(np.uint8, buffer_.dtype)
+    self.assertEqual(1, buffer_.ndim)
+    unpacked = utils_np.unpack_graphs_tuple(buffer_, spec)
+    for field in utils_np.ALL_FIELDS:
+      expected_value = getattr(graph, field)
+      value = getattr(unpacked, field)
+      if expected_value is None:
+        self.assertIsNone(value)
+      else:
+        self.assertAllEqual(expected_value, value)
+        self.assertEqual(expected_value.dtype, value.dtype)
+        self.assertTrue(np.shares_memory(buffer_, value))
+
+  def test_pack_casts_to_spec(self):
+    graph = utils_np.data_dicts_to_graphs_tuple(self.graphs_dicts_in)
+    spec = utils_np.spec_from_graphs_tuple(graph)
+    spec = spec.replace(nodes=spec.nodes._replace(dtype="float64"))
+    unpacked = utils_np.unpack_graphs_tuple(
+        utils_np.pack_graphs_tuple(graph, spec), spec)
+    self.assertEqual(np.float64, unpacked.nodes.dtype)
+    self.assertAllEqual(graph.nodes, unpacked.nodes)
+
+  def test_none_fields_mismatch_raises(self):
+    graph = utils_np.data_dicts_to_graphs_tuple(self.graphs_dicts_in)
+    spec = utils_np.spec_from_graphs_tuple(graph)
+    with self.assertRaisesRegexp(ValueError, "Field globals should be"):
+      utils_np.pack_graphs_tuple(graph.replace(globals=None), spec)
+
+
+class DeduplicateNodeIdsTest(tf.test.TestCase):
+
+  def test_deduplicate_node_ids(self):
+    graph = utils_np.data_dicts_to_graphs_tuple([
+        dict(nodes=np.array([[30], [10], [30]]), n_edge=0),
+        dict(nodes=np.array([[10], [70]]), n_edge=0),
+    ])
+    unique_ids, output = utils_np.deduplicate_node_ids(graph)
+    self.assertAllEqual([10, 30, 70], unique_ids)
+    self.assertAllEqual([[1], [0], [1], [0], [2]], output.nodes)
+    self.assertEqual(np.int32, output.nodes.dtype)
+    self.assertAllEqual(graph.n_node, output.n_node)
+
+
+class SparseFeaturesTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(SparseFeaturesTest, self).setUp()
+    self.data_dicts = [
+        dict(nodes=sparse.random(n, 30, density=0.2, format="csr",
+                                 random_state=n),
+             edges=sparse.random(n - 1, 20, density=0.2, format="csr",
+                                 random_state=10 + n),
+             senders=np.arange(n - 1), receivers=np.arange(1, n),
+             globals=np.zeros([1]))
+        for n in [3, 1, 4]]
+
+  def test_data_dicts_round_trip(self):
+    graph = utils_np.data_dicts_to_graphs_tuple(self.data_dicts)
+    self.assertTrue(sparse.issparse(graph.nodes))
+    self.assertEqual((8, 30), graph.nodes.shape)
+    self.assertEqual((5, 20), graph.edges.shape)
+    self.assertAllEqual([0, 1, 4, 5, 6], graph.senders)
+    for expected, actual in zip(self.data_dicts,
+                                utils_np.graphs_tuple_to_data_dicts(graph)):
+      for field in ["nodes", "edges"]:
+        self.assertAllClose(expected[field].toarray(), actual[field].toarray())
+
+  def test_get_graph(self):
+    graph = utils_np.data_dicts_to_graphs_tuple(self.data_dicts)
+    sliced = utils_np.get_graph(graph, slice(1, 3))
+    self.assertAllClose(
+        sparse.vstack([d["nodes"] for d in self.data_dicts[1:]]).toarray(),
+        sliced.nodes.toarray())
+    self.assertAllEqual([2, 3, 4], sliced.receivers)
+
+  def test_networkx_round_trip(self):
+    graph = utils_np.data_dicts_to_graphs_tuple(self.data_dicts)
+    graph_nxs = utils_np.graphs_tuple_to_networkxs(graph)
+    self.assertTrue(sparse.issparse(graph_nxs[0].nodes[0]["features"]))
+    # The graph with a single node has no edges.
+    output = utils_np.networkxs_to_graphs_tuple(graph_nxs,
+                                                edge_shape_hint=[20])
+    self.assertAllClose(graph.nodes.toarray(), output.nodes.toarray())
+    self.assertAllClose(graph.edges.toarray(), output.edges.toarray())
+
+
+def _typed_networkx(offset):
+  """Returns a networkx graph with two node types and three edge types."""
+  graph_nx = nx.OrderedMultiDiGraph(features=np.array([offset], np.float32))
+  graph_nx.add_node(0, type="a", features=np.array([offset, 1.]))
+  graph_nx.add_node(1, type="b", features=np.array([offset + 2.]))
+  graph_nx.add_node(2, type="a", features=np.array([offset, 3.]))
+  graph_nx.add_edge(0, 1, type="r", features=np.array([offset + 10.]))
+  graph_nx.add_edge(2, 1, type="r", features=np.array([offset + 11.]))
+  graph_nx.add_edge(1, 2, type="s", features=np.array([offset, 12.]))
+  return graph_nx
+
+
+class TypedConversionTest(tf.test.TestCase):
+
+  def test_typed_networkxs_to_graphs_tuple(self):
+    graph_nx = _typed_networkx(100.)
+    other_nx = nx.OrderedMultiDiGraph(features=np.array([5.], np.float32))
+    other_nx.add_node(0, type="b", features=np.array([6.]))
+    other_nx.add_node(1, type="b", features=np.array([7.]))
+    other_nx.add_edge(1, 0, type="t", features=np.array([8., 9., 10.]))
+
+    graph = utils_np.typed_networkxs_to_graphs_tuple(
+        [graph_nx, other_nx, _typed_networkx(200.)])
+
+    r, s, t = ("a", "r", "b"), ("b", "s", "a"), ("b", "t", "b")
+    self.assertEqual(["a", "b"], graph.node_types)
+    self.assertEqual([r, s, t], graph.edge_types)
+    self.assertAllEqual([2, 0, 2], graph.n_node["a"])
+    self.assertAllEqual([1, 2, 1], graph.n_node["b"])
+    self.assertAllEqual([2, 0, 2], graph.n_edge[r])
+    self.assertAllEqual([0, 1, 0], graph.n_edge[t])
+    self.assertAllClose([[100., 1.], [100., 3.], [200., 1.], [200., 3.]],
+                        graph.nodes["a"])
+    self.assertAllClose([[102.], [6.], [7.], [202.]], graph.nodes["b"])
+    self.assertAllClose([[110.], [111.], [210.], [211.]], graph.edges[r])
+    self.assertAllEqual([0, 1, 2, 3], graph.senders[r])
+    self.assertAllEqual([0, 0, 3, 3], graph.receivers[r])
+    self.assertAllEqual([0, 3], graph.senders[s])
+    self.assertAllEqual([1, 3], graph.receivers[s])
+    self.assertAllEqual([2], graph.senders[t])
+    self.assertAllEqual([1], graph.receivers[t])
+    self.assertAllClose([[100.], [5.], [200.]], graph.globals)
+
+  def test_typed_networkxs_to_graphs_tuple_without_features(self):
+    graph_nx = nx.OrderedMultiDiGraph()
+    graph_nx.add_node(0, type="a", features=None)
+    graph_nx.add_node(1, type="b", features=None)
+    graph_nx.add_edge(0, 1, type="r", features=None)
+    graph = utils_np.typed_networkxs_to_graphs_tuple([graph_nx])
+    self.assertIsNone(graph.nodes)
+    self.assertIsNone(graph.edges)
+    self.assertAllEqual([0], graph.senders[("a", "r", "b")])
+
+  def test_typed_networkxs_to_graphs_tuple_missing_type_raises(self):
+    graph_nx = _typed_networkx(0.)
+    graph_nx.add_node(3, features=np.array([0., 0.]))
+    with self.assertRaisesRegexp(KeyError, "type"):
+      utils_np.typed_networkxs_to_graphs_tuple([graph_nx])
+
+  def test_typed_networkxs_to_graphs_tuple_partial_features_raises(self):
+    graph_nx = _typed_networkx(0.)
+    graph_nx.add_node(3, type="a", features=None)
+    with self.assertRaisesRegexp(ValueError, "all the nodes"):
+      utils_np.typed_networkxs_to_graphs_tuple([graph_nx])
+
+
+class BipartiteTest(tf.test.TestCase):
+
+  def setUp(self):
+    super(BipartiteTest, self).setUp()
+    self.data_dicts = test_utils.make_bipartite_data_dicts()
+
+  def test_data_dicts_to_graphs_tuple(self):
+    graph = utils_np.bipartite_data_dicts_to_graphs_tuple(self.data_dicts)
+    self.assertAllEqual([2, 3, 1], graph.n_left_nodes)
+    self.assertAllEqual([3, 4, 0], graph.n_right_nodes)
+    self.assertAllEqual([4, 5, 0], graph.n_edge)
+    self.assertAllEqual([0, 1, 1, 0, 2, 4, 4, 3, 2], graph.senders)
+    self.assertAllEqual([2, 2, 0, 1, 4, 6, 6, 3, 5], graph.receivers)
+    self.assertEqual((6, 2), graph.left_nodes.shape)
+    self.assertEqual((7, 3), graph.right_nodes.shape)
+
+  def test_round_trip(self):
+    graph = utils_np.bipartite_data_dicts_to_graphs_tuple(self.data_dicts)
+    actual = utils_np.bipartite_graphs_tuple_to_data_dicts(graph)
+    self.assertEqual(len(self.data_dicts), len(actual))
+    for expected_dict, actual_dict in zip(self.data_dicts, actual):
+      for k, v in expected_dict.items():
+        self.assertAllClose(v, actual_dict[k])
+
+  def test_get_bipartite_graph(self):
+    graph = utils_np.bipartite_data_dicts_to_graphs_tuple(self.data_dicts)
+    sliced = utils_np.get_bipartite_graph(graph, slice(1, 3))
+    actual = utils_np.bipartite_graphs_tuple_to_data_dicts(sliced)
+    for expected_dict, actual_dict in zip(self.data_dicts[1:], actual):
+      for k, v in expected_dict.items():
+        self.assertAllClose(v, actual_dict[k])
+
 if __name__ == "__main__":
   tf.test.main()
@@ -19,6 +19,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import time
+import warnings
+
 from absl.testing import parameterized
 from graph_nets import graphs
 from graph_nets import utils_np
@@ -26,6 +29,7 @@ from graph_nets import utils_tf
 from graph_nets.tests import test_utils
 import networkx as nx
 import numpy as np
+from scipy import sparse
 from six.moves import range
 import tensorflow as tf
 
@@ -76,6 +80,43 @@ class RepeatTest(tf.test.TestCase, parameterized.TestCase):
       utils_tf.repeat(t, indices, axis=1, **kwargs)
 
 
+class RepeatGraphIndexTest(tf.test.TestCase):
+  """Tests for `repeat_graph_index` and `graph_index_cache`."""
+
+  def test_repeat_graph_index(self):
+    counts = tf.constant([2, 0, 3, 1])
+    graph_index = utils_tf.repeat_graph_index(counts)
+    with self.test_session() as sess:
+      self.assertAllEqual([0, 0, 2, 2, 2, 3], sess.run(graph_index))
+
+  def test_not_cached_outside_context(self):
+    counts = tf.constant([2, 0, 3, 1])
+    self.assertIsNot(utils_tf.repeat_graph_index(counts),
+                     utils_tf.repeat_graph_index(counts))
+
+  def test_cached_inside_context(self):
+    counts = tf.constant([2, 0, 3, 1])
+    other_counts = tf.constant([2, 0, 3, 1])
+    with utils_tf.graph_index_cache():
+      graph_index = utils_tf.repeat_graph_index(counts)
+      num_ops = len(tf.get_default_graph().get_operations())
+      self.assertIs(graph_index, utils_tf.repeat_graph_index(counts))
+      self.assertEqual(num_ops, len(tf.get_default_graph().get_operations()))
+      self.assertIsNot(graph_index, utils_tf.repeat_graph_index(other_counts))
+    self.assertIsNot(graph_index, utils_tf.repeat_graph_index(counts))
+
+  def test_not_shared_across_control_flow_contexts(self):
+    counts = tf.constant([2, 0, 3, 1])
+    with utils_tf.graph_index_cache():
+      graph_index = utils_tf.repeat_graph_index(counts)
+      output = tf.cond(
+          tf.constant(True),
+          lambda: tf.reduce_sum(utils_tf.repeat_graph_index(counts)),
+          lambda: tf.reduce_sum(graph_index))
+      with self.test_session() as sess:
+        self.assertEqual(7, sess.run(output))
+
+
 def _generate_graph(batch_index, n_nodes=4, add_edges=True):
   graph = nx.DiGraph()
   for node in range(n_nodes):
@@ -245,6 +286,43 @@ class BuildPlaceholdersTest(test_utils.GraphsTest, parameterized.TestCase):
       else:
         self.assertAllEqual([num_graphs], shape)
 
+  def test_placeholders_from_data_dicts_with_lists(self):
+    data_dicts = [{"nodes": [[0., 1.]], "edges": [[1]], "senders": [0],
+                   "receivers": [0], "globals": [0.5]}]
+    with warnings.catch_warnings(record=True) as caught:
+      warnings.simplefilter("always")
+      placeholders = utils_tf.placeholders_from_data_dicts(data_dicts)
+    self.assertEqual([], caught)
+    # As for `tf.convert_to_tensor`, Python numbers are 32 bits.
+    self.assertEqual(tf.float32, placeholders.nodes.dtype)
+    self.assertEqual(tf.int32, placeholders.edges.dtype)
+    self.assertEqual(tf.float32, placeholders.globals.dtype)
+    self.assertEqual([None, 2], placeholders.nodes.shape.as_list())
+    expected = utils_tf.data_dicts_to_graphs_tuple(data_dicts)
+    for field in ["nodes", "edges", "globals"]:
+      self.assertEqual(getattr(expected, field).dtype,
+                       getattr(placeholders, field).dtype)
+    # Numpy arrays keep their dtype.
+    data_dicts[0]["nodes"] = np.array(data_dicts[0]["nodes"])
+    placeholders = utils_tf.placeholders_from_data_dicts(data_dicts)
+    self.assertEqual(tf.float64, placeholders.nodes.dtype)
+    with self.assertRaisesRegexp(ValueError, "at least one data dict"):
+      utils_tf.placeholders_from_data_dicts([])
+
+  def test_placeholders_from_data_dicts_with_feature_dtype_policy(self):
+    data_dicts = [{"nodes": [[0.5, 1.]], "edges": None, "senders": [],
+                   "receivers": [], "globals": [0.25]}]
+    with utils_np.feature_dtype_policy(np.float32):
+      placeholders = utils_tf.placeholders_from_data_dicts(data_dicts)
+      graph = utils_np.data_dicts_to_graphs_tuple(data_dicts)
+    self.assertEqual(tf.float32, placeholders.nodes.dtype)
+    self.assertEqual(tf.float32, placeholders.globals.dtype)
+    self.assertIsNone(placeholders.edges)
+    with self.test_session() as sess:
+      nodes = sess.run(placeholders.nodes,
+                       utils_tf.get_feed_dict(placeholders, graph))
+    self.assertEqual(np.float32, nodes.dtype)
+
   def test_placeholders_from_networkxs(self):
     num_graphs = 16
     networkxs = [
@@ -300,6 +378,105 @@ class BuildPlaceholdersTest(test_utils.GraphsTest, parameterized.TestCase):
     self._assert_expected_shapes(
         placeholders, but_for=["edges"], num_graphs=num_graphs)
 
+  @parameterized.named_parameters(("static_num_graphs", 16),
+                                  ("dynamic_num_graphs", None))
+  def test_placeholders_from_spec(self, num_graphs):
+    spec = utils_np.spec_from_networkx(_generate_graph(0))
+    spec = graphs.spec_from_json(graphs.spec_to_json(spec))
+    placeholders = utils_tf.placeholders_from_spec(spec, num_graphs=num_graphs)
+    self._assert_expected_shapes(placeholders, num_graphs=num_graphs)
+    self.assertEqual(tf.float32, placeholders.nodes.dtype)
+    self.assertEqual(tf.float64, placeholders.edges.dtype)
+    self.assertEqual(tf.int32, placeholders.senders.dtype)
+
+  def test_placeholders_from_spec_sparse(self):
+    spec = utils_np.spec_from_data_dict(
+        {"nodes": sparse.random(3, 20, format="csr", dtype=np.float32)})
+    placeholders = utils_tf.placeholders_from_spec(spec)
+    self.assertIsInstance(placeholders.nodes, tf.SparseTensor)
+    self.assertIsNone(placeholders.edges)
+
+  def test_tensor_specs_from_spec(self):
+    spec = utils_np.spec_from_networkx(_generate_graph(0))
+    tensor_specs = utils_tf.tensor_specs_from_spec(spec, num_graphs=16)
+    placeholders = utils_tf.placeholders_from_spec(spec, num_graphs=16)
+    for tensor_spec, placeholder in zip(tensor_specs, placeholders):
+      self.assertTrue(tensor_spec.is_compatible_with(placeholder))
+    with self.assertRaisesRegexp(ValueError, "Sparse fields"):
+      utils_tf.tensor_specs_from_spec(spec.replace(
+          nodes=graphs.FieldSpec("float32", [2], sparse=True)))
+
+  def test_tensor_specs_from_graphs_tuple(self):
+    graph = utils_np.networkxs_to_graphs_tuple(
+        [_generate_graph(batch_index) for batch_index in range(3)])
+    tensor_specs = utils_tf.tensor_specs_from_graphs_tuple(
+        graph.replace(globals=None))
+    self.assertIsNone(tensor_specs.globals)
+    self.assertEqual([None, 3], tensor_specs.edges.shape.as_list())
+    self.assertEqual([None], tensor_specs.n_node.shape.as_list())
+    self.assertEqual(tf.int32, tensor_specs.senders.dtype)
+    placeholders = utils_tf.placeholders_from_data_dicts(
+        utils_np.graphs_tuple_to_data_dicts(graph))
+    for tensor_spec, expected_spec in zip(
+        utils_tf.tensor_specs_from_graphs_tuple(placeholders),
+        utils_tf.tensor_specs_from_graphs_tuple(graph)):
+      self.assertEqual(expected_spec.dtype, tensor_spec.dtype)
+      self.assertEqual(expected_spec.shape.as_list(),
+                       tensor_spec.shape.as_list())
+    with self.assertRaisesRegexp(ValueError, "must be statically known"):
+      utils_tf.tensor_specs_from_graphs_tuple(placeholders.replace(
+          nodes=tf.placeholder(tf.float32, [None, None])))
+
+  def test_dataset_signature_from_spec(self):
+    graph = utils_np.networkxs_to_graphs_tuple(
+        [_generate_graph(batch_index) for batch_index in range(3)])
+    graph = graph.replace(globals=None)
+    spec = utils_np.spec_from_graphs_tuple(graph)
+    output_types, output_shapes = utils_tf.dataset_signature_from_spec(spec)
+    self.assertNotIn("globals", output_types)
+    self.assertEqual([None, 3], output_shapes["edges"].as_list())
+
+    def generator():
+      yield {k: v for k, v in graph._asdict().items() if v is not None}
+
+    dataset = tf.data.Dataset.from_generator(
+        generator, output_types, output_shapes)
+    output = utils_tf.dataset_element_to_graphs_tuple(
+        dataset.make_one_shot_iterator().get_next())
+    self.assertIsNone(output.globals)
+    with self.test_session() as sess:
+      output = sess.run(utils_tf.make_runnable_in_session(output))
+    for field in ["nodes", "edges", "senders", "receivers", "n_node",
+                  "n_edge"]:
+      self.assertAllEqual(getattr(graph, field), getattr(output, field))
+
+  @parameterized.named_parameters(
+      ("all fields", []),
+      ("no features", ["nodes", "edges", "globals"]),
+      ("no edges", ["edges", "receivers", "senders"]))
+  def test_unpack_graphs_tuple(self, none_fields):
+    graph = utils_np.networkxs_to_graphs_tuple(
+        [_generate_graph(batch_index) for batch_index in range(3)])
+    graph = graph.replace(**{field: None for field in none_fields})
+    spec = utils_np.spec_from_graphs_tuple(graph)
+    buffer_ph = tf.placeholder(tf.uint8, [None])
+    unpacked = utils_tf.unpack_graphs_tuple(buffer_ph, spec)
+    self.assertEqual(
+        [[None] + list(getattr(spec, field).shape)
+         for field in utils_tf.ALL_FIELDS if field not in none_fields],
+        [value.shape.as_list() for value in unpacked if value is not None])
+    with self.test_session() as sess:
+      output = sess.run(
+          utils_tf.make_runnable_in_session(unpacked),
+          {buffer_ph: utils_np.pack_graphs_tuple(graph)})
+    for field in utils_tf.ALL_FIELDS:
+      if field in none_fields:
+        self.assertIsNone(getattr(output, field))
+      else:
+        self.assertAllEqual(getattr(graph, field), getattr(output, field))
+        self.assertEqual(getattr(graph, field).dtype,
+                         getattr(output, field).dtype)
+
   def test_feed_data(self):
     networkx = [_generate_graph(batch_index) for batch_index in range(16)]
     placeholders = utils_tf.placeholders_from_networkxs(
@@ -897,6 +1074,31 @@ class GraphsTupleConversionTests(test_utils.GraphsTest, parameterized.TestCase):
     with self.test_session() as sess:
       self._assert_graph_equals_np(self.reference_graph, sess.run(graphs_tuple))
 
+  @parameterized.named_parameters(
+      ("all fields defined", []),
+      ("no edges", ["edges", "receivers", "senders"]))
+  def test_offset_local_indices(self, none_fields):
+    for graph_dict in self.graphs_dicts_in:
+      for field in none_fields:
+        graph_dict[field] = None
+    expected = utils_np.data_dicts_to_graphs_tuple(self.graphs_dicts_in)
+    local_graph = utils_np.data_dicts_to_graphs_tuple(
+        self.graphs_dicts_in, local_index_dtype=np.uint16)
+    placeholders = utils_tf.placeholders_from_spec(
+        utils_np.spec_from_graphs_tuple(local_graph))
+    graph = utils_tf.offset_local_indices(placeholders)
+    if not none_fields:
+      self.assertEqual(tf.uint16, placeholders.senders.dtype)
+    with self.test_session() as sess:
+      output = sess.run(utils_tf.make_runnable_in_session(graph),
+                        utils_tf.get_feed_dict(placeholders, local_graph))
+    for field in ["receivers", "senders"]:
+      if none_fields:
+        self.assertIsNone(getattr(output, field))
+      else:
+        self.assertEqual(np.int32, getattr(output, field).dtype)
+        self.assertAllEqual(getattr(expected, field), getattr(output, field))
+
   @parameterized.parameters(("receivers",), ("senders",))
   def test_data_dicts_to_graphs_tuple_raises(self, none_field):
     """Fields that cannot be missing."""
@@ -1005,6 +1207,54 @@ class GraphsIndexingTests(test_utils.GraphsTest, parameterized.TestCase):
     with self.assertRaisesRegexp(error_type, message):
       utils_tf.get_graph(graphs_tuple, index)
 
+  @parameterized.named_parameters(
+      ("list_indices", False, []),
+      ("tensor_indices", True, []),
+      ("no_features", False, ["nodes", "edges", "globals"]),
+      ("no_edges", False, ["edges", "receivers", "senders"]))
+  def test_gather_graphs(self, use_tensor_indices, none_fields):
+    indices = [4, 1, 1, 0, 6]
+    expected = [self.graphs_dicts_out[i] for i in indices]
+    if use_tensor_indices:
+      indices = tf.constant(indices)
+
+    graphs_tuple = utils_tf.data_dicts_to_graphs_tuple(self.graphs_dicts_in)
+    graphs_tuple = graphs_tuple.map(lambda _: None, none_fields)
+    gathered_op = utils_tf.gather_graphs(graphs_tuple, indices)
+    for none_field in none_fields:
+      self.assertEqual(None, getattr(gathered_op, none_field))
+    gathered_op = utils_tf.make_runnable_in_session(gathered_op)
+
+    with self.test_session() as sess:
+      gathered = sess.run(gathered_op)
+    actual = utils_np.graphs_tuple_to_data_dicts(gathered)
+
+    self.assertEqual(len(expected), len(actual))
+    for ex, ac in zip(expected, actual):
+      for k, v in ex.items():
+        if k in none_fields:
+          self.assertEqual(None, ac[k])
+        else:
+          self.assertAllClose(v, ac[k])
+      self.assertEqual(ex["nodes"].shape[0], ac["n_node"])
+
+  def test_gather_graphs_same_as_get_graph(self):
+    graphs_tuple = utils_tf.data_dicts_to_graphs_tuple(self.graphs_dicts_in)
+    gathered_op = utils_tf.gather_graphs(graphs_tuple, tf.range(1, 3))
+    sliced_op = utils_tf.get_graph(graphs_tuple, slice(1, 3))
+    with self.test_session() as sess:
+      gathered, sliced = sess.run([gathered_op, sliced_op])
+    self._assert_graph_equals_np(sliced, gathered)
+
+  @parameterized.named_parameters(
+      ("bad_dtype", [0., 1.], TypeError, "must have an integer type"),
+      ("bad_rank", [[0, 1]], ValueError, "must be of rank 1"),
+  )
+  def test_gather_graphs_raises(self, indices, error_type, message):
+    graphs_tuple = utils_tf.data_dicts_to_graphs_tuple(self.graphs_dicts_in)
+    with self.assertRaisesRegexp(error_type, message):
+      utils_tf.gather_graphs(graphs_tuple, indices)
+
 
 class TestNumGraphs(test_utils.GraphsTest):
   """Tests for the `get_num_graphs` function."""
@@ -1029,5 +1279,302 @@ class TestNumGraphs(test_utils.GraphsTest):
     self.assertEqual(3, actual_num_graphs)
 
 
+class DenseConversionTests(test_utils.GraphsTest, parameterized.TestCase):
+  """Tests for the conversions between sparse and dense graphs."""
+
+  def setUp(self):
+    super(DenseConversionTests, self).setUp()
+    # Graphs without multiple edges between the same pair of nodes, including
+    # a graph without nodes and a graph without edges.
+    self.dense_data_dicts = [
+        dict(nodes=np.arange(6, dtype=np.float32).reshape([3, 2]),
+             edges=np.arange(4, dtype=np.float32)[:, None] + 10.,
+             receivers=np.array([0, 1, 2, 0], dtype=np.int32),
+             senders=np.array([1, 2, 0, 0], dtype=np.int32),
+             globals=np.array([1.], dtype=np.float32)),
+        dict(nodes=np.zeros([0, 2], dtype=np.float32),
+             edges=np.zeros([0, 1], dtype=np.float32),
+             receivers=np.zeros([0], dtype=np.int32),
+             senders=np.zeros([0], dtype=np.int32),
+             globals=np.array([2.], dtype=np.float32)),
+        dict(nodes=np.array([[20., 21.]], dtype=np.float32),
+             edges=np.zeros([0, 1], dtype=np.float32),
+             receivers=np.zeros([0], dtype=np.int32),
+             senders=np.zeros([0], dtype=np.int32),
+             globals=np.array([3.], dtype=np.float32)),
+        dict(nodes=np.array([[30., 31.], [32., 33.]], dtype=np.float32),
+             edges=np.array([[40.]], dtype=np.float32),
+             receivers=np.array([1], dtype=np.int32),
+             senders=np.array([0], dtype=np.int32),
+             globals=np.array([4.], dtype=np.float32)),
+    ]
+
+  def test_graphs_tuple_to_dense(self):
+    graph = utils_tf.data_dicts_to_graphs_tuple(self.dense_data_dicts)
+    dense_graph = utils_tf.graphs_tuple_to_dense(graph)
+    with self.test_session() as sess:
+      dense_graph = sess.run(dense_graph)
+    self.assertAllEqual([4, 3, 2], dense_graph.nodes.shape)
+    self.assertAllEqual([4, 3, 3, 1], dense_graph.edges.shape)
+    self.assertAllEqual([[True, True, True], [False, False, False],
+                         [True, False, False], [True, True, False]],
+                        dense_graph.node_mask)
+    self.assertAllEqual([4., 5.], dense_graph.nodes[0, 2])
+    self.assertAllEqual([[30., 31.], [32., 33.], [0., 0.]],
+                        dense_graph.nodes[3])
+    expected_adjacency = np.zeros([4, 3, 3], dtype=bool)
+    expected_adjacency[0, [0, 1, 2, 0], [1, 2, 0, 0]] = True
+    expected_adjacency[3, 1, 0] = True
+    self.assertAllEqual(expected_adjacency, dense_graph.adjacency)
+    self.assertAllEqual(10., dense_graph.edges[0, 0, 1, 0])
+    self.assertAllEqual(13., dense_graph.edges[0, 0, 0, 0])
+    self.assertAllEqual(40., dense_graph.edges[3, 1, 0, 0])
+    self.assertAllEqual(0., dense_graph.edges[3, 0, 1, 0])
+
+  @parameterized.named_parameters(
+      ("default", None, False),
+      ("padded", 5, False),
+      ("no_edges", None, True),
+  )
+  def test_dense_round_trip(self, max_n_node, none_edges):
+    graph = utils_tf.data_dicts_to_graphs_tuple(self.dense_data_dicts)
+    if none_edges:
+      graph = graph.replace(edges=None)
+    dense_graph = utils_tf.graphs_tuple_to_dense(graph, max_n_node=max_n_node)
+    output_graph = utils_tf.dense_to_graphs_tuple(dense_graph, graph)
+    with self.test_session() as sess:
+      graph, output_graph = sess.run([graph, output_graph])
+    self._assert_graph_equals_np(graph, output_graph)
+
+  def test_dense_to_graphs_tuple_raises_without_receivers(self):
+    graph = utils_tf.data_dicts_to_graphs_tuple(self.dense_data_dicts)
+    dense_graph = utils_tf.graphs_tuple_to_dense(graph)
+    with self.assertRaisesRegexp(ValueError, "no receivers"):
+      utils_tf.dense_to_graphs_tuple(
+          dense_graph, graph.replace(receivers=None, senders=None, edges=None))
+
+  @parameterized.named_parameters(
+      ("dense", 3, 0.1, True),
+      ("too_many_nodes", 2, 0.1, False),
+      ("too_sparse", 3, 0.5, False),
+  )
+  def test_should_use_dense(self, max_n_node, min_density, expected):
+    graph = utils_tf.data_dicts_to_graphs_tuple(self.dense_data_dicts)
+    use_dense = utils_tf.should_use_dense(
+        graph, max_n_node=max_n_node, min_density=min_density)
+    with self.test_session() as sess:
+      self.assertEqual(expected, sess.run(use_dense))
+
+  @parameterized.named_parameters(
+      ("dense", 3),
+      ("sparse", 2),
+  )
+  def test_dense_or_sparse(self, max_n_node):
+    graph = utils_tf.data_dicts_to_graphs_tuple(self.dense_data_dicts)
+    dense_fn = lambda g: g.replace(nodes=g.nodes + 1., edges=g.edges * 2.)
+    sparse_fn = lambda g: g.replace(nodes=g.nodes + 1., edges=g.edges * 2.)
+    output_graph = utils_tf.dense_or_sparse(
+        graph, dense_fn, sparse_fn, max_n_node=max_n_node, min_density=0.)
+    expected_graph = sparse_fn(graph)
+    with self.test_session() as sess:
+      expected_graph, output_graph = sess.run([expected_graph, output_graph])
+    self._assert_graph_equals_np(expected_graph, output_graph)
+
+  def test_dense_or_sparse_raises_on_different_fields(self):
+    graph = utils_tf.data_dicts_to_graphs_tuple(self.dense_data_dicts)
+    with self.assertRaisesRegexp(ValueError, "same `None` fields"):
+      utils_tf.dense_or_sparse(graph, lambda g: g.replace(edges=None),
+                               lambda g: g)
+
+
+class SparseFeaturesTest(tf.test.TestCase):
+  """Tests for `tf.SparseTensor` nodes and edges."""
+
+  def setUp(self):
+    super(SparseFeaturesTest, self).setUp()
+    tf.reset_default_graph()
+    self.data_dicts = [
+        dict(nodes=sparse.random(n, 30, density=0.2, format="csr",
+                                 random_state=n, dtype=np.float32),
+             edges=np.ones([n - 1, 2], dtype=np.float32),
+             senders=np.arange(n - 1), receivers=np.arange(1, n),
+             globals=np.zeros([1], dtype=np.float32))
+        for n in [3, 1, 4]]
+    self.dense_nodes = np.concatenate(
+        [d["nodes"].toarray() for d in self.data_dicts])
+
+  def _to_dense(self, value):
+    dense_shape = value.dense_shape
+    dense = np.zeros(dense_shape, dtype=value.values.dtype)
+    dense[tuple(value.indices.T)] = value.values
+    return dense
+
+  def test_data_dicts_to_graphs_tuple(self):
+    graph = utils_tf.data_dicts_to_graphs_tuple(self.data_dicts)
+    self.assertIsInstance(graph.nodes, tf.SparseTensor)
+    with self.test_session() as sess:
+      graph = sess.run(graph)
+    self.assertAllClose(self.dense_nodes, self._to_dense(graph.nodes))
+    self.assertAllEqual([3, 1, 4], graph.n_node)
+    self.assertAllEqual([0, 1, 4, 5, 6], graph.senders)
+
+  def test_placeholders_and_feed_dict(self):
+    placeholders = utils_tf.placeholders_from_data_dicts(self.data_dicts)
+    self.assertIsInstance(placeholders.nodes, tf.SparseTensor)
+    self.assertNotIsInstance(placeholders.edges, tf.SparseTensor)
+    numpy_graph = utils_np.data_dicts_to_graphs_tuple(self.data_dicts)
+    feed_dict = utils_tf.get_feed_dict(placeholders, numpy_graph)
+    with self.test_session() as sess:
+      nodes = sess.run(placeholders.nodes, feed_dict)
+    self.assertAllClose(self.dense_nodes, self._to_dense(nodes))
+
+  def test_concat(self):
+    graphs_tuples = [utils_tf.data_dicts_to_graphs_tuple([d])
+                     for d in self.data_dicts]
+    graph = utils_tf.concat(graphs_tuples, axis=0)
+    with self.test_session() as sess:
+      graph = sess.run(graph)
+    self.assertAllClose(self.dense_nodes, self._to_dense(graph.nodes))
+    self.assertAllEqual([1, 2, 4, 5, 6], graph.receivers)
+
+  def test_get_graph(self):
+    graph = utils_tf.data_dicts_to_graphs_tuple(self.data_dicts)
+    sliced = utils_tf.get_graph(graph, slice(1, 3))
+    with self.test_session() as sess:
+      sliced = sess.run(sliced)
+    self.assertAllClose(self.dense_nodes[3:], self._to_dense(sliced.nodes))
+    self.assertAllEqual([2, 3, 4], sliced.receivers)
+
+
+class BipartiteTest(tf.test.TestCase, parameterized.TestCase):
+  """Tests for the `graphs.BipartiteGraphsTuple` utilities."""
+
+  def setUp(self):
+    super(BipartiteTest, self).setUp()
+    tf.reset_default_graph()
+    self.data_dicts = test_utils.make_bipartite_data_dicts()
+    self.expected = utils_np.bipartite_data_dicts_to_graphs_tuple(
+        self.data_dicts)
+
+  def _assert_bipartite_equal(self, expected, actual):
+    for field in graphs.BIPARTITE_ALL_FIELDS:
+      self.assertAllClose(getattr(expected, field), getattr(actual, field))
+
+  def test_data_dicts_to_graphs_tuple(self):
+    graph = utils_tf.bipartite_data_dicts_to_graphs_tuple(self.data_dicts)
+    with self.test_session() as sess:
+      actual = sess.run(graph)
+    self._assert_bipartite_equal(self.expected, actual)
+
+  @parameterized.named_parameters(("static", False), ("dynamic", True))
+  def test_placeholders_and_feed_dict(self, force_dynamic_num_graphs):
+    placeholders = utils_tf.bipartite_placeholders_from_data_dicts(
+        self.data_dicts, force_dynamic_num_graphs=force_dynamic_num_graphs)
+    self.assertIsInstance(placeholders, graphs.BipartiteGraphsTuple)
+    self.assertEqual(force_dynamic_num_graphs,
+                     placeholders.n_left_nodes.shape[0].value is None)
+    self.assertIsNone(placeholders.left_nodes.shape[0].value)
+    feed_dict = utils_tf.get_feed_dict(placeholders, self.expected)
+    with self.test_session() as sess:
+      actual = sess.run(placeholders, feed_dict)
+    self._assert_bipartite_equal(self.expected, actual)
+
+  def test_concat(self):
+    first = utils_tf.bipartite_data_dicts_to_graphs_tuple(self.data_dicts[:1])
+    rest = utils_tf.bipartite_data_dicts_to_graphs_tuple(self.data_dicts[1:])
+    graph = utils_tf.bipartite_concat([first, rest], axis=0)
+    with self.test_session() as sess:
+      actual = sess.run(graph)
+    self._assert_bipartite_equal(self.expected, actual)
+
+  @parameterized.named_parameters(
+      ("int", 1, False, slice(1, 2)),
+      ("slice", slice(1, 3), False, slice(1, 3)),
+      ("tensor", 2, True, slice(2, 3)),
+  )
+  def test_get_bipartite_graph(self, index, use_tensor, expected_slice):
+    if use_tensor:
+      index = tf.constant(index)
+    graph = utils_tf.bipartite_data_dicts_to_graphs_tuple(self.data_dicts)
+    sliced = utils_tf.get_bipartite_graph(graph, index)
+    with self.test_session() as sess:
+      actual = sess.run(sliced)
+    expected = utils_np.get_bipartite_graph(self.expected, expected_slice)
+    self._assert_bipartite_equal(expected, actual)
+
+
+class ConcatBenchmark(tf.test.Benchmark):
+  """Benchmarks `concat` along the first axis for many graphs tuples."""
+
+  def _benchmark_concat(self, num_inputs):
+    with tf.Graph().as_default():
+      graphs_tuple = utils_np.networkxs_to_graphs_tuple(
+          [_generate_graph(0, 3), _generate_graph(1, 2)])
+      input_graphs = [
+          graphs_tuple.map(tf.constant, graphs.ALL_FIELDS)
+          for _ in range(num_inputs)
+      ]
+      num_ops_before = len(tf.get_default_graph().get_operations())
+      start_time = time.time()
+      concat_graph = utils_tf.concat(input_graphs, axis=0)
+      build_time = time.time() - start_time
+      num_ops = len(tf.get_default_graph().get_operations()) - num_ops_before
+      with tf.Session() as sess:
+        self.run_op_benchmark(
+            sess,
+            concat_graph,
+            min_iters=10,
+            name="concat_{}_inputs".format(num_inputs),
+            extras={"num_ops": num_ops, "build_time": build_time})
+
+  def benchmark_concat_10_inputs(self):
+    self._benchmark_concat(10)
+
+  def benchmark_concat_100_inputs(self):
+    self._benchmark_concat(100)
+
+  def benchmark_concat_1000_inputs(self):
+    self._benchmark_concat(1000)
+
+
+class PackedFeedBenchmark(tf.test.Benchmark):
+  """Benchmarks feeding many small batches field by field or packed."""
+
+  def _benchmark_feed(self, packed, num_batches=1000):
+    batches = [
+        utils_np.networkxs_to_graphs_tuple(
+            [_generate_graph(batch_index, 3) for batch_index in range(2)])
+        for _ in range(num_batches)]
+    spec = utils_np.spec_from_graphs_tuple(batches[0])
+    with tf.Graph().as_default():
+      if packed:
+        buffer_ph = tf.placeholder(tf.uint8, [None])
+        graph = utils_tf.unpack_graphs_tuple(buffer_ph, spec)
+      else:
+        placeholders = utils_tf.placeholders_from_spec(spec)
+        graph = placeholders
+      # Depends on every field, so that they are all transferred.
+      output = tf.add_n(
+          [tf.reduce_sum(tf.cast(value, tf.float32)) for value in graph])
+      with tf.Session() as sess:
+        start_time = time.time()
+        for batch in batches:
+          if packed:
+            feed_dict = {buffer_ph: utils_np.pack_graphs_tuple(batch, spec)}
+          else:
+            feed_dict = utils_tf.get_feed_dict(placeholders, batch)
+          sess.run(output, feed_dict)
+        wall_time = (time.time() - start_time) / num_batches
+    self.report_benchmark(
+        iters=num_batches, wall_time=wall_time,
+        name="feed_{}".format("packed" if packed else "fields"))
+
+  def benchmark_feed_fields(self):
+    self._benchmark_feed(packed=False)
+
+  def benchmark_feed_packed(self):
+    self._benchmark_feed(packed=True)
+
+
 if __name__ == "__main__":
   tf.test.main()
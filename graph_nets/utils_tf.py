@@ -20,9 +20,23 @@ of graphs, in particular:
   - `build_placeholders_from_data_dicts` and `build_placeholders_from_networkx`
      create placeholder structures to represent graphs;
 
+  - `placeholders_from_spec`, `tensor_specs_from_spec` and
+    `dataset_signature_from_spec` create placeholders, `tf.TensorSpec`s and
+    `tf.data` signatures from a spec of graphs (a `graphs.GraphsTuple` of
+    `graphs.FieldSpec`s), without any sample data, and
+    `tensor_specs_from_graphs_tuple` derives the `tf.TensorSpec`s of a batch;
+
+  - `GraphsTupleFunction` compiles a function of graphs (e.g. a
+    `modules.GraphNetwork`) with `tf.function`, with an input signature which
+    does not depend on the number of nodes and edges of the batches;
+
   - `get_feed_dict` allow to create a `feed_dict` from a `graphs.GraphsTuple`
     containing numpy arrays and potentially, `None` values;
 
+  - `unpack_graphs_tuple` rebuilds a `graphs.GraphsTuple` from a single byte
+    buffer packed by `utils_np.pack_graphs_tuple`, so that a batch is fed in
+    one transfer instead of one per field;
+
   - `data_dicts_to_graphs_tuple` converts between data dictionaries and
     `graphs.GraphsTuple`;
 
@@ -36,15 +50,34 @@ of graphs, in particular:
     `set_zero_global_features` complete a `graphs.GraphsTuple` with a `Tensor`
     of zeros for the nodes, edges and globals;
 
+  - `offset_local_indices` offsets the per-graph `SENDERS` and `RECEIVERS` of
+    a graph batched with `utils_np.data_dicts_to_graphs_tuple(...,
+    local_index_dtype=...)`, so that they index the batched `NODES`;
+
   - `concat` batches `graphs.GraphsTuple` together (when using `axis=0`), or
     concatenates them along their data dimension;
 
   - `repeat` is a utility convenient to broadcast globals to edges or nodes of
     a graph;
 
+  - `repeat_graph_index` computes the index of the graph of each node or edge,
+    and `graph_index_cache` memoizes it across blocks and steps;
+
   - `get_graph` indexes or slices a `graphs.GraphsTuple` to extract a subgraph
     or a subbatch of graphs;
 
+  - `gather_graphs` extracts an arbitrary list of graphs from a
+    `graphs.GraphsTuple`, with a number of ops independent of the list length;
+
+  - `bipartite_data_dicts_to_graphs_tuple`,
+    `bipartite_placeholders_from_data_dicts`, `bipartite_concat` and
+    `get_bipartite_graph` are the equivalents of the above for
+    `graphs.BipartiteGraphsTuple`;
+
+  - `graphs_tuple_to_dense` and `dense_to_graphs_tuple` convert between
+    `graphs.GraphsTuple` and the padded `graphs.DenseGraphsTuple`, and
+    `dense_or_sparse` picks one of the two representations per batch;
+
   - `stop_gradients` stops the gradients flowing through a graph;
 
   - `identity` applies a `tf.identity` to every field of a graph;
@@ -54,12 +87,18 @@ of graphs, in particular:
 
 The functions in these modules are able to deal with graphs containing `None`
 fields (e.g. featureless nodes, featureless edges, or no edges).
+
+The NODES and EDGES fields can also be `tf.SparseTensor`s (fed from
+`scipy.sparse` matrices), which are supported by the placeholders and feed
+dicts, `data_dicts_to_graphs_tuple`, `concat` and `get_graph`.
 """
 
 from __future__ import absolute_import, division, print_function
 
 import collections
+import contextlib
 
+import numpy as np
 import six
 import tensorflow as tf
 from graph_nets import graphs, utils_np
@@ -78,6 +117,63 @@ GRAPH_DATA_FIELDS = graphs.GRAPH_DATA_FIELDS
 GRAPH_NUMBER_FIELDS = graphs.GRAPH_NUMBER_FIELDS
 ALL_FIELDS = graphs.ALL_FIELDS
 
+LEFT_NODES = graphs.LEFT_NODES
+RIGHT_NODES = graphs.RIGHT_NODES
+N_LEFT_NODES = graphs.N_LEFT_NODES
+N_RIGHT_NODES = graphs.N_RIGHT_NODES
+BIPARTITE_GRAPH_DATA_FIELDS = graphs.BIPARTITE_GRAPH_DATA_FIELDS
+BIPARTITE_GRAPH_NUMBER_FIELDS = graphs.BIPARTITE_GRAPH_NUMBER_FIELDS
+BIPARTITE_ALL_FIELDS = graphs.BIPARTITE_ALL_FIELDS
+
+
+def _is_sparse(value):
+  """Returns whether `value` is a sparse tensor, value or `scipy.sparse` matrix."""
+  return (isinstance(value, (tf.SparseTensor, tf.SparseTensorValue)) or
+          utils_np._is_sparse(value))  # pylint: disable=protected-access
+
+
+def _sparse_matrix_to_value(matrix):
+  """Converts a `scipy.sparse` matrix to a `tf.SparseTensorValue`."""
+  # Canonical (row-major) ordering of the indices, as expected by `tf.sparse`.
+  coo = matrix.tocsr().sorted_indices().tocoo()
+  indices = np.stack([coo.row, coo.col], axis=-1).astype(np.int64)
+  return tf.SparseTensorValue(indices, coo.data, np.array(coo.shape, np.int64))
+
+
+def _to_sparse_tensor(value):
+  """Converts a `scipy.sparse` matrix or sparse value to a `tf.SparseTensor`."""
+  if isinstance(value, tf.SparseTensor):
+    return value
+  if utils_np._is_sparse(value):  # pylint: disable=protected-access
+    value = _sparse_matrix_to_value(value)
+  return tf.SparseTensor.from_value(value)
+
+
+def _num_rows(tensor):
+  """Returns the leading dimension of a dense or sparse tensor as an int32."""
+  if isinstance(tensor, tf.SparseTensor):
+    return tf.cast(tensor.dense_shape[0], tf.int32)
+  return tf.shape(tensor)[0]
+
+
+def _concat_rows_or_columns(values, axis, name):
+  """Concatenates dense or sparse tensors along `axis`."""
+  if isinstance(values[0], tf.SparseTensor):
+    return tf.sparse.concat(axis, values, name=name)
+  return tf.concat(values, axis, name=name)
+
+
+def _slice_rows(tensor, start, stop):
+  """Returns `tensor[start:stop]` for a dense or sparse tensor."""
+  if not isinstance(tensor, tf.SparseTensor):
+    return tensor[start:stop]
+  start = tf.cast(start, tf.int64)
+  trailing_shape = tensor.dense_shape[1:]
+  return tf.sparse.slice(
+      tensor,
+      tf.concat([[start], tf.zeros_like(trailing_shape)], axis=0),
+      tf.concat([[tf.cast(stop, tf.int64) - start], trailing_shape], axis=0))
+
 
 def _get_shape(tensor):
   """Returns the tensor's shape.
@@ -146,7 +242,8 @@ def _inside_to_axis(tensor, axis):
 
 def _build_placeholders_from_specs(dtypes,
                                    shapes,
-                                   force_dynamic_num_graphs=True):
+                                   force_dynamic_num_graphs=True,
+                                   sparse_fields=()):
   """Creates a `graphs.GraphsTuple` of placeholders with `dtypes` and `shapes`.
 
   The dtypes and shapes arguments are instances of `graphs.GraphsTuple` that
@@ -159,20 +256,25 @@ def _build_placeholders_from_specs(dtypes,
   leading dimensions are statically defined.
 
   Args:
-    dtypes: A `graphs.GraphsTuple` that contains `tf.dtype`s or `None`s.
-    shapes: A `graphs.GraphsTuple` that contains `list`s of integers,
-      `tf.TensorShape`s, or `None`s.
+    dtypes: A `graphs.GraphsTuple` (or `graphs.BipartiteGraphsTuple`) that
+      contains `tf.dtype`s or `None`s.
+    shapes: A `graphs.GraphsTuple` (or `graphs.BipartiteGraphsTuple`) that
+      contains `list`s of integers, `tf.TensorShape`s, or `None`s.
     force_dynamic_num_graphs: A `bool` that forces the batch dimension to be
       dynamic. Defaults to `True`.
+    sparse_fields: (iterable of `str`, optional) The fields for which a
+      `tf.sparse_placeholder` is created.
 
   Returns:
-    A `graphs.GraphsTuple` containing placeholders.
+    A graphs tuple of the same type as `dtypes` containing placeholders.
 
   Raises:
     ValueError: The `None` fields in `dtypes` and `shapes` do not match.
   """
+  per_graph_fields = (
+      GRAPH_NUMBER_FIELDS + BIPARTITE_GRAPH_NUMBER_FIELDS + (GLOBALS,))
   dct = {}
-  for field in ALL_FIELDS:
+  for field in dtypes._fields:
     dtype = getattr(dtypes, field)
     shape = getattr(shapes, field)
     if dtype is None or shape is None:
@@ -184,11 +286,14 @@ def _build_placeholders_from_specs(dtypes,
       raise ValueError("Shapes must have at least rank 1")
     else:
       shape = list(shape)
-      if field not in [N_NODE, N_EDGE, GLOBALS] or force_dynamic_num_graphs:
+      if field not in per_graph_fields or force_dynamic_num_graphs:
         shape[0] = None
-      dct[field] = tf.placeholder(dtype, shape=shape, name=field)
+      if field in sparse_fields:
+        dct[field] = tf.sparse_placeholder(dtype, shape=shape, name=field)
+      else:
+        dct[field] = tf.placeholder(dtype, shape=shape, name=field)
 
-  return graphs.GraphsTuple(**dct)
+  return type(dtypes)(**dct)
 
 
 def _placeholders_from_graphs_tuple(graph, force_dynamic_num_graphs=True):
@@ -203,13 +308,16 @@ def _placeholders_from_graphs_tuple(graph, force_dynamic_num_graphs=True):
     A `graphs.GraphsTuple` containing placeholders.
   """
   graph_dtypes = graph.map(
-      lambda v: tf.as_dtype(v.dtype) if v is not None else None, ALL_FIELDS)
+      lambda v: tf.as_dtype(v.dtype) if v is not None else None, graph._fields)
   graph_shapes = graph.map(lambda v: list(v.shape)
-                           if v is not None else None, ALL_FIELDS)
+                           if v is not None else None, graph._fields)
+  sparse_fields = [
+      field for field in graph._fields if _is_sparse(getattr(graph, field))]
   return _build_placeholders_from_specs(
       graph_dtypes,
       graph_shapes,
-      force_dynamic_num_graphs=force_dynamic_num_graphs)
+      force_dynamic_num_graphs=force_dynamic_num_graphs,
+      sparse_fields=sparse_fields)
 
 
 def get_feed_dict(placeholders, graph):
@@ -231,10 +339,15 @@ def get_feed_dict(placeholders, graph):
 
   restoring the correct behavior.
 
+  The fed values are not copied, so `graph` can be the `graph` of a
+  `utils_np.GraphsTupleLease`, whose fields are views of pooled buffers; the
+  lease must only be released once the `session.run` call has returned.
+
   Args:
-    placeholders: A `graphs.GraphsTuple` containing placeholders.
-    graph: A `graphs.GraphsTuple` containing placeholder compatibale values,
-      or `None`s.
+    placeholders: A `graphs.GraphsTuple` (or `graphs.BipartiteGraphsTuple`)
+      containing placeholders.
+    graph: A graphs tuple of the same type containing placeholder compatibale
+      values (`scipy.sparse` matrices for sparse placeholders), or `None`s.
 
   Returns:
     A dictionary with key placeholders and values the fed in values.
@@ -244,23 +357,58 @@ def get_feed_dict(placeholders, graph):
       match.
   """
   feed_dict = {}
-  for field in ALL_FIELDS:
+  for field in placeholders._fields:
     placeholder = getattr(placeholders, field)
     feed_value = getattr(graph, field)
     if placeholder is None or feed_value is None:
       if not (placeholder is None and feed_value is None):
         raise ValueError("Field {} should be `None` in either none or both of "
                          "the placeholders and feed values.".format(field))
+    elif utils_np._is_sparse(feed_value):  # pylint: disable=protected-access
+      feed_dict[placeholder] = _sparse_matrix_to_value(feed_value)
     else:
       feed_dict[placeholder] = feed_value
   return feed_dict
 
 
+def _to_array_like_tensor(value):
+  """Converts a field to a numpy array with the dtype of its `tf.Tensor`.
+
+  Unlike numpy, `tf.convert_to_tensor` converts Python floats and ints to
+  `tf.float32` and `tf.int32`.
+
+  Args:
+    value: A numpy array, `scipy.sparse` matrix, `None`, or nested lists of
+      numbers.
+
+  Returns:
+    `value` if it is a numpy array, a `scipy.sparse` matrix or `None`, and
+    otherwise a numpy array with the dtype of `tf.convert_to_tensor(value)`.
+  """
+  if (value is None or isinstance(value, np.ndarray) or
+      utils_np._is_sparse(value)):  # pylint: disable=protected-access
+    return value
+  array = np.asarray(value)
+  leaf = utils_np._first_leaf(value)  # pylint: disable=protected-access
+  if not isinstance(leaf, (np.ndarray, np.generic)):
+    if array.dtype == np.float64:
+      return array.astype(np.float32)
+    if array.dtype == np.int64:
+      return array.astype(np.int32)
+  return array
+
+
 def placeholders_from_data_dicts(data_dicts,
                                  force_dynamic_num_graphs=True,
                                  name="placeholders_from_data_dicts"):
   """Constructs placeholders compatible with a list of data dicts.
 
+  Only the first data dict is inspected: the dtypes and trailing shapes of the
+  placeholders are those of its fields. As with `tf.convert_to_tensor`, fields
+  given as Python floats or ints (rather than numpy arrays) yield `tf.float32`
+  or `tf.int32` placeholders, unless a `utils_np.feature_dtype_policy` is
+  active.
+
   Args:
     data_dicts: An iterable of data dicts containing numpy arrays.
     force_dynamic_num_graphs: A `bool` that forces the batch dimension to be
@@ -270,11 +418,22 @@ def placeholders_from_data_dicts(data_dicts,
   Returns:
     An instance of `graphs.GraphTuple` placeholders compatible with the
       dimensions of the dictionaries in `data_dicts`.
+
+  Raises:
+    ValueError: If `data_dicts` is empty.
   """
-  with tf.name_scope(name):
-    graph = data_dicts_to_graphs_tuple(data_dicts)
-    return _placeholders_from_graphs_tuple(
-        graph, force_dynamic_num_graphs=force_dynamic_num_graphs)
+  data_dicts = list(data_dicts)
+  if not data_dicts:
+    raise ValueError("`data_dicts` must contain at least one data dict")
+  # The placeholders only depend on the dtypes and trailing shapes, which are
+  # read from the first graph instead of batching all the graphs.
+  data_dict = {k: _to_array_like_tensor(v)
+               if k in graphs.GRAPH_FEATURE_FIELDS else v
+               for k, v in data_dicts[0].items()}
+  return placeholders_from_spec(
+      utils_np.spec_from_data_dict(data_dict),
+      num_graphs=None if force_dynamic_num_graphs else len(data_dicts),
+      name=name)
 
 
 def placeholders_from_networkxs(graph_nxs,
@@ -318,12 +477,344 @@ def placeholders_from_networkxs(graph_nxs,
     An instance of `graphs.GraphTuple` placeholders compatible with the
       dimensions of the graph_nxs.
   """
+  graph_nxs = list(graph_nxs)
+  if not graph_nxs:
+    raise ValueError("`graph_nxs` must contain at least one graph")
+  try:
+    spec = utils_np.spec_from_networkx(graph_nxs[0], node_shape_hint,
+                                       edge_shape_hint,
+                                       data_type_hint.as_numpy_dtype())
+  except TypeError:
+    raise ValueError("Could not convert some elements of `graph_nxs`. "
+                     "Did you pass an iterable of networkx instances?")
+  return placeholders_from_spec(
+      spec,
+      num_graphs=None if force_dynamic_num_graphs else len(graph_nxs),
+      name=name)
+
+
+def _check_spec(spec):
+  if not isinstance(spec, graphs.GraphsTuple):
+    raise TypeError("Expected a `graphs.GraphsTuple` of `graphs.FieldSpec`s, "
+                    "got {}".format(type(spec)))
+
+
+def _spec_shape(spec, field, num_graphs):
+  """Returns the full shape of a field, with a dynamic number of elements."""
+  if field in GRAPH_NUMBER_FIELDS + (GLOBALS,):
+    return [num_graphs] + list(getattr(spec, field).shape)
+  return [None] + list(getattr(spec, field).shape)
+
+
+def _dense_spec_fields(spec):
+  """Returns the non-`None` fields of `spec`, which must not be sparse."""
+  fields = [field for field in ALL_FIELDS if getattr(spec, field) is not None]
+  sparse_fields = [field for field in fields if getattr(spec, field).sparse]
+  if sparse_fields:
+    raise ValueError(
+        "Sparse fields {} are only supported by placeholders".format(
+            sparse_fields))
+  return fields
+
+
+def placeholders_from_spec(spec, num_graphs=None,
+                           name="placeholders_from_spec"):
+  """Constructs placeholders for graphs described by a spec.
+
+  Args:
+    spec: A `graphs.GraphsTuple` of `graphs.FieldSpec`s or `None`s, for
+      instance from `utils_np.spec_from_data_dict` or `graphs.spec_from_json`.
+    num_graphs: (optional) The static number of graphs of the fed batches. If
+      `None` (the default), the number of graphs is dynamic.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A `graphs.GraphsTuple` containing placeholders (`tf.sparse_placeholder`s for
+    sparse fields), and `None` for the `None` fields of `spec`.
+
+  Raises:
+    TypeError: If `spec` is not a `graphs.GraphsTuple`.
+  """
+  _check_spec(spec)
   with tf.name_scope(name):
-    graph = utils_np.networkxs_to_graphs_tuple(graph_nxs, node_shape_hint,
-                                               edge_shape_hint,
-                                               data_type_hint.as_numpy_dtype())
-    return _placeholders_from_graphs_tuple(
-        graph, force_dynamic_num_graphs=force_dynamic_num_graphs)
+    fields = [field for field in ALL_FIELDS if getattr(spec, field) is not None]
+    dtypes = spec.map(lambda s: tf.as_dtype(s.dtype), fields)
+    shapes = spec.replace(
+        **{field: _spec_shape(spec, field, num_graphs) for field in fields})
+    sparse_fields = [field for field in fields if getattr(spec, field).sparse]
+    return _build_placeholders_from_specs(
+        dtypes, shapes, force_dynamic_num_graphs=num_graphs is None,
+        sparse_fields=sparse_fields)
+
+
+def tensor_specs_from_spec(spec, num_graphs=None):
+  """Constructs the `tf.TensorSpec`s of graphs described by a spec.
+
+  Args:
+    spec: A `graphs.GraphsTuple` of `graphs.FieldSpec`s or `None`s.
+    num_graphs: (optional) The static number of graphs. If `None` (the
+      default), the number of graphs is dynamic.
+
+  Returns:
+    A `graphs.GraphsTuple` of `tf.TensorSpec`s named after the fields, and
+    `None` for the `None` fields of `spec`.
+
+  Raises:
+    TypeError: If `spec` is not a `graphs.GraphsTuple`.
+    ValueError: If `spec` has sparse fields.
+  """
+  _check_spec(spec)
+  fields = _dense_spec_fields(spec)
+  return spec.replace(**{
+      field: tf.TensorSpec(_spec_shape(spec, field, num_graphs),
+                           tf.as_dtype(getattr(spec, field).dtype),
+                           name=field)
+      for field in fields})
+
+
+def dataset_signature_from_spec(spec, num_graphs=None):
+  """Returns the types and shapes of a `tf.data.Dataset` of graphs.
+
+  `tf.data` elements cannot contain `None`, so the elements of the dataset are
+  dictionaries of the non-`None` fields of the graphs (e.g. from
+  `graph._asdict()`), which `dataset_element_to_graphs_tuple` converts back:
+
+  ```
+  dataset = tf.data.Dataset.from_generator(
+      generator, *dataset_signature_from_spec(spec))
+  graph = dataset_element_to_graphs_tuple(
+      dataset.make_one_shot_iterator().get_next())
+  ```
+
+  Args:
+    spec: A `graphs.GraphsTuple` of `graphs.FieldSpec`s or `None`s.
+    num_graphs: (optional) The static number of graphs of each element. If
+      `None` (the default), the number of graphs is dynamic.
+
+  Returns:
+    A pair of dictionaries from the non-`None` fields of `spec` to their
+    `tf.DType` and `tf.TensorShape`, to be passed as the `output_types` and
+    `output_shapes` of `tf.data.Dataset.from_generator`.
+
+  Raises:
+    TypeError: If `spec` is not a `graphs.GraphsTuple`.
+    ValueError: If `spec` has sparse fields.
+  """
+  _check_spec(spec)
+  fields = _dense_spec_fields(spec)
+  output_types = {
+      field: tf.as_dtype(getattr(spec, field).dtype) for field in fields}
+  output_shapes = {
+      field: tf.TensorShape(_spec_shape(spec, field, num_graphs))
+      for field in fields}
+  return output_types, output_shapes
+
+
+def dataset_element_to_graphs_tuple(element):
+  """Converts a dictionary of non-`None` fields to a `graphs.GraphsTuple`."""
+  return graphs.GraphsTuple(**{field: element.get(field)
+                               for field in ALL_FIELDS})
+
+
+def tensor_specs_from_graphs_tuple(graph, num_graphs=None):
+  """Derives the `tf.TensorSpec`s of the batches of graphs like `graph`.
+
+  The number of nodes and edges (and, by default, of graphs) of the specs is
+  `None`, and their trailing dimensions are those of `graph`, so that the specs
+  are compatible with any batch with the same dtypes and feature sizes.
+
+  Args:
+    graph: A `graphs.GraphsTuple` of numpy arrays or `Tensor`s, and `None`s.
+    num_graphs: (optional) The static number of graphs. If `None` (the
+      default), the number of graphs is dynamic.
+
+  Returns:
+    A `graphs.GraphsTuple` of `tf.TensorSpec`s named after the fields, and
+    `None` for the `None` fields of `graph`.
+
+  Raises:
+    ValueError: If a field is sparse, or if the trailing dimensions of a field
+      are not statically known.
+  """
+  field_specs = {}
+  for field in ALL_FIELDS:
+    value = getattr(graph, field)
+    if value is None:
+      field_specs[field] = None
+      continue
+    if _is_sparse(value) or isinstance(value, tf.SparseTensor):
+      raise ValueError("Sparse fields {} are only supported by placeholders"
+                       .format([field]))
+    shape = tf.TensorShape(value.shape)[1:]
+    if not shape.is_fully_defined():
+      raise ValueError(
+          "The trailing dimensions of field {} must be statically known, got "
+          "{}".format(field, shape))
+    field_specs[field] = graphs.FieldSpec(
+        tf.as_dtype(value.dtype).name, shape.as_list())
+  return tensor_specs_from_spec(graphs.GraphsTuple(**field_specs), num_graphs)
+
+
+class GraphsTupleFunction(object):
+  """A function of graphs, compiled by `tf.function` with a fixed signature.
+
+  Without an input signature, `tf.function` traces its function again for each
+  new number of nodes, edges or graphs of its input. The signature of a
+  `GraphsTupleFunction` is derived from a spec of graphs, with a dynamic number
+  of elements, so that its function is traced once for all the batches:
+
+  ```
+  model = modules.GraphNetwork(edge_model_fn, node_model_fn, global_model_fn)
+  compiled_model = GraphsTupleFunction(
+      model, utils_np.spec_from_graphs_tuple(batches[0]))
+  for batch in batches:
+    output = compiled_model(batch)
+  assert compiled_model.num_traces == 1
+  ```
+
+  Since `tf.function` signatures cannot contain `None`, the traced function
+  takes a dictionary of the non-`None` fields of the graph (as the elements of
+  `dataset_signature_from_spec`), which is converted back to a
+  `graphs.GraphsTuple` before calling `fn`. Other arguments (e.g. the number of
+  processing steps of an encode-process-decode model) can be bound with a
+  `lambda` or `functools.partial`. The variables of Sonnet modules are created
+  on the first trace, or reused if the modules were already connected.
+
+  This requires a version of Tensorflow providing `tf.function` (>= 1.14).
+  """
+
+  def __init__(self, fn, spec, num_graphs=None, autograph=False):
+    """Compiles `fn`.
+
+    Args:
+      fn: A callable taking a `graphs.GraphsTuple` of `Tensor`s, and returning
+        any structure of `Tensor`s, `graphs.GraphsTuple`s and `None`s.
+      spec: A `graphs.GraphsTuple` of `graphs.FieldSpec`s or `None`s describing
+        the inputs, e.g. from `utils_np.spec_from_graphs_tuple`.
+      num_graphs: (optional) The static number of graphs of the inputs. If
+        `None` (the default), the number of graphs is dynamic.
+      autograph: (bool, default=False) Whether to convert the Python control
+        flow of `fn` with AutoGraph.
+
+    Raises:
+      TypeError: If `spec` is not a `graphs.GraphsTuple`.
+      ValueError: If `spec` has sparse fields.
+    """
+    _check_spec(spec)
+    self._fn = fn
+    self._fields = _dense_spec_fields(spec)
+    self._tensor_specs = tensor_specs_from_spec(spec, num_graphs)
+    self._num_traces = 0
+    input_signature = [{field: getattr(self._tensor_specs, field)
+                        for field in self._fields}]
+    self._function = tf.function(self._traced_fn,
+                                 input_signature=input_signature,
+                                 autograph=autograph)
+
+  @property
+  def input_signature(self):
+    """The `graphs.GraphsTuple` of `tf.TensorSpec`s of the inputs."""
+    return self._tensor_specs
+
+  @property
+  def num_traces(self):
+    """The number of times the function has been traced."""
+    return self._num_traces
+
+  def _traced_fn(self, element):
+    self._num_traces += 1
+    return self._fn(dataset_element_to_graphs_tuple(element))
+
+  def __call__(self, graph):
+    """Calls the compiled function.
+
+    Args:
+      graph: A `graphs.GraphsTuple` of numpy arrays or `Tensor`s, with the same
+        `None` fields as the spec.
+
+    Returns:
+      The output of `fn`.
+
+    Raises:
+      ValueError: If the `None` fields of `graph` and of the spec differ.
+    """
+    fields = [field for field in ALL_FIELDS
+              if getattr(graph, field) is not None]
+    if fields != self._fields:
+      raise ValueError(
+          "Expected a graph with the non-`None` fields {}, got {}".format(
+              self._fields, fields))
+    return self._function({field: getattr(graph, field) for field in fields})
+
+
+def _packed_field(buffer_, offset, num_rows, field_spec):
+  """Reads a field of a packed buffer, and returns it with the next offset."""
+  dtype = tf.as_dtype(field_spec.dtype)
+  row_size = int(np.prod(field_spec.shape))
+  num_elements = tf.cast(num_rows, tf.int64) * row_size
+  start = -(-offset // utils_np.PACKED_ALIGNMENT) * utils_np.PACKED_ALIGNMENT
+  value = tf.slice(buffer_, tf.reshape(start, [1]),
+                   tf.reshape(num_elements * dtype.size, [1]))
+  if dtype == tf.bool:
+    value = tf.not_equal(value, 0)
+  elif dtype.size > 1:
+    value = tf.bitcast(tf.reshape(value, [-1, dtype.size]), dtype)
+  elif dtype != tf.uint8:
+    value = tf.bitcast(value, dtype)
+  shape = [tf.cast(num_rows, tf.int32)] + list(field_spec.shape)
+  value = tf.reshape(value, tf.stack(shape))
+  value.set_shape([None] + list(field_spec.shape))
+  return value, start + num_elements * dtype.size
+
+
+def unpack_graphs_tuple(buffer_, spec, name="unpack_graphs_tuple"):
+  """Unpacks a buffer packed by `utils_np.pack_graphs_tuple`.
+
+  Feeding a packed buffer transfers a batch to the device in a single copy,
+  instead of one per field of the graph:
+
+  ```
+  buffer_ph = tf.placeholder(tf.uint8, [None])
+  graph = unpack_graphs_tuple(buffer_ph, spec)
+  ...
+  sess.run(output, {buffer_ph: utils_np.pack_graphs_tuple(batch, spec)})
+  ```
+
+  Args:
+    buffer_: A 1D `tf.uint8` tensor.
+    spec: A `graphs.GraphsTuple` of `graphs.FieldSpec`s or `None`s, with which
+      the buffer was packed.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A `graphs.GraphsTuple` of tensors, and `None` for the `None` fields of
+    `spec`.
+
+  Raises:
+    TypeError: If `spec` is not a `graphs.GraphsTuple`.
+    ValueError: If `spec` has sparse fields.
+  """
+  _check_spec(spec)
+  fields = _dense_spec_fields(spec)
+  with tf.name_scope(name):
+    buffer_ = tf.convert_to_tensor(buffer_, dtype=tf.uint8)
+    header_size = utils_np.PACKED_HEADER_LENGTH * 8
+    header = tf.bitcast(
+        tf.reshape(buffer_[:header_size], [utils_np.PACKED_HEADER_LENGTH, 8]),
+        tf.int64)
+    num_graphs, num_nodes, num_edges = tf.unstack(header)
+    offset = tf.constant(header_size, dtype=tf.int64)
+    values = {}
+    for field in fields:
+      if field in GRAPH_NUMBER_FIELDS + (GLOBALS,):
+        num_rows = num_graphs
+      elif field == NODES:
+        num_rows = num_nodes
+      else:
+        num_rows = num_edges
+      values[field], offset = _packed_field(
+          buffer_, offset, num_rows, getattr(spec, field))
+    return spec.replace(**values)
 
 
 def _compute_stacked_offsets(sizes, repeats):
@@ -345,6 +836,64 @@ def _compute_stacked_offsets(sizes, repeats):
   return repeat(offset_values, repeats)
 
 
+def offset_local_indices(graph, name="offset_local_indices"):
+  """Converts the local indices of a graph to indices into the batched nodes.
+
+  The `SENDERS` and `RECEIVERS` of a graph batched by
+  `utils_np.data_dicts_to_graphs_tuple(..., local_index_dtype=...)` index the
+  nodes of their own graph, in a narrow dtype, to reduce the host work and the
+  transferred bytes. This casts them to `tf.int32` and offsets them by the
+  number of nodes of the previous graphs of the batch:
+
+  ```
+  spec = utils_np.spec_from_graphs_tuple(utils_np.data_dicts_to_graphs_tuple(
+      data_dicts, local_index_dtype=np.uint8))
+  graph = offset_local_indices(placeholders_from_spec(spec))
+  ```
+
+  Args:
+    graph: A `graphs.GraphsTuple` with local `SENDERS` and `RECEIVERS`, which
+      can be `None`.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A `graphs.GraphsTuple` with `tf.int32` `SENDERS` and `RECEIVERS` indexing
+    the batched `NODES`.
+  """
+  if graph.receivers is None:
+    return graph
+  with tf.name_scope(name):
+    offsets = _compute_stacked_offsets(graph.n_node, graph.n_edge)
+    return graph.replace(
+        receivers=tf.cast(graph.receivers, tf.int32) + offsets,
+        senders=tf.cast(graph.senders, tf.int32) + offsets)
+
+
+def _compute_concat_offsets(n_node_list, n_node, n_edge):
+  """Computes offsets to add to the indices of concatenated graphs tuples.
+
+  The number of ops created does not depend on the number of graphs tuples
+  being concatenated: the number of graphs per tuple is read with a single
+  `tf.shape_n`, and the number of nodes and edges per tuple are obtained with a
+  segment sum over the concatenated `N_NODE` and `N_EDGE` fields.
+
+  Args:
+    n_node_list: A list of the 1D `N_NODE` `Tensor`s of each graphs tuple.
+    n_node: A 1D `Tensor`, the concatenation of `n_node_list`.
+    n_edge: A 1D `Tensor`, the concatenation of the `N_EDGE` fields of each
+      graphs tuple.
+
+  Returns:
+    A 1D `Tensor` containing the index offset per edge.
+  """
+  num_tuples = len(n_node_list)
+  graphs_per_tuple = tf.stack(tf.shape_n(n_node_list, out_type=tf.int32))[:, 0]
+  tuple_index = repeat(tf.range(num_tuples), graphs_per_tuple)
+  n_node_per_tuple = tf.unsorted_segment_sum(n_node, tuple_index, num_tuples)
+  n_edge_per_tuple = tf.unsorted_segment_sum(n_edge, tuple_index, num_tuples)
+  return _compute_stacked_offsets(n_node_per_tuple, n_edge_per_tuple)
+
+
 def concat(input_graphs, axis, name="graph_concat"):
   """Returns an op that concatenates graphs along a given axis.
 
@@ -358,6 +907,9 @@ def concat(input_graphs, axis, name="graph_concat"):
   but this is not checked by this op.
   The graphs in `input_graphs` should have the same set of keys for which the
   corresponding fields is not `None`.
+  Apart from the concatenation ops themselves, the number of ops created does
+  not depend on the number of graphs in `input_graphs`, so that concatenating
+  hundreds of graphs tuples remains cheap to build.
 
   Args:
     input_graphs: A list of `graphs.GraphsTuple` objects containing `Tensor`s
@@ -381,8 +933,10 @@ def concat(input_graphs, axis, name="graph_concat"):
   globals_ = [gr.globals for gr in input_graphs if gr.globals is not None]
 
   with tf.name_scope(name):
-    nodes = tf.concat(nodes, axis, name="concat_nodes") if nodes else None
-    edges = tf.concat(edges, axis, name="concat_edges") if edges else None
+    nodes = (_concat_rows_or_columns(nodes, axis, name="concat_nodes")
+             if nodes else None)
+    edges = (_concat_rows_or_columns(edges, axis, name="concat_edges")
+             if edges else None)
     if globals_:
       globals_ = tf.concat(globals_, axis, name="concat_globals")
     else:
@@ -392,17 +946,14 @@ def concat(input_graphs, axis, name="graph_concat"):
                                      globals=globals_)
     if axis != 0:
       return output
-    n_node_per_tuple = tf.stack(
-        [tf.reduce_sum(gr.n_node) for gr in input_graphs])
-    n_edge_per_tuple = tf.stack(
-        [tf.reduce_sum(gr.n_edge) for gr in input_graphs])
-    offsets = _compute_stacked_offsets(n_node_per_tuple, n_edge_per_tuple)
     n_node = tf.concat([gr.n_node for gr in input_graphs],
                        axis=0,
                        name="concat_n_node")
     n_edge = tf.concat([gr.n_edge for gr in input_graphs],
                        axis=0,
                        name="concat_n_edge")
+    offsets = _compute_concat_offsets([gr.n_node for gr in input_graphs],
+                                      n_node, n_edge)
     receivers = [
         gr.receivers for gr in input_graphs if gr.receivers is not None
     ]
@@ -563,6 +1114,66 @@ def repeat(tensor, repeats, axis=0, name="ragged_repeat"):
     return ragged_util.repeat(tensor, repeats, axis=axis)
 
 
+# Stack of the dictionaries in which `repeat_graph_index` memoizes its outputs.
+_GRAPH_INDEX_CACHES = []
+
+
+@contextlib.contextmanager
+def graph_index_cache():
+  """Memoizes the outputs of `repeat_graph_index` within the context.
+
+  In the context, `repeat_graph_index` computes the index of the graph of each
+  node (or edge) once per `N_NODE` (or `N_EDGE`) tensor, and reuses it in all
+  the later calls; e.g. in all the blocks broadcasting globals or aggregating
+  nodes and edges, for all the steps of a model processing the same graphs:
+  ```
+  with utils_tf.graph_index_cache():
+    for _ in range(num_processing_steps):
+      latent = graph_network(latent)
+  ```
+
+  Yields:
+    `None`.
+  """
+  _GRAPH_INDEX_CACHES.append({})
+  try:
+    yield
+  finally:
+    _GRAPH_INDEX_CACHES.pop()
+
+
+def repeat_graph_index(counts, name="repeat_graph_index"):
+  """Returns the index of the graph of each node or edge.
+
+  Equivalent to `repeat(tf.range(num_graphs), counts)`. Inside a
+  `graph_index_cache` context, the output is memoized for each `counts` tensor
+  (and each control flow context in which it is used).
+
+  Args:
+    counts: A 1D `Tensor` containing the number of nodes (or edges) of each
+      graph, e.g. the `N_NODE` (or `N_EDGE`) field of a `graphs.GraphsTuple`.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A 1D `tf.int32` `Tensor` of length `sum(counts)`.
+  """
+  cache = _GRAPH_INDEX_CACHES[-1] if _GRAPH_INDEX_CACHES else None
+  if cache is not None:
+    default_graph = tf.get_default_graph()
+    # pylint: disable=protected-access
+    key = (id(default_graph), id(default_graph._get_control_flow_context()),
+           id(counts))
+    # pylint: enable=protected-access
+    if key in cache:
+      return cache[key][1]
+  with tf.name_scope(name):
+    graph_index = repeat(tf.range(_get_shape(counts)[0]), counts, axis=0)
+  if cache is not None:
+    # `counts` is kept in the cache so that its id is not reused.
+    cache[key] = (counts, graph_index)
+  return graph_index
+
+
 def _populate_number_fields(data_dict):
   """Returns a dict with the number fields N_NODE, N_EDGE filled in.
 
@@ -581,7 +1192,7 @@ def _populate_number_fields(data_dict):
   for number_field, data_field in [[N_NODE, NODES], [N_EDGE, RECEIVERS]]:
     if dct.get(number_field) is None:
       if dct[data_field] is not None:
-        dct[number_field] = tf.shape(dct[data_field])[0]
+        dct[number_field] = _num_rows(dct[data_field])
       else:
         dct[number_field] = tf.constant(0, dtype=tf.int32)
   return dct
@@ -590,8 +1201,10 @@ def _populate_number_fields(data_dict):
 def _to_compatible_data_dicts(data_dicts):
   """Convert the content of `data_dicts` to tensors of the right type.
 
-  All fields are converted to `Tensor`s. The index fields (`SENDERS` and
-  `RECEIVERS`) and number fields (`N_NODE`, `N_EDGE`) are cast to `tf.int32`.
+  All fields are converted to `Tensor`s, except sparse values and `scipy.sparse`
+  matrices which are converted to `tf.SparseTensor`s. The index fields
+  (`SENDERS` and `RECEIVERS`) and number fields (`N_NODE`, `N_EDGE`) are cast
+  to `tf.int32`.
 
   Args:
     data_dicts: An iterable of dictionaries with keys `ALL_KEYS` and
@@ -606,6 +1219,8 @@ def _to_compatible_data_dicts(data_dicts):
     for k, v in data_dict.items():
       if v is None:
         result[k] = None
+      elif _is_sparse(v):
+        result[k] = _to_sparse_tensor(v)
       else:
         dtype = tf.int32 if k in [SENDERS, RECEIVERS, N_NODE, N_EDGE] else None
         result[k] = tf.convert_to_tensor(v, dtype)
@@ -648,6 +1263,8 @@ def _concatenate_data_dicts(data_dicts):
       dct[field] = None
     elif field in list(GRAPH_NUMBER_FIELDS) + [GLOBALS]:
       dct[field] = tf.stack(tensors)
+    elif isinstance(tensors[0], tf.SparseTensor):
+      dct[field] = tf.sparse.concat(0, tensors)
     else:
       dct[field] = tf.concat(tensors, axis=0)
 
@@ -1028,6 +1645,11 @@ def get_graph(input_graphs, index, name="get_graph"):
       return value
     return value[slice_]
 
+  def safe_slice_rows(value, slice_):
+    if value is None:
+      return value
+    return _slice_rows(value, slice_.start, slice_.stop)
+
   if isinstance(index, (int, tf.Tensor)):
     _check_valid_index(index, "index")
     graph_slice = slice(index, index + 1)
@@ -1066,11 +1688,11 @@ def get_graph(input_graphs, index, name="get_graph"):
                                                   graph_slice)
 
     field = "nodes"
-    sliced_graphs_dict[field] = safe_slice_none(getattr(input_graphs, field),
+    sliced_graphs_dict[field] = safe_slice_rows(getattr(input_graphs, field),
                                                 nodes_slice)
 
     for field in {"edges", "senders", "receivers"}:
-      sliced_graphs_dict[field] = safe_slice_none(getattr(input_graphs, field),
+      sliced_graphs_dict[field] = safe_slice_rows(getattr(input_graphs, field),
                                                   edges_slice)
       if (field in {"senders", "receivers"}
           and sliced_graphs_dict[field] is not None):
@@ -1080,6 +1702,79 @@ def get_graph(input_graphs, index, name="get_graph"):
     return graphs.GraphsTuple(**sliced_graphs_dict)
 
 
+def gather_graphs(input_graphs, indices, name="gather_graphs"):
+  """Gathers an arbitrary list of graphs from a batch of graphs.
+
+  Contrary to `get_graph`, `indices` can be any list of graph indices (in any
+  order, and possibly with repetitions), for instance to resample a batch.
+  The node and edge indices of the selected graphs are built with ragged
+  ranges, and the senders and receivers are re-offset in a single pass, so that
+  the number of ops does not depend on the number of gathered graphs.
+
+  Args:
+    input_graphs: A `graphs.GraphsTuple` containing `Tensor`s.
+    indices: A 1D integer `Tensor` (or a list of `int`s) of indices of graphs in
+      `input_graphs`. Each index should be compatible with the number of graphs
+      in `input_graphs`.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A `graphs.GraphsTuple` containing `Tensor`s, made of the graphs of
+    `input_graphs` at positions `indices`, in the order given by `indices`.
+
+  Raises:
+    TypeError: if `indices` does not have an integer type.
+    ValueError: if `indices` is not of rank 1.
+  """
+  with tf.name_scope(name):
+    indices = tf.convert_to_tensor(indices)
+    if not indices.dtype.is_integer:
+      raise TypeError(
+          "Invalid `indices` parameter. Valid indices must have an integer "
+          "type, got {}.".format(indices.dtype))
+    if indices.shape.ndims is not None and indices.shape.ndims != 1:
+      raise ValueError(
+          "Invalid `indices` parameter. Valid indices must be of rank 1, got "
+          "shape {}.".format(indices.shape.as_list()))
+
+    n_node = tf.gather(input_graphs.n_node, indices)
+    n_edge = tf.gather(input_graphs.n_edge, indices)
+    node_starts = tf.gather(tf.cumsum(input_graphs.n_node, exclusive=True),
+                            indices)
+    edge_starts = tf.gather(tf.cumsum(input_graphs.n_edge, exclusive=True),
+                            indices)
+    node_ranges = tf.ragged.range(node_starts, node_starts + n_node)
+    edge_ranges = tf.ragged.range(edge_starts, edge_starts + n_edge)
+    node_index = node_ranges.flat_values
+    edge_index = edge_ranges.flat_values
+
+    def safe_gather_none(value, gather_indices):
+      if value is None:
+        return value
+      return tf.gather(value, gather_indices)
+
+    gathered_graphs_dict = {
+        N_NODE: n_node,
+        N_EDGE: n_edge,
+        GLOBALS: safe_gather_none(input_graphs.globals, indices),
+        NODES: safe_gather_none(input_graphs.nodes, node_index),
+        EDGES: safe_gather_none(input_graphs.edges, edge_index),
+    }
+
+    # Shift from the position of the first node of each graph in the input to
+    # its position in the output, broadcast to the edges of that graph.
+    node_shifts = tf.cumsum(n_node, exclusive=True) - node_starts
+    edge_node_shifts = tf.gather(node_shifts, edge_ranges.value_rowids())
+    for field in (RECEIVERS, SENDERS):
+      value = getattr(input_graphs, field)
+      if value is not None:
+        value = tf.gather(value, edge_index)
+        value += tf.cast(edge_node_shifts, value.dtype)
+      gathered_graphs_dict[field] = value
+
+    return graphs.GraphsTuple(**gathered_graphs_dict)
+
+
 def get_num_graphs(input_graphs, name="get_num_graphs"):
   """Returns the number of graphs (i.e. the batch size) in `input_graphs`.
 
@@ -1095,6 +1790,448 @@ def get_num_graphs(input_graphs, name="get_num_graphs"):
     return _get_shape(input_graphs.n_node)[0]
 
 
+def _bipartite_concatenate_data_dicts(data_dicts):
+  """Concatenates bipartite data dicts to create the equivalent batched graph.
+
+  Args:
+    data_dicts: An iterable of data dictionaries with keys
+      `BIPARTITE_GRAPH_DATA_FIELDS`, plus, potentially, a subset of
+      `BIPARTITE_GRAPH_NUMBER_FIELDS`, containing `Tensor`s or `None`s.
+
+  Returns:
+    A data dictionary with the keys `BIPARTITE_ALL_FIELDS`, representing the
+    concatenated graphs.
+  """
+  # pylint: disable=protected-access
+  number_fields_data = utils_np._BIPARTITE_NUMBER_FIELDS_DATA
+  index_fields_offsets = utils_np._BIPARTITE_INDEX_FIELDS_OFFSETS
+  # pylint: enable=protected-access
+  dct = {field: [] for field in BIPARTITE_ALL_FIELDS}
+  for data_dict in data_dicts:
+    data_dict = dict(data_dict)
+    for number_field, data_field in number_fields_data:
+      if data_dict.get(number_field) is None:
+        data = data_dict[data_field]
+        data_dict[number_field] = (tf.constant(0, dtype=tf.int32)
+                                   if data is None else tf.shape(data)[0])
+    for field in BIPARTITE_ALL_FIELDS:
+      value = data_dict.get(field)
+      if value is None or dct[field] is None:
+        dct[field] = None
+      else:
+        dct[field].append(value)
+
+  for field, tensors in dct.items():
+    if tensors is None:
+      continue
+    elif field in BIPARTITE_GRAPH_NUMBER_FIELDS + (GLOBALS,):
+      dct[field] = tf.stack(tensors)
+    else:
+      dct[field] = tf.concat(tensors, axis=0)
+
+  if dct[RECEIVERS] is not None:
+    for index_field, number_field in index_fields_offsets:
+      dct[index_field] += _compute_stacked_offsets(dct[number_field],
+                                                   dct[N_EDGE])
+  return dct
+
+
+def bipartite_data_dicts_to_graphs_tuple(
+    data_dicts, name="bipartite_data_dicts_to_graphs_tuple"):
+  """Creates a `graphs.BipartiteGraphsTuple` of tensors from data dicts.
+
+  See `data_dicts_to_graphs_tuple`. The `SENDERS` of each graph index into its
+  `LEFT_NODES`, and its `RECEIVERS` into its `RIGHT_NODES`; they are offset by
+  the number of left (resp. right) nodes of the previous graphs.
+
+  Args:
+    data_dicts: An iterable of data dictionaries with keys in
+      `BIPARTITE_ALL_FIELDS`.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A `graphs.BipartiteGraphsTuple` representing the graphs in `data_dicts`.
+  """
+  data_dicts = [dict(d) for d in data_dicts]
+  for key in BIPARTITE_ALL_FIELDS:
+    for data_dict in data_dicts:
+      data_dict.setdefault(key, None)
+  utils_np._check_valid_sets_of_keys(data_dicts)  # pylint: disable=protected-access
+  index_and_number_fields = (SENDERS, RECEIVERS) + BIPARTITE_GRAPH_NUMBER_FIELDS
+  with tf.name_scope(name):
+    data_dicts = [{
+        k: None if v is None else tf.convert_to_tensor(
+            v, tf.int32 if k in index_and_number_fields else None)
+        for k, v in data_dict.items()
+    } for data_dict in data_dicts]
+    return graphs.BipartiteGraphsTuple(
+        **_bipartite_concatenate_data_dicts(data_dicts))
+
+
+def bipartite_placeholders_from_data_dicts(
+    data_dicts,
+    force_dynamic_num_graphs=True,
+    name="bipartite_placeholders_from_data_dicts"):
+  """Constructs bipartite placeholders compatible with a list of data dicts.
+
+  The placeholders can be fed with `get_feed_dict`.
+
+  Args:
+    data_dicts: An iterable of bipartite data dicts containing numpy arrays.
+    force_dynamic_num_graphs: A `bool` that forces the batch dimension to be
+      dynamic. Defaults to `True`.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    An instance of `graphs.BipartiteGraphsTuple` placeholders compatible with
+      the dimensions of the dictionaries in `data_dicts`.
+  """
+  with tf.name_scope(name):
+    graph = bipartite_data_dicts_to_graphs_tuple(data_dicts)
+    return _placeholders_from_graphs_tuple(
+        graph, force_dynamic_num_graphs=force_dynamic_num_graphs)
+
+
+def bipartite_concat(input_graphs, axis, name="bipartite_graph_concat"):
+  """Returns an op that concatenates bipartite graphs along a given axis.
+
+  See `concat`. When `axis` is 0, the `SENDERS` (resp. `RECEIVERS`) are offset
+  by the number of left (resp. right) nodes of the previous graphs tuples.
+
+  Args:
+    input_graphs: A list of `graphs.BipartiteGraphsTuple` objects containing
+      `Tensor`s, with the same set of `None` fields.
+    axis: An axis to concatenate on.
+    name: (string, optional) A name for the operation.
+
+  Returns: An op that returns the concatenated graphs.
+
+  Raises:
+    ValueError: If `values` is an empty list, or if the fields which are `None`
+      in `input_graphs` are not the same for all the graphs.
+  """
+  if not input_graphs:
+    raise ValueError("List argument `input_graphs` is empty")
+  utils_np._check_valid_sets_of_keys([gr._asdict() for gr in input_graphs])  # pylint: disable=protected-access
+  if len(input_graphs) == 1:
+    return input_graphs[0]
+
+  def concat_field(field):
+    values = [getattr(gr, field) for gr in input_graphs]
+    if values[0] is None:
+      return None
+    return tf.concat(values, axis, name="concat_" + field)
+
+  with tf.name_scope(name):
+    output = input_graphs[0].replace(
+        **{field: concat_field(field)
+           for field in graphs.BIPARTITE_GRAPH_FEATURE_FIELDS})
+    if axis != 0:
+      return output
+    number_fields = {
+        field: concat_field(field) for field in BIPARTITE_GRAPH_NUMBER_FIELDS}
+    output = output.replace(**number_fields)
+    if input_graphs[0].receivers is None:
+      return output
+    index_fields = {}
+    # pylint: disable=protected-access
+    for index_field, number_field in utils_np._BIPARTITE_INDEX_FIELDS_OFFSETS:
+      # pylint: enable=protected-access
+      offsets = _compute_concat_offsets(
+          [getattr(gr, number_field) for gr in input_graphs],
+          number_fields[number_field], number_fields[N_EDGE])
+      index_fields[index_field] = concat_field(index_field) + offsets
+    return output.replace(**index_fields)
+
+
+def get_bipartite_graph(input_graphs, index, name="get_bipartite_graph"):
+  """Indexes into a bipartite graph.
+
+  See `get_graph`.
+
+  Args:
+    input_graphs: A `graphs.BipartiteGraphsTuple` containing `Tensor`s.
+    index: An `int`, a `slice`, a tensor `int` or a tensor `slice`, to index
+      into `graph`. The `step` parameter of the `slice` objects must be None.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A `graphs.BipartiteGraphsTuple` containing `Tensor`s, made of the extracted
+      graph(s).
+
+  Raises:
+    TypeError: if `index` is not an `int`, a `slice`, or corresponding tensor
+      types.
+    ValueError: if `index` is a slice and `index.step` if not None.
+  """
+  if isinstance(index, (int, tf.Tensor)):
+    _check_valid_index(index, "index")
+    graph_slice = slice(index, index + 1)
+  elif (
+      isinstance(index, slice) and _check_valid_index(index.stop, "index.stop")
+      and
+      (index.start is None or _check_valid_index(index.start, "index.start"))):
+    if index.step is not None:
+      raise ValueError(
+          "slices with step/stride are not supported, got {}".format(index))
+    graph_slice = index
+  else:
+    raise TypeError(
+        "unsupported index type got {} with type {}. Index must be a valid "
+        "scalar integer (tensor or int) or a slice of such values.".format(
+            index, type(index)))
+
+  start_slice = slice(0, graph_slice.start)
+
+  def element_slice(number_field):
+    counts = getattr(input_graphs, number_field)
+    start = tf.reduce_sum(counts[start_slice])
+    return slice(start, start + tf.reduce_sum(counts[graph_slice]))
+
+  def safe_slice_none(value, slice_):
+    if value is None:
+      return value
+    return value[slice_]
+
+  with tf.name_scope(name):
+    slices = {field: element_slice(field)
+              for field in BIPARTITE_GRAPH_NUMBER_FIELDS}
+    sliced_graphs_dict = {
+        LEFT_NODES: safe_slice_none(input_graphs.left_nodes,
+                                    slices[N_LEFT_NODES]),
+        RIGHT_NODES: safe_slice_none(input_graphs.right_nodes,
+                                     slices[N_RIGHT_NODES]),
+        EDGES: safe_slice_none(input_graphs.edges, slices[N_EDGE]),
+        GLOBALS: safe_slice_none(input_graphs.globals, graph_slice),
+    }
+    for field in BIPARTITE_GRAPH_NUMBER_FIELDS:
+      sliced_graphs_dict[field] = getattr(input_graphs, field)[graph_slice]
+    # pylint: disable=protected-access
+    for index_field, number_field in utils_np._BIPARTITE_INDEX_FIELDS_OFFSETS:
+      # pylint: enable=protected-access
+      indices = safe_slice_none(getattr(input_graphs, index_field),
+                                slices[N_EDGE])
+      if indices is not None:
+        indices -= slices[number_field].start
+      sliced_graphs_dict[index_field] = indices
+    return graphs.BipartiteGraphsTuple(**sliced_graphs_dict)
+
+
+def _dense_indices(graph):
+  """Returns the positions of the nodes and edges of `graph` in dense tensors.
+
+  Args:
+    graph: A `graphs.GraphsTuple` containing `Tensor`s.
+
+  Returns:
+    A pair `(node_indices, edge_indices)` where `node_indices` is an `int32`
+    `Tensor` of shape `[n_nodes, 2]` containing the (graph, node) position of
+    each node, and `edge_indices` is either `None` (if `graph` has no
+    receivers) or an `int32` `Tensor` of shape `[n_edges, 3]` containing the
+    (graph, receiver, sender) position of each edge.
+  """
+  n_node = tf.cast(graph.n_node, tf.int32)
+  num_graphs = get_num_graphs(graph)
+  node_offsets = tf.cumsum(n_node, exclusive=True)
+  node_graph_index = repeat(tf.range(num_graphs), n_node)
+  node_local_index = (tf.range(tf.reduce_sum(n_node)) -
+                      tf.gather(node_offsets, node_graph_index))
+  node_indices = tf.stack([node_graph_index, node_local_index], axis=1)
+  if graph.receivers is None:
+    return node_indices, None
+  edge_graph_index = repeat(tf.range(num_graphs), graph.n_edge)
+  edge_node_offsets = tf.gather(node_offsets, edge_graph_index)
+  edge_indices = tf.stack([
+      edge_graph_index,
+      tf.cast(graph.receivers, tf.int32) - edge_node_offsets,
+      tf.cast(graph.senders, tf.int32) - edge_node_offsets
+  ], axis=1)
+  return node_indices, edge_indices
+
+
+def graphs_tuple_to_dense(graph, max_n_node=None, name="graphs_tuple_to_dense"):
+  """Converts a `graphs.GraphsTuple` to a `graphs.DenseGraphsTuple`.
+
+  Every graph is padded to `max_n_node` nodes. Padded nodes and missing edges
+  have zero features, and are marked as such in the `NODE_MASK` and
+  `ADJACENCY` fields of the output. The input graphs should not contain
+  several edges between the same pair of nodes.
+
+  Args:
+    graph: A `graphs.GraphsTuple` containing `Tensor`s.
+    max_n_node: (`int` or scalar `Tensor`, optional) The number of nodes every
+      graph is padded to. It must be at least the largest number of nodes in
+      `graph`. If `None` (the default), this largest number is used.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A `graphs.DenseGraphsTuple` containing `Tensor`s.
+  """
+  with tf.name_scope(name):
+    n_node = tf.cast(graph.n_node, tf.int32)
+    num_graphs = get_num_graphs(graph)
+    if max_n_node is None:
+      max_n_node = tf.maximum(tf.reduce_max(n_node), 0)
+    node_indices, edge_indices = _dense_indices(graph)
+
+    def scatter_none(values, indices, leading_shape):
+      if values is None:
+        return None
+      return tf.scatter_nd(indices, values,
+                           leading_shape + _get_shape(values)[1:])
+
+    nodes = scatter_none(graph.nodes, node_indices, [num_graphs, max_n_node])
+    adjacency_shape = [num_graphs, max_n_node, max_n_node]
+    if edge_indices is None:
+      adjacency = tf.zeros(adjacency_shape, dtype=tf.bool)
+      edges = None
+    else:
+      edge_counts = tf.scatter_nd(edge_indices,
+                                  tf.ones_like(edge_indices[:, 0]),
+                                  adjacency_shape)
+      adjacency = tf.greater(edge_counts, 0)
+      edges = scatter_none(graph.edges, edge_indices, adjacency_shape)
+    return graphs.DenseGraphsTuple(
+        nodes=nodes,
+        edges=edges,
+        globals=graph.globals,
+        adjacency=adjacency,
+        node_mask=tf.sequence_mask(n_node, max_n_node),
+        n_node=graph.n_node)
+
+
+def dense_to_graphs_tuple(dense_graph, graph, name="dense_to_graphs_tuple"):
+  """Converts a `graphs.DenseGraphsTuple` back to a `graphs.GraphsTuple`.
+
+  Args:
+    dense_graph: A `graphs.DenseGraphsTuple` containing `Tensor`s.
+    graph: The `graphs.GraphsTuple` with the same structure (`N_NODE`,
+      `N_EDGE`, `RECEIVERS` and `SENDERS`) as `dense_graph`, e.g. the graph
+      `dense_graph` was created from. The edges of the output are ordered as
+      in `graph`.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A copy of `graph` with nodes, edges and globals read from `dense_graph`.
+
+  Raises:
+    ValueError: If `dense_graph` has edge features but `graph` has no
+      receivers and senders.
+  """
+  if dense_graph.edges is not None and graph.receivers is None:
+    raise ValueError("Cannot convert edges if `graph` has no receivers and "
+                     "senders.")
+  with tf.name_scope(name):
+    node_indices, edge_indices = _dense_indices(graph)
+    nodes = dense_graph.nodes
+    if nodes is not None:
+      nodes = tf.gather_nd(nodes, node_indices)
+    edges = dense_graph.edges
+    if edges is not None:
+      edges = tf.gather_nd(edges, edge_indices)
+    return graph.replace(nodes=nodes, edges=edges, globals=dense_graph.globals)
+
+
+def should_use_dense(graph,
+                     max_n_node=32,
+                     min_density=0.1,
+                     name="should_use_dense"):
+  """Returns whether a batch of graphs is better processed as dense tensors.
+
+  The dense representation applies the models on the
+  `n_graphs * max_n_node ** 2` pairs of nodes and relies on dense reductions,
+  while the sparse representation gathers and scatters along the edges. The
+  dense computation is preferred when the graphs are small and the fraction of
+  connected pairs of nodes is large enough.
+
+  Args:
+    graph: A `graphs.GraphsTuple` containing `Tensor`s.
+    max_n_node: (`int`, default=32) The largest number of nodes per graph for
+      which the dense representation is used.
+    min_density: (`float`, default=0.1) The smallest ratio between the number
+      of edges and the number of padded pairs of nodes for which the dense
+      representation is used.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A scalar boolean `Tensor`.
+  """
+  with tf.name_scope(name):
+    largest_n_node = tf.reduce_max(tf.cast(graph.n_node, tf.int32))
+    use_dense = tf.less_equal(largest_n_node, max_n_node)
+    if min_density > 0 and graph.receivers is not None:
+      num_pairs = (tf.cast(get_num_graphs(graph), tf.float32) *
+                   tf.cast(tf.square(largest_n_node), tf.float32))
+      num_edges = tf.cast(tf.reduce_sum(graph.n_edge), tf.float32)
+      use_dense = tf.logical_and(use_dense,
+                                 tf.greater_equal(num_edges,
+                                                  min_density * num_pairs))
+    return use_dense
+
+
+def dense_or_sparse(graph,
+                    dense_fn,
+                    sparse_fn,
+                    max_n_node=32,
+                    min_density=0.1,
+                    name="dense_or_sparse"):
+  """Applies a dense or a sparse computation to `graph`, chosen per batch.
+
+  The choice is made at runtime with `should_use_dense`. `dense_fn` and
+  `sparse_fn` should compute the same function (typically, by sharing the same
+  models between e.g. a `blocks.DenseEdgeBlock` and a `blocks.EdgeBlock`):
+  ```
+  edge_model = snt.nets.MLP([32, 32])
+  dense_block = blocks.DenseEdgeBlock(lambda: edge_model)
+  sparse_block = blocks.EdgeBlock(lambda: edge_model)
+  output_graph = utils_tf.dense_or_sparse(graph, dense_block, sparse_block)
+  ```
+
+  Args:
+    graph: A `graphs.GraphsTuple` containing `Tensor`s.
+    dense_fn: A callable taking and returning a `graphs.DenseGraphsTuple`.
+    sparse_fn: A callable taking and returning a `graphs.GraphsTuple`.
+    max_n_node: See `should_use_dense`.
+    min_density: See `should_use_dense`.
+    name: (string, optional) A name for the operation.
+
+  Returns:
+    A `graphs.GraphsTuple` containing `Tensor`s, the output of `dense_fn` (once
+    converted back to a `graphs.GraphsTuple`) or of `sparse_fn`.
+
+  Raises:
+    ValueError: If the outputs of `dense_fn` and `sparse_fn` do not have the
+      same `None` fields.
+  """
+  with tf.name_scope(name):
+    output_fields = []
+
+    def check_fields(output):
+      # `tf.cond` traces both branches before comparing their outputs, so the
+      # second branch to be traced checks its fields against the first one,
+      # before `tf.cond` fails on the mismatch with a less explicit error.
+      fields = [k for k in ALL_FIELDS if getattr(output, k) is not None]
+      if output_fields and output_fields[0] != fields:
+        raise ValueError(
+            "The dense and sparse computations should have the same `None` "
+            "fields, got {} and {}.".format(output_fields[0], fields))
+      output_fields.append(fields)
+      return [getattr(output, k) for k in fields]
+
+    def dense_branch():
+      dense_graph = dense_fn(graphs_tuple_to_dense(graph))
+      return check_fields(dense_to_graphs_tuple(dense_graph, graph))
+
+    def sparse_branch():
+      return check_fields(sparse_fn(graph))
+
+    outputs = tf.cond(should_use_dense(graph, max_n_node, min_density),
+                      dense_branch, sparse_branch, strict=True)
+    output_dict = {k: None for k in ALL_FIELDS}
+    output_dict.update(zip(output_fields[0], outputs))
+    return graphs.GraphsTuple(**output_dict)
+
+
 def gpu_cumsum(tensor, **kwargs):
   # kwargs fed to cumsum
   return tf.cast(tf.cumsum(tf.cast(tensor, tf.float32), **kwargs),